@@ -0,0 +1,253 @@
+"""Time-bucketed revenue and volume analytics for admins.
+
+Each bucket (an hour, a day, or a Monday-to-Sunday week, in UTC) holds:
+  rides, gross_fare           Rides started in the bucket, sum of final_fare
+  completed_payments/amount   Payments completed in the bucket (Payments.timestamp)
+  pending_payments/amount     Payments raised in the bucket and still pending
+  cancellations               Cancelled bookings created in the bucket
+
+Buckets are computed with one GROUP BY per table over the requested range,
+on the integer bucket number (unix seconds // bucket width), so Python never
+sees individual rows. Unix seconds come from strftime('%s') on SQLite,
+EXTRACT(EPOCH) on PostgreSQL and TIMESTAMPDIFF on MySQL/MariaDB; other
+backends fail to compile the query. All of them run as one UNION ALL statement, which reads
+a single snapshot even while history.py moves rows between tables. A bucket that closed more than
+ANALYTICS_CLOSE_GRACE_SECONDS ago is cached. Repeat queries over historical
+ranges only compute the buckets they have not seen and the open one. Each
+table is read together with its archive copy (history.py), so moving old
+bookings out of the hot tables does not change any bucket.
+
+A few writes can still change a closed bucket: completing or deleting an old
+pending payment, cancelling an old booking, and admin ride edits. Those call
+revenue_analytics.invalidate() with the timestamps involved. Changes made
+outside the API are picked up when the entry's TTL
+(ANALYTICS_CACHE_TTL_SECONDS) runs out.
+"""
+import calendar
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Literal, NamedTuple, Optional, Tuple
+
+from sqlalchemy import Integer, func, literal, null, select, union_all
+from sqlalchemy.exc import CompileError
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+from sqlalchemy.orm import Session
+
+from models import ArchivedBooking, ArchivedPayment, ArchivedRide, Booking, Payment, Ride
+from utils import TTLCache
+
+ANALYTICS_CACHE_SIZE = int(os.getenv("ANALYTICS_CACHE_SIZE", "100000"))
+ANALYTICS_CACHE_TTL_SECONDS = float(os.getenv("ANALYTICS_CACHE_TTL_SECONDS", "86400"))
+ANALYTICS_CLOSE_GRACE_SECONDS = float(os.getenv("ANALYTICS_CLOSE_GRACE_SECONDS", "60"))  # late commits
+ANALYTICS_MAX_BUCKETS = int(os.getenv("ANALYTICS_MAX_BUCKETS", "2000"))
+
+Granularity = Literal["hour", "day", "week"]
+BUCKET_SECONDS = {"hour": 3600, "day": 86400, "week": 7 * 86400}
+# Unix time of the first bucket boundary: 1970-01-05 was a Monday
+_ORIGIN_SECONDS = {"hour": 0, "day": 0, "week": 4 * 86400}
+_EPOCH = datetime(1970, 1, 1)
+
+
+class Bucket(NamedTuple):
+    rides: int = 0
+    gross_fare: float = 0.0
+    completed_payments: int = 0
+    completed_amount: float = 0.0
+    pending_payments: int = 0
+    pending_amount: float = 0.0
+    cancellations: int = 0
+
+
+EMPTY_BUCKET = Bucket()
+
+
+def bucket_of_seconds(granularity: Granularity, seconds):
+    """Bucket number of unix seconds; works elementwise on integer NumPy arrays too."""
+    return (seconds - _ORIGIN_SECONDS[granularity]) // BUCKET_SECONDS[granularity]
+
+
+def bucket_index(granularity: Granularity, when: datetime) -> int:
+    return bucket_of_seconds(granularity, calendar.timegm(when.utctimetuple()))
+
+
+def bucket_start(granularity: Granularity, index: int) -> datetime:
+    return _EPOCH + timedelta(seconds=index * BUCKET_SECONDS[granularity] + _ORIGIN_SECONDS[granularity])
+
+
+def bucket_range(granularity: Granularity, start: datetime, end: datetime) -> Tuple[int, int]:
+    """First and last bucket numbers of a query; ValueError if the range is invalid or too long."""
+    first, last = bucket_index(granularity, start), bucket_index(granularity, end)
+    if last < first:
+        raise ValueError("end is before start")
+    if last - first + 1 > ANALYTICS_MAX_BUCKETS:
+        raise ValueError(f"at most {ANALYTICS_MAX_BUCKETS} {granularity} buckets per query")
+    return first, last
+
+
+class unix_seconds(FunctionElement):
+    """Whole seconds since 1970-01-01 of a naive UTC timestamp column."""
+
+    type = Integer()
+    inherit_cache = True
+
+
+@compiles(unix_seconds)
+def _unix_seconds(element, compiler, **kw):
+    raise CompileError(f"analytics buckets are not supported on {compiler.dialect.name}")
+
+
+@compiles(unix_seconds, "sqlite")
+def _unix_seconds_sqlite(element, compiler, **kw):
+    # Cut the stored text to whole seconds: strftime rounds .9995 s and up into the next second
+    return "CAST(strftime('%%s', substr(%s, 1, 19)) AS INTEGER)" % compiler.process(element.clauses, **kw)
+
+
+@compiles(unix_seconds, "postgresql")
+def _unix_seconds_postgresql(element, compiler, **kw):
+    return "CAST(FLOOR(EXTRACT(EPOCH FROM %s)) AS BIGINT)" % compiler.process(element.clauses, **kw)
+
+
+@compiles(unix_seconds, "mysql")
+def _unix_seconds_mysql(element, compiler, **kw):
+    # Not UNIX_TIMESTAMP(): it reads the value in the session time zone
+    return "TIMESTAMPDIFF(SECOND, '1970-01-01 00:00:00', %s)" % compiler.process(element.clauses, **kw)
+
+
+def _sql_bucket(column, granularity: Granularity):
+    """bucket_index() in SQL, on whole seconds like the Python side."""
+    seconds = unix_seconds(column) - _ORIGIN_SECONDS[granularity]
+    return seconds // BUCKET_SECONDS[granularity]
+
+
+def bucket_statement(granularity: Granularity, low: datetime, high: datetime):
+    """Per-bucket totals of every table and its archive copy in [low, high), as one UNION ALL.
+
+    Rows are (metric, bucket, payment status or NULL, count, amount).
+    """
+    parts = []
+    for rides in (Ride, ArchivedRide):
+        bucket = _sql_bucket(rides.start_time, granularity)
+        parts.append(
+            select(literal("rides"), bucket, null(), func.count(), func.coalesce(func.sum(rides.final_fare), 0))
+            .where(rides.start_time >= low, rides.start_time < high)
+            .group_by(bucket)
+        )
+    # No status predicate: it would steer SQLite onto ix_Payments_status instead of the time range
+    for payments in (Payment, ArchivedPayment):
+        bucket = _sql_bucket(payments.timestamp, granularity)
+        parts.append(
+            select(literal("payments"), bucket, payments.status, func.count(),
+                   func.coalesce(func.sum(payments.amount), 0))
+            .where(payments.timestamp >= low, payments.timestamp < high)
+            .group_by(bucket, payments.status)
+        )
+    for bookings in (Booking, ArchivedBooking):
+        bucket = _sql_bucket(bookings.created_at, granularity)
+        parts.append(
+            select(literal("cancellations"), bucket, null(), func.count(), literal(0))
+            .where(bookings.status == "cancelled", bookings.created_at >= low, bookings.created_at < high)
+            .group_by(bucket)
+        )
+    return union_all(*parts)
+
+
+class RevenueAnalytics:
+    def __init__(self, cache_size: int = ANALYTICS_CACHE_SIZE, ttl: float = ANALYTICS_CACHE_TTL_SECONDS,
+                 grace_seconds: float = ANALYTICS_CLOSE_GRACE_SECONDS):
+        self.grace = timedelta(seconds=grace_seconds)
+        self._cache = TTLCache(cache_size, ttl)
+        self._lock = threading.Lock()
+        self._generation = 0  # bumped by invalidate(), so a racing compute does not cache stale buckets
+        self._hits = 0
+        self._computed = 0
+        self._queries = 0
+
+    def series(self, db: Session, granularity: Granularity, start: datetime, end: datetime,
+               now: Optional[datetime] = None) -> List[dict]:
+        """Buckets from the one containing start through the one containing end, empty ones included."""
+        first, last = bucket_range(granularity, start, end)
+        # Buckets before this one closed long enough ago to cache
+        closed = bucket_index(granularity, (now or datetime.utcnow()) - self.grace)
+
+        buckets: Dict[int, Bucket] = {}
+        missing = []
+        for index in range(first, last + 1):
+            cached = self._cache.get((granularity, index)) if index < closed else None
+            if cached is None:
+                missing.append(index)
+            else:
+                buckets[index] = cached
+
+        if missing:
+            with self._lock:
+                generation = self._generation
+            computed = self._compute(db, granularity, missing[0], missing[-1])
+            with self._lock:
+                cacheable = generation == self._generation
+                self._hits += len(buckets)
+                self._computed += len(missing)
+            for index in missing:
+                buckets[index] = computed.get(index, EMPTY_BUCKET)
+                if cacheable and index < closed:
+                    self._cache.set((granularity, index), buckets[index])
+        else:
+            with self._lock:
+                self._hits += len(buckets)
+
+        return [
+            {"bucket_start": bucket_start(granularity, index), **buckets[index]._asdict()}
+            for index in range(first, last + 1)
+        ]
+
+    def _compute(self, db: Session, granularity: Granularity, first: int, last: int) -> Dict[int, Bucket]:
+        """Every bucket in [first, last] with activity, from a single bucket_statement()."""
+        low, high = bucket_start(granularity, first), bucket_start(granularity, last + 1)
+        totals: Dict[int, dict] = {}
+
+        def add(index, **values):
+            bucket = totals.setdefault(index, dict.fromkeys(Bucket._fields, 0))
+            for name, value in values.items():
+                bucket[name] += value
+
+        for metric, index, status, count, amount in db.execute(bucket_statement(granularity, low, high)):
+            if metric == "rides":
+                add(index, rides=count, gross_fare=amount)
+            elif metric == "cancellations":
+                add(index, cancellations=count)
+            elif status in ("completed", "pending"):
+                add(index, **{f"{status}_payments": count, f"{status}_amount": amount})
+
+        with self._lock:
+            self._queries += 1
+        return {index: Bucket(**values) for index, values in totals.items()}
+
+    def invalidate(self, *moments: Optional[datetime]) -> None:
+        """Drop the cached buckets, at every granularity, that contain any of these times."""
+        with self._lock:
+            self._generation += 1
+        for moment in moments:
+            if moment is None:
+                continue
+            for granularity in BUCKET_SECONDS:
+                self._cache.pop((granularity, bucket_index(granularity, moment)))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            served = self._hits + self._computed
+            return {
+                "cached_buckets": len(self._cache),
+                "bucket_hits": self._hits,
+                "buckets_computed": self._computed,
+                "hit_rate": round(self._hits / served, 3) if served else 0.0,
+                "queries": self._queries,
+            }
+
+
+revenue_analytics = RevenueAnalytics()
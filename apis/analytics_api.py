@@ -0,0 +1,92 @@
+from datetime import datetime, timedelta
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from analytics import Granularity, revenue_analytics
+from archive import ride_archive
+from database import get_db
+from heatmap import HEATMAP_MAX_CELLS, Bounds, bin_points, demand_heatmap, points_from_db
+from schemas import HeatmapResponse, RevenueAnalyticsResponse
+from utils import require_permission
+
+router = APIRouter(prefix="/analytics", tags=["Analytics"])
+
+
+# ✅ Ride volume, fares, payments and cancellations per hour/day/week (Admin only)
+@router.get("/revenue", response_model=RevenueAnalyticsResponse)
+def get_revenue_analytics(
+    start: datetime,
+    end: Optional[datetime] = None,
+    granularity: Granularity = "day",
+    source: Literal["live", "archive"] = "live",
+    db: Session = Depends(get_db),
+    _: str = Depends(require_permission("view_all_payments")),
+):
+    end = end or datetime.utcnow()
+    if source == "archive":
+        # 🔥 Parquet scan off the OLTP database; rides that ended after the watermark are not in it yet
+        if ride_archive is None:
+            raise HTTPException(status_code=503, detail="Ride archive is not configured (set ARCHIVE_DIR)")
+        try:
+            buckets = ride_archive.revenue_series(granularity, start, end)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+        return {"granularity": granularity, "source": source,
+                "archived_through": ride_archive.watermark(), "buckets": buckets}
+
+    try:
+        buckets = revenue_analytics.series(db, granularity, start, end)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return {"granularity": granularity, "source": source, "buckets": buckets}
+
+
+# ✅ Where bookings start or end, binned into a lat/lon grid (Admin only)
+@router.get("/heatmap", response_model=HeatmapResponse)
+def get_demand_heatmap(
+    kind: Literal["pickup", "dropoff"] = "pickup",
+    minutes: int = Query(60, ge=1, description="Window length when start is not given"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    rows: int = Query(50, ge=1, le=HEATMAP_MAX_CELLS),
+    cols: int = Query(50, ge=1, le=HEATMAP_MAX_CELLS),
+    min_lat: Optional[float] = Query(None, ge=-90, le=90),
+    max_lat: Optional[float] = Query(None, ge=-90, le=90),
+    min_lon: Optional[float] = Query(None, ge=-180, le=180),
+    max_lon: Optional[float] = Query(None, ge=-180, le=180),
+    db: Session = Depends(get_db),
+    _: str = Depends(require_permission("view_all_bookings")),
+):
+    box = (min_lat, max_lat, min_lon, max_lon)
+    if any(v is not None for v in box) and None in box:
+        raise HTTPException(status_code=400, detail="Give all four bounds or none")
+    bounds = Bounds(*box) if min_lat is not None else None
+    if bounds and (bounds.min_lat >= bounds.max_lat or bounds.min_lon >= bounds.max_lon):
+        raise HTTPException(status_code=400, detail="Bounds must have min < max")
+
+    now = datetime.utcnow()
+    end = end or now
+    start = start or end - timedelta(minutes=minutes)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start is after end")
+
+    # 🔥 Recent windows come from memory; older ones from Bookings
+    if demand_heatmap.covers(start, now):
+        source, points = "memory", demand_heatmap.points(start, end)
+    else:
+        source, points = "database", points_from_db(db, start, end)
+
+    counts, bounds = bin_points(points, kind, rows, cols, bounds)
+    return {
+        "kind": kind,
+        "source": source,
+        "start": start,
+        "end": end,
+        "rows": rows,
+        "cols": cols,
+        "bounds": bounds._asdict() if bounds else None,
+        "total": int(counts.sum()),
+        "counts": counts.tolist(),
+    }
@@ -1,70 +1,215 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import asyncio
+import json
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, WebSocket, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import exists, insert, literal, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy.exc import IntegrityError
 from typing import List, Optional
 from datetime import datetime
 
-from database import get_db
-from models import Booking, Ride, Payment, Role, User, Driver
+from starlette.concurrency import run_in_threadpool
+
+from analytics import revenue_analytics
+from bookings import accept_booking_statement, booking_transition, publish_booking_status
+from database import SessionLocal, get_db, get_async_db
+from driver_stats import ride_rating_values, ride_started_statement
+from events import (
+    AVAILABLE_BOOKINGS_TOPIC, broker, driver_topic, parse_last_event_id, sse_stream, user_topic,
+)
+from fares import fare_engine
+from heatmap import demand_heatmap
+from pagination import PageParams, paginate, paginate_async, paginate_union
+from ratings import record_rating
+from models import ArchivedBooking, Booking, Ride, Payment, Driver
 from schemas import BookingCreate, BookingResponse, PaymentResponse
-from utils import get_current_user, require_permission
+from spatial import driver_index, sync_driver
+from surge import surge_engine
+from utils import (
+    get_current_principal, require_permission, Principal, get_auth_context, AuthContext,
+    resolve_auth_context, token_from_connection,
+)
 
 router = APIRouter(prefix="/bookings", tags=["Bookings"])
 
+_bookings = Booking.__table__
+
+
+# Worst case for a successful end_ride: booking transition, ride read, ride
+# update, two rating updates, driver release (with its dashboard totals) and
+# payment insert
+END_RIDE_MAX_STATEMENTS = 7
+
+
+def pending_payment_statement(booking, now: datetime):
+    """INSERT ... SELECT of the booking's pending cash payment, skipped if one exists."""
+    payments = Payment.__table__
+    values = select(
+        literal(booking.booking_id),
+        literal(booking.user_id),
+        literal(booking.fare_estimate),
+        literal("cash"),
+        literal(f"TXN-{booking.booking_id}-{int(now.timestamp())}"),
+        literal("pending"),
+        literal(now),
+    ).where(~exists().where(payments.c.booking_id == booking.booking_id))
+    return insert(payments).from_select(
+        ["booking_id", "user_id", "amount", "payment_method", "transaction_id", "status", "timestamp"],
+        values,
+    )
+
+
+def _accept_conflict(booking: Optional[Booking]) -> HTTPException:
+    """Why a driver could not take `booking`: someone else has it, or it is gone."""
+    if booking and booking.driver_id is not None and booking.status != "cancelled":
+        return HTTPException(status_code=409, detail="Booking already accepted by another driver")
+    return HTTPException(status_code=400, detail="Booking not available")
+
+
+def _publish_status(booking: Booking) -> None:
+    publish_booking_status(
+        booking.booking_id, booking.user_id, booking.driver_id, booking.status, booking.fare_estimate
+    )
+
+
+def _socket_identity(token: str):
+    """(user_id, driver_id or None) for a WebSocket token, on a short-lived session."""
+    with SessionLocal() as db:
+        principal = get_current_principal(token, db)
+        driver_id = db.scalar(select(Driver.driver_id).where(Driver.user_id == principal.user_id))
+    return principal.user_id, driver_id
+
 
 # ✅ 1️⃣ Create Booking (User)
 @router.post("/", response_model=BookingResponse, status_code=status.HTTP_201_CREATED)
-def create_booking(
+async def create_booking(
     booking_data: BookingCreate,
-    db: Session = Depends(get_db),
-    current_user=Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user=Depends(get_current_principal),
     _: str = Depends(require_permission("create_booking")),
 ):
     if current_user.user_id != booking_data.user_id:
         raise HTTPException(status_code=403, detail="You can only create bookings for yourself")
 
+    # 💰 Price trips with both ends known on the server; the client's figure is only a fallback
+    fare = booking_data.fare_estimate
+    trip = (booking_data.pickup_latitude, booking_data.pickup_longitude,
+            booking_data.dropoff_latitude, booking_data.dropoff_longitude)
+    if None not in trip:
+        fare = (await fare_engine.aquote(*trip)).fare
+
     new_booking = Booking(
         user_id=booking_data.user_id,
         pickup_location=booking_data.pickup_location,
         dropoff_location=booking_data.dropoff_location,
+        pickup_latitude=booking_data.pickup_latitude,
+        pickup_longitude=booking_data.pickup_longitude,
+        dropoff_latitude=booking_data.dropoff_latitude,
+        dropoff_longitude=booking_data.dropoff_longitude,
         pickup_time=booking_data.pickup_time,
-        fare_estimate=booking_data.fare_estimate,
+        fare_estimate=fare,
         status="requested",
         created_at=datetime.utcnow()
     )
     db.add(new_booking)
-    db.commit()
-    db.refresh(new_booking)
+    await db.commit()
+    await db.refresh(new_booking)
+    broker.publish(
+        AVAILABLE_BOOKINGS_TOPIC, "booking.created",
+        {column.key: getattr(new_booking, column.key) for column in Booking.__table__.columns},
+    )
+    demand_heatmap.record(new_booking.created_at, *trip)
+    if trip[0] is not None and trip[1] is not None:
+        surge_engine.record_request(trip[0], trip[1])  # 📈 demand for the pickup zone's surge
     return new_booking
 
 # ✅ 4️⃣ View Available Bookings (Drivers)
 @router.get("/available", response_model=List[BookingResponse])
-def get_available_bookings(
-    db: Session = Depends(get_db),
+async def get_available_bookings(
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    page: PageParams = Depends(),
     _: str = Depends(require_permission("view_available_bookings")),
 ):
-    return db.query(Booking).filter(Booking.status == "requested").all()
+    statement = select(Booking).where(Booking.status == "requested")
+    return await paginate_async(db, statement, Booking.booking_id, page, response)
+
+
+# ✅ Live feed of available-booking deltas (Server-Sent Events)
+@router.get("/available/stream")
+async def stream_available_bookings(request: Request):
+    # EventSource cannot send headers, so ?token= is accepted too; auth runs on
+    # a short-lived session so idle streams hold no DB connection
+    token = token_from_connection(request)
+    if not token:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    auth = await run_in_threadpool(resolve_auth_context, token)
+    if not auth.has_permission("view_available_bookings"):
+        raise HTTPException(status_code=403, detail="User lacks permission: 'view_available_bookings'")
+
+    last_event_id = parse_last_event_id(
+        request.headers.get("last-event-id") or request.query_params.get("last_event_id")
+    )
+    return StreamingResponse(
+        sse_stream(AVAILABLE_BOOKINGS_TOPIC, last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# ✅ Live status of my bookings (WebSocket)
+@router.websocket("/ws")
+async def booking_status_socket(websocket: WebSocket):
+    # Pushes every transition of the caller's bookings, as rider and as driver,
+    # so clients need not poll; ?token= because browsers cannot set headers here
+    token = token_from_connection(websocket)
+    try:
+        if not token:
+            raise HTTPException(status_code=401, detail="Not authenticated")
+        user_id, driver_id = await run_in_threadpool(_socket_identity, token)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    topics = [user_topic(user_id)]
+    if driver_id is not None:
+        topics.append(driver_topic(driver_id))
+    await websocket.accept()
+    sub = broker.subscribe(
+        *topics, last_event_id=parse_last_event_id(websocket.query_params.get("last_event_id"))
+    )
+
+    async def pump():
+        while True:
+            event_id, event, payload = await sub.get()
+            await websocket.send_text(f'{{"id":{event_id},"event":{json.dumps(event)},"data":{payload}}}')
+
+    sender = asyncio.create_task(pump())
+    try:
+        # Clients have nothing to say; reading only notices the disconnect
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+    finally:
+        sender.cancel()
+        broker.unsubscribe(sub)
 
 # ✅ 2️⃣ Get Booking by ID
 @router.get("/{booking_id}", response_model=BookingResponse)
 def get_booking(
     booking_id: int,
     db: Session = Depends(get_db),
-    current_user=Depends(get_current_user),
+    auth: AuthContext = Depends(get_auth_context),
 ):
     booking = db.query(Booking).filter(Booking.booking_id == booking_id).first()
     if not booking:
         raise HTTPException(status_code=404, detail="Booking not found")
 
     # Check if user has admin permission
-    try:
-        _ = require_permission("view_all_bookings")(current_user, db)
-        is_admin = True
-    except Exception:
-        is_admin = False
+    is_admin = auth.has_permission("view_all_bookings")
 
-    if not is_admin and booking.user_id != current_user.user_id:
-        driver = db.query(Driver).join(User).filter(User.user_id == current_user.user_id).first()
+    if not is_admin and booking.user_id != auth.user_id:
+        driver = db.query(Driver).filter(Driver.user_id == auth.user_id).first()
         if not driver or booking.driver_id != driver.driver_id:
             raise HTTPException(status_code=403, detail="Not authorized to view this booking")
 
@@ -74,65 +219,88 @@ def get_booking(
 # ✅ 3️⃣ Get All Bookings (Admin)
 @router.get("/", response_model=List[BookingResponse])
 def get_all_bookings(
+    response: Response,
     db: Session = Depends(get_db),
+    page: PageParams = Depends(),
     _: str = Depends(require_permission("view_all_bookings")),
 ):
-    return db.query(Booking).all()
+    query = db.query(Booking)
+    return paginate(query, Booking.booking_id, page, response)
 
 
 
 
 # ✅ 5️⃣ Driver Accepts Booking & Proposes Fare
 @router.put("/{booking_id}/accept", response_model=BookingResponse)
-def accept_booking_with_fare(
+async def accept_booking_with_fare(
     booking_id: int,
-    proposed_fare: float,
-    db: Session = Depends(get_db),
-    current_user=Depends(get_current_user),
+    proposed_fare: Optional[float] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user=Depends(get_current_principal),
     _: str = Depends(require_permission("accept_booking")),
 ):
-    driver = db.query(Driver).join(User).filter(User.user_id == current_user.user_id).first()
+    result = await db.execute(select(Driver).where(Driver.user_id == current_user.user_id))
+    driver = result.scalars().first()
     if not driver:
         raise HTTPException(status_code=404, detail="Driver profile not found")
 
-    booking = db.query(Booking).filter(Booking.booking_id == booking_id, Booking.status == "requested").first()
-    if not booking:
-        raise HTTPException(status_code=400, detail="Booking not available")
-
-    try:
-        booking.driver_id = driver.driver_id
-        booking.status = "pending_user_confirmation"
-        booking.fare_estimate = proposed_fare
-        db.commit()
-        db.refresh(booking)
-    except IntegrityError:
-        db.rollback()
-        raise HTTPException(status_code=409, detail="Booking already accepted by another driver")
-
+    # Losers usually find out from a plain read, without queueing for the write lock
+    booking = await db.get(Booking, booking_id)
+    if not booking or booking.status != "requested":
+        raise _accept_conflict(booking)
+
+    # 💰 No proposal: take the trip at the current quote, surge included
+    if proposed_fare is None:
+        proposed_fare = booking.fare_estimate
+        trip = (booking.pickup_latitude, booking.pickup_longitude,
+                booking.dropoff_latitude, booking.dropoff_longitude)
+        if None not in trip:
+            proposed_fare = (await fare_engine.aquote(*trip)).fare
+
+    # ⚔️ Drivers race here: the conditional UPDATE picks exactly one winner
+    result = await db.execute(accept_booking_statement(booking_id, driver.driver_id, proposed_fare))
+    if result.rowcount != 1:
+        await db.rollback()
+        raise _accept_conflict(await db.get(Booking, booking_id))
+
+    # 🚗 Busy until the ride ends or the booking is cancelled
+    driver.is_available = False
+    await db.commit()
+    driver_index.remove(driver.driver_id)
+    broker.publish(AVAILABLE_BOOKINGS_TOPIC, "booking.taken", {"booking_id": booking_id, "driver_id": driver.driver_id})
+    await db.refresh(booking)
+    _publish_status(booking)
     return booking
 
 
 # ✅ 6️⃣ User Confirms Fare
 @router.put("/{booking_id}/confirm", response_model=BookingResponse)
-def confirm_booking_fare(
+async def confirm_booking_fare(
     booking_id: int,
-    db: Session = Depends(get_db),
-    current_user=Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user=Depends(get_current_principal),
     _: str = Depends(require_permission("confirm_booking")),
 ):
-    booking = db.query(Booking).filter(Booking.booking_id == booking_id).first()
-    if not booking:
-        raise HTTPException(status_code=404, detail="Booking not found")
-
-    if booking.user_id != current_user.user_id:
-        raise HTTPException(status_code=403, detail="You can only confirm your own bookings")
-
-    if booking.status != "pending_user_confirmation":
+    result = await db.execute(
+        booking_transition(
+            booking_id,
+            Booking.user_id == current_user.user_id,
+            Booking.status == "pending_user_confirmation",
+            status="accepted",
+        )
+    )
+    if result.rowcount != 1:
+        await db.rollback()
+        booking = await db.get(Booking, booking_id)
+        if not booking:
+            raise HTTPException(status_code=404, detail="Booking not found")
+        if booking.user_id != current_user.user_id:
+            raise HTTPException(status_code=403, detail="You can only confirm your own bookings")
         raise HTTPException(status_code=400, detail="Booking not awaiting confirmation")
 
-    booking.status = "accepted"
-    db.commit()
-    db.refresh(booking)
+    await db.commit()
+    booking = await db.get(Booking, booking_id)
+    _publish_status(booking)
     return booking
 
 
@@ -140,10 +308,13 @@ def confirm_booking_fare(
 @router.get("/driver/{driver_id}/accepted", response_model=List[BookingResponse])
 def accepted_bookings_for_driver(
     driver_id: int,
+    response: Response,
     db: Session = Depends(get_db),
+    page: PageParams = Depends(),
     _: str = Depends(require_permission("view_driver_bookings")),
 ):
-    return db.query(Booking).filter(Booking.driver_id == driver_id, Booking.status == "accepted").all()
+    query = db.query(Booking).filter(Booking.driver_id == driver_id, Booking.status == "accepted")
+    return paginate(query, Booking.booking_id, page, response)
 
 
 # ✅ 8️⃣ Cancel Booking
@@ -151,19 +322,32 @@ def accepted_bookings_for_driver(
 def cancel_booking(
     booking_id: int,
     db: Session = Depends(get_db),
-    current_user=Depends(get_current_user),
+    current_user=Depends(get_current_principal),
     _: str = Depends(require_permission("cancel_booking")),
 ):
-    booking = db.query(Booking).filter(Booking.booking_id == booking_id).first()
-    if not booking:
-        raise HTTPException(status_code=404, detail="Booking not found")
-
-    if booking.status in ["completed", "paid"]:
+    result = db.execute(
+        booking_transition(
+            booking_id,
+            Booking.status.notin_(["completed", "paid"]),
+            status="cancelled",
+        )
+    )
+    if result.rowcount != 1:
+        db.rollback()
+        if not db.get(Booking, booking_id):
+            raise HTTPException(status_code=404, detail="Booking not found")
         raise HTTPException(status_code=400, detail="Cannot cancel a completed or paid booking")
 
-    booking.status = "cancelled"
+    booking = db.get(Booking, booking_id)
+    driver = db.get(Driver, booking.driver_id) if booking.driver_id else None
+    if driver:
+        driver.is_available = True
     db.commit()
-    db.refresh(booking)
+    if driver:
+        sync_driver(driver.driver_id, driver.latitude, driver.longitude, driver.is_available)
+    broker.publish(AVAILABLE_BOOKINGS_TOPIC, "booking.cancelled", {"booking_id": booking_id})
+    revenue_analytics.invalidate(booking.created_at)
+    _publish_status(booking)
     return booking
 
 
@@ -174,23 +358,27 @@ def start_ride(
     db: Session = Depends(get_db),
     _: str = Depends(require_permission("start_ride")),
 ):
-    booking = db.query(Booking).filter(Booking.booking_id == booking_id).first()
-    if not booking or booking.status != "accepted":
+    # One transaction, three statements: the transition (returning the row), the
+    # Ride insert and the driver's dashboard totals
+    booking = db.execute(
+        booking_transition(booking_id, Booking.status == "accepted", status="ongoing").returning(*_bookings.c)
+    ).first()
+    if booking is None:
+        db.rollback()
         raise HTTPException(status_code=400, detail="Booking not ready to start")
 
-    booking.status = "ongoing"
-    new_ride = Ride(
+    db.add(Ride(
         booking_id=booking.booking_id,
         user_id=booking.user_id,
         driver_id=booking.driver_id,
         start_time=datetime.utcnow(),
         distance_travelled=0,
         final_fare=booking.fare_estimate,
-    )
-    db.add(new_ride)
+    ))
+    db.execute(ride_started_statement(booking.driver_id, booking.fare_estimate))
     db.commit()
-    db.refresh(booking)
-    return booking
+    _publish_status(booking)
+    return dict(booking._mapping)
 
 
 # ✅ 🔟 End Ride (Driver)
@@ -204,55 +392,54 @@ def end_ride(
     db: Session = Depends(get_db),
     _: str = Depends(require_permission("end_ride_with_rating")),
 ):
-    ride = db.query(Ride).filter(Ride.booking_id == booking_id).first()
-    booking = db.query(Booking).filter(Booking.booking_id == booking_id).first()
-
-    if not booking or not ride:
+    # One transaction with a fixed statement budget (see END_RIDE_MAX_STATEMENTS)
+    booking = db.execute(
+        booking_transition(booking_id, Booking.status == "ongoing", status="completed").returning(*_bookings.c)
+    ).first()
+    ride = db.query(Ride).filter(Ride.booking_id == booking_id).first() if booking else None
+    if booking is None or ride is None:
+        db.rollback()
+        if booking is None and db.get(Booking, booking_id) is not None:
+            raise HTTPException(status_code=400, detail="Ride is not in progress")
         raise HTTPException(status_code=404, detail="Ride not found")
 
-    ride.end_time = datetime.utcnow()
-    booking.status = "completed"
+    now = datetime.utcnow()
+    ride.end_time = now
+    # The driver's own average moves with the rider's rating, folded into the release below
+    driver_totals = ride_rating_values(ride.rating_by_user, user_rating)
 
+    # ✅ Fold the new ratings into the running averages (O(1), no history scan)
     if user_rating is not None:
+        record_rating(db, ride.rating_by_user, user_rating, driver_id=ride.driver_id)
         ride.rating_by_user = user_rating
         if user_feedback:
             ride.feedback = (ride.feedback or "") + f"\n[User]: {user_feedback}"
     if driver_rating is not None:
+        record_rating(db, ride.rating_by_driver, driver_rating, user_id=ride.user_id)
         ride.rating_by_driver = driver_rating
         if driver_feedback:
             ride.feedback = (ride.feedback or "") + f"\n[Driver]: {driver_feedback}"
 
-    driver = db.query(Driver).filter(Driver.driver_id == booking.driver_id).first()
-    user = db.query(User).filter(User.user_id == booking.user_id).first()
-    db.commit()
+    db.flush()
 
-    # ✅ Update average ratings
-    if driver:
-        all_driver_rides = db.query(Ride).filter(Ride.driver_id == driver.driver_id, Ride.rating_by_user.isnot(None)).all()
-        if all_driver_rides:
-            driver.user.rating = sum(r.rating_by_user for r in all_driver_rides) / len(all_driver_rides)
-
-    if user:
-        all_user_rides = db.query(Ride).filter(Ride.user_id == user.user_id, Ride.rating_by_driver.isnot(None)).all()
-        if all_user_rides:
-            user.rating = sum(r.rating_by_driver for r in all_user_rides) / len(all_user_rides)
-
-    # ✅ Generate Payment (added user_id!)
-    if not db.query(Payment).filter(Payment.booking_id == booking.booking_id).first():
-        payment = Payment(
-            booking_id=booking.booking_id,
-            user_id=booking.user_id,  # ✅ Fix: added user_id
-            amount=booking.fare_estimate,
-            payment_method="cash",
-            transaction_id=f"TXN-{booking.booking_id}-{int(datetime.utcnow().timestamp())}",
-            status="pending",
-            timestamp=datetime.utcnow(),
-        )
-        db.add(payment)
+    # 🚗 Free the driver and count the ride; the returned position re-enters the
+    # nearest-driver grid after commit
+    driver = db.execute(
+        update(Driver)
+        .where(Driver.driver_id == booking.driver_id)
+        .values(is_available=True, completed_rides=Driver.completed_rides + 1, **driver_totals)
+        .returning(Driver.driver_id, Driver.latitude, Driver.longitude)
+        .execution_options(synchronize_session=False)
+    ).first()
 
+    # ✅ Generate Payment unless one already exists, in the same statement
+    db.execute(pending_payment_statement(booking, now))
     db.commit()
-    db.refresh(booking)
-    return booking
+
+    if driver:
+        sync_driver(driver.driver_id, driver.latitude, driver.longitude, True)
+    _publish_status(booking)
+    return dict(booking._mapping)
 
 
 # ✅ 11️⃣ View Payment
@@ -289,54 +476,81 @@ def complete_payment(
     if payment.status == "completed":
         raise HTTPException(status_code=400, detail="Payment already completed")
 
+    raised_at = payment.timestamp
     payment.status = "completed"
     booking.status = "paid"
     payment.timestamp = datetime.utcnow()
 
     db.commit()
+    revenue_analytics.invalidate(raised_at)  # its pending amount leaves that bucket
     db.refresh(payment)
     return payment
 
 
 # ✅ 13️⃣ Filtered Listings
+HISTORY_QUERY = Query(False, description="Also list finished bookings moved to the archive tables")
+
+
+def _bookings_page(db: Session, criteria, history: bool, page: PageParams, response: Response) -> list:
+    """Keyset page of the bookings matching criteria(model); with history, archived ones are merged in by id."""
+    models = (Booking, ArchivedBooking) if history else (Booking,)
+    sources = [(db.query(model).filter(criteria(model)), model.booking_id) for model in models]
+    return paginate_union(sources, page, response)
+
+
 # ✅ Allow logged-in user to see their own bookings
 @router.get("/user/me", response_model=List[BookingResponse])
 def my_bookings(
+    response: Response,
+    history: bool = HISTORY_QUERY,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    page: PageParams = Depends(),
+    current_user: Principal = Depends(get_current_principal),
 ):
-    return db.query(Booking).filter(Booking.user_id == current_user.user_id).all()
+    return _bookings_page(db, lambda m: m.user_id == current_user.user_id, history, page, response)
 
 
 @router.get("/user/{user_id}", response_model=List[BookingResponse])
 def bookings_by_user(
     user_id: int,
+    response: Response,
+    history: bool = HISTORY_QUERY,
     db: Session = Depends(get_db),
+    page: PageParams = Depends(),
     _: str = Depends(require_permission("view_user_bookings")),
 ):
-    return db.query(Booking).filter(Booking.user_id == user_id).all()
+    return _bookings_page(db, lambda m: m.user_id == user_id, history, page, response)
 
 
 @router.get("/driver/{driver_id}", response_model=List[BookingResponse])
 def bookings_by_driver(
     driver_id: int,
+    response: Response,
+    history: bool = HISTORY_QUERY,
     db: Session = Depends(get_db),
+    page: PageParams = Depends(),
     _: str = Depends(require_permission("view_driver_bookings")),
 ):
-    return db.query(Booking).filter(Booking.driver_id == driver_id).all()
+    return _bookings_page(db, lambda m: m.driver_id == driver_id, history, page, response)
 
 
 @router.get("/ongoing", response_model=List[BookingResponse])
 def ongoing_bookings(
+    response: Response,
     db: Session = Depends(get_db),
+    page: PageParams = Depends(),
     _: str = Depends(require_permission("view_all_bookings")),
 ):
-    return db.query(Booking).filter(Booking.status == "ongoing").all()
+    query = db.query(Booking).filter(Booking.status == "ongoing")
+    return paginate(query, Booking.booking_id, page, response)
 
 
 @router.get("/completed", response_model=List[BookingResponse])
 def completed_bookings(
+    response: Response,
     db: Session = Depends(get_db),
+    page: PageParams = Depends(),
     _: str = Depends(require_permission("view_all_bookings")),
 ):
-    return db.query(Booking).filter(Booking.status == "completed").all()
+    query = db.query(Booking).filter(Booking.status == "completed")
+    return paginate(query, Booking.booking_id, page, response)
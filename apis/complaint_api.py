@@ -1,12 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.orm import Session
 from datetime import datetime
 from typing import List
 
 from database import get_db
+from pagination import PageParams, paginate
 from models import Complaint, Ride
 from schemas import ComplaintCreate, ComplaintResponse
-from utils import get_current_user, require_permission
+from utils import get_current_principal, require_permission, get_auth_context, AuthContext
 
 router = APIRouter(prefix="/complaints", tags=["Complaints"])
 
@@ -16,7 +17,7 @@ router = APIRouter(prefix="/complaints", tags=["Complaints"])
 def create_complaint(
     complaint_data: ComplaintCreate,
     db: Session = Depends(get_db),
-    current_user=Depends(get_current_user),
+    current_user=Depends(get_current_principal),
     _: str = Depends(require_permission("create_complaint")),
 ):
     # Ensure the user creates a complaint for their own ride
@@ -50,20 +51,16 @@ def create_complaint(
 def get_complaint(
     complaint_id: int,
     db: Session = Depends(get_db),
-    current_user=Depends(get_current_user),
+    auth: AuthContext = Depends(get_auth_context),
 ):
     complaint = db.query(Complaint).filter(Complaint.complaint_id == complaint_id).first()
     if not complaint:
         raise HTTPException(status_code=404, detail="Complaint not found")
 
     # Admins have view_all_complaints permission
-    try:
-        _ = require_permission("view_all_complaints")(current_user, db)
-        is_admin = True
-    except Exception:
-        is_admin = False
+    is_admin = auth.has_permission("view_all_complaints")
 
-    if not is_admin and complaint.user_id != current_user.user_id:
+    if not is_admin and complaint.user_id != auth.user_id:
         raise HTTPException(status_code=403, detail="Not authorized to view this complaint")
 
     return complaint
@@ -72,30 +69,32 @@ def get_complaint(
 # ✅ 3️⃣ Get All Complaints (Admin only)
 @router.get("/", response_model=List[ComplaintResponse])
 def get_all_complaints(
+    response: Response,
     db: Session = Depends(get_db),
+    page: PageParams = Depends(),
     _: str = Depends(require_permission("view_all_complaints")),
 ):
-    return db.query(Complaint).all()
+    query = db.query(Complaint)
+    return paginate(query, Complaint.complaint_id, page, response)
 
 
 # ✅ 4️⃣ Get Complaints by User (User or Admin)
 @router.get("/user/{user_id}", response_model=List[ComplaintResponse])
 def get_complaints_by_user(
     user_id: int,
+    response: Response,
     db: Session = Depends(get_db),
-    current_user=Depends(get_current_user),
+    page: PageParams = Depends(),
+    auth: AuthContext = Depends(get_auth_context),
 ):
     # Allow admin (with view_all_complaints) or self
-    try:
-        _ = require_permission("view_all_complaints")(current_user, db)
-        is_admin = True
-    except Exception:
-        is_admin = False
+    is_admin = auth.has_permission("view_all_complaints")
 
-    if not is_admin and current_user.user_id != user_id:
+    if not is_admin and auth.user_id != user_id:
         raise HTTPException(status_code=403, detail="Not authorized to view these complaints")
 
-    return db.query(Complaint).filter(Complaint.user_id == user_id).all()
+    query = db.query(Complaint).filter(Complaint.user_id == user_id)
+    return paginate(query, Complaint.complaint_id, page, response)
 
 
 # ✅ 5️⃣ Resolve Complaint (Admin only)
@@ -124,20 +123,16 @@ def resolve_complaint(
 def delete_complaint(
     complaint_id: int,
     db: Session = Depends(get_db),
-    current_user=Depends(get_current_user),
+    auth: AuthContext = Depends(get_auth_context),
 ):
     complaint = db.query(Complaint).filter(Complaint.complaint_id == complaint_id).first()
     if not complaint:
         raise HTTPException(status_code=404, detail="Complaint not found")
 
     # Admins can delete all
-    try:
-        _ = require_permission("delete_complaint")(current_user, db)
-        is_admin = True
-    except Exception:
-        is_admin = False
+    is_admin = auth.has_permission("delete_complaint")
 
-    if not is_admin and complaint.user_id != current_user.user_id:
+    if not is_admin and complaint.user_id != auth.user_id:
         raise HTTPException(status_code=403, detail="Not authorized to delete this complaint")
 
     db.delete(complaint)
@@ -1,50 +1,68 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
-from datetime import date
-from passlib.hash import bcrypt
-from sqlalchemy import func
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy.orm import Session, joinedload
+from typing import List, Union
+from datetime import date, datetime, timezone
+from starlette.concurrency import run_in_threadpool
 from database import get_db
+from driver_stats import average_rating
+from location_ingest import LOCATION_BATCH_MAX_POINTS, location_buffer
+from pagination import PageParams, paginate
 from models import Driver, Vehicle, Payment, User,Ride
 from schemas import (
     DriverCreate,
     DriverResponse,
     DriverUpdate,
+    DriverLocationUpdate,
+    DriverLocationResponse,
+    LocationPoint,
+    LocationIngestResponse,
+    NearbyDriverResponse,
     VehicleResponse,
     PaymentResponse,
 )
-from utils import get_current_user, require_permission, hash_password
+from spatial import NEAREST_MAX_RADIUS_KM, driver_index, sync_driver
+from utils import (
+    require_permission, hash_password_async, invalidate_principal,
+    get_auth_context, get_current_principal, AuthContext,
+    TTLCache, PRINCIPAL_CACHE_SIZE, PRINCIPAL_CACHE_TTL_SECONDS,
+)
 
 router = APIRouter(prefix="/drivers", tags=["Drivers"])
 
+# user_id -> driver_id, so location pings skip the Drivers lookup
+_driver_ids = TTLCache(PRINCIPAL_CACHE_SIZE, PRINCIPAL_CACHE_TTL_SECONDS)
+
 
 # ✅ Create a new driver (includes user creation)
 @router.post("/", response_model=DriverResponse)
-def create_driver(driver_data: DriverCreate, db: Session = Depends(get_db)):
-    # 1️⃣ Create user entry
-    new_user = User(
-        name=driver_data.name,
-        email=driver_data.email,
-        phone_number=driver_data.phone_number,
-        password=hash_password(driver_data.password),
-        created_at=date.today(),
-        role_id=2,  # 🚗 driver role
-    )
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
-
-    # 2️⃣ Create driver extension
-    new_driver = Driver(
-        user_id=new_user.user_id,
-        license=driver_data.license,
-        experience_years=driver_data.experience_years or 0,
-    )
-    db.add(new_driver)
-    db.commit()
-    db.refresh(new_driver)
-
-    return new_driver
+async def create_driver(driver_data: DriverCreate, db: Session = Depends(get_db)):
+    # bcrypt runs on the password pool; DB work stays on the request threadpool
+    hashed_password = await hash_password_async(driver_data.password)
+
+    def insert_driver() -> DriverResponse:
+        # 1️⃣ User entry and 2️⃣ driver extension, flushed together in one transaction
+        new_user = User(
+            name=driver_data.name,
+            email=driver_data.email,
+            phone_number=driver_data.phone_number,
+            password=hashed_password,
+            created_at=date.today(),
+            role_id=2,  # 🚗 driver role
+        )
+        new_driver = Driver(
+            user=new_user,
+            license=driver_data.license,
+            experience_years=driver_data.experience_years or 0,
+        )
+        db.add(new_driver)
+        db.flush()
+        # Serialize from the flushed values: after commit they are expired and
+        # reading them would reload both rows outside the transaction
+        response = DriverResponse.model_validate(new_driver, from_attributes=True)
+        db.commit()
+        return response
+
+    return await run_in_threadpool(insert_driver)
 
 @router.get("/by_user/{user_id}", response_model=DriverResponse)
 def get_driver_by_user_id(user_id: int, db: Session = Depends(get_db)):
@@ -54,25 +72,76 @@ def get_driver_by_user_id(user_id: int, db: Session = Depends(get_db)):
     return driver
 
 
+# ✅ High-rate GPS ingestion: single point or a batch, flushed in group commits
+@router.post("/locations", response_model=LocationIngestResponse, status_code=status.HTTP_202_ACCEPTED)
+async def ingest_locations(
+    data: Union[LocationPoint, List[LocationPoint]],
+    db: Session = Depends(get_db),  # the same session auth resolved the principal with
+    auth: AuthContext = Depends(get_auth_context),
+):
+    points = data if isinstance(data, list) else [data]
+    if len(points) > LOCATION_BATCH_MAX_POINTS:
+        raise HTTPException(status_code=413, detail=f"At most {LOCATION_BATCH_MAX_POINTS} points per request")
+
+    # Admin-run fleet gateways may report for any driver; drivers only for themselves
+    if auth.is_admin:
+        if any(point.driver_id is None for point in points):
+            raise HTTPException(status_code=400, detail="driver_id is required for each point")
+        own_driver_id = None
+    else:
+        own_driver_id = _driver_ids.get(auth.user_id)
+        if own_driver_id is None:
+            own_driver_id = await run_in_threadpool(
+                lambda: db.query(Driver.driver_id).filter(Driver.user_id == auth.user_id).scalar()
+            )
+            if own_driver_id is None:
+                raise HTTPException(status_code=404, detail="Driver profile not found")
+            _driver_ids.set(auth.user_id, own_driver_id)
+        if any(point.driver_id not in (None, own_driver_id) for point in points):
+            raise HTTPException(status_code=403, detail="Not authorized to report for other drivers")
+
+    now = datetime.utcnow()
+    accepted = location_buffer.record(
+        (point.driver_id or own_driver_id, point.latitude, point.longitude, _naive_utc(point.recorded_at) or now)
+        for point in points
+    )
+    return {"accepted": accepted}
+
+
+def _naive_utc(moment):
+    """Stored timestamps are naive UTC; convert client-supplied aware ones."""
+    if moment is not None and moment.tzinfo is not None:
+        return moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+
+# ✅ Nearest available drivers to a point (answered from the in-memory grid)
+@router.get("/nearby", response_model=List[NearbyDriverResponse])
+def get_nearby_drivers(
+    latitude: float = Query(..., ge=-90, le=90),
+    longitude: float = Query(..., ge=-180, le=180),
+    k: int = Query(10, ge=1, le=100),
+    radius_km: float = Query(NEAREST_MAX_RADIUS_KM, gt=0, le=100),
+    current_user=Depends(get_current_principal),
+):
+    return driver_index.nearest(latitude, longitude, k, radius_km)
+
+
 # ✅ Get a specific driver (Admin or the driver themselves)
 @router.get("/{driver_id}", response_model=DriverResponse)
 def get_driver(
     driver_id: int,
     db: Session = Depends(get_db),
-    current_user=Depends(get_current_user),
+    auth: AuthContext = Depends(get_auth_context),
 ):
     driver = db.query(Driver).filter(Driver.driver_id == driver_id).first()
     if not driver:
         raise HTTPException(status_code=404, detail="Driver not found")
 
     # Admins can view any; drivers can view their own record
-    try:
-        _ = require_permission("view_all_drivers")(current_user, db)
-        is_admin = True
-    except Exception:
-        is_admin = False
+    is_admin = auth.has_permission("view_all_drivers")
 
-    if not is_admin and driver.user.email != current_user.email:
+    if not is_admin and driver.user_id != auth.user_id:
         raise HTTPException(status_code=403, detail="Not authorized to view this driver")
 
     return driver
@@ -81,42 +150,23 @@ def get_driver(
 def get_driver_dashboard(
     driver_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    auth: AuthContext = Depends(get_auth_context),
 ):
     driver = db.query(Driver).filter(Driver.driver_id == driver_id).first()
     if not driver:
         raise HTTPException(status_code=404, detail="Driver profile not found")
 
     # 🧠 Only the driver or admin can view this dashboard
-    try:
-        _ = require_permission("view_all_drivers")(current_user, db)
-        is_admin = True
-    except Exception:
-        is_admin = False
+    is_admin = auth.has_permission("view_all_drivers")
 
-    if not is_admin and driver.user_id != current_user.user_id:
+    if not is_admin and driver.user_id != auth.user_id:
         raise HTTPException(status_code=403, detail="Not authorized to view this dashboard")
 
-    # 📊 Dashboard data
-    total_rides = db.query(Ride).filter(Ride.driver_id == driver.driver_id).count()
-    completed_rides = db.query(Ride).filter(
-        Ride.driver_id == driver.driver_id, Ride.end_time.isnot(None)
-    ).count()
-    total_earnings = (
-        db.query(func.sum(Ride.final_fare))
-        .filter(Ride.driver_id == driver.driver_id)
-        .scalar()
-        or 0
-    )
-    avg_rating = (
-        db.query(func.avg(Ride.rating_by_user))
-        .filter(Ride.driver_id == driver.driver_id)
-        .scalar()
-        or 0
-    )
-
+    # 📊 Totals come from the driver row (see driver_stats.py); recent rides
+    # and their bookings from one joined query
     recent_rides = (
         db.query(Ride)
+        .options(joinedload(Ride.booking))
         .filter(Ride.driver_id == driver.driver_id)
         .order_by(Ride.start_time.desc())
         .limit(5)
@@ -125,10 +175,10 @@ def get_driver_dashboard(
 
     return {
         "driver_id": driver.driver_id,
-        "total_rides": total_rides,
-        "completed_rides": completed_rides,
-        "total_earnings": total_earnings,
-        "avg_rating": round(avg_rating, 1),
+        "total_rides": driver.total_rides,
+        "completed_rides": driver.completed_rides,
+        "total_earnings": driver.total_earnings,
+        "avg_rating": average_rating(driver),
         "recent_rides": [
             {
                 "ride_id": r.ride_id,
@@ -144,80 +194,99 @@ def get_driver_dashboard(
 # ✅ Get all drivers (Admin only)
 @router.get("/", response_model=List[DriverResponse])
 def get_all_drivers(
+    response: Response,
     db: Session = Depends(get_db),
+    page: PageParams = Depends(),
     _: str = Depends(require_permission("view_all_drivers")),
 ):
-    return db.query(Driver).all()
+    query = db.query(Driver)
+    return paginate(query, Driver.driver_id, page, response)
+
+
+async def _update_driver(
+    driver_id: int, data: DriverUpdate, db: Session, auth: AuthContext, forbidden: str
+) -> DriverResponse:
+    """Apply driver or user fields; DB work on the request threadpool, bcrypt on the password pool."""
+    def load() -> Driver:
+        driver = db.query(Driver).options(joinedload(Driver.user)).filter(Driver.driver_id == driver_id).first()
+        if not driver:
+            raise HTTPException(status_code=404, detail="Driver not found")
+
+        is_admin = auth.has_permission("update_driver")
+
+        if not is_admin and driver.user_id != auth.user_id:
+            raise HTTPException(status_code=403, detail=forbidden)
+        return driver
+
+    driver = await run_in_threadpool(load)
+    values = data.dict(exclude_unset=True)
+    if "password" in values:
+        values["password"] = await hash_password_async(values["password"])
+
+    def apply() -> DriverResponse:
+        # Update driver or user fields
+        for key, value in values.items():
+            if key == "password":
+                setattr(driver.user, key, value)
+            elif hasattr(driver, key):
+                setattr(driver, key, value)
+            elif hasattr(driver.user, key):
+                setattr(driver.user, key, value)
+
+        db.commit()
+        invalidate_principal(driver.user_id)
+        db.refresh(driver)
+        # Serialize here: the user row is expired too and must not load on the event loop
+        return DriverResponse.model_validate(driver, from_attributes=True)
+
+    return await run_in_threadpool(apply)
 
 
 # ✅ Update driver (Admin or driver themselves)
 @router.put("/{driver_id}", response_model=DriverResponse)
-def update_driver(
+async def update_driver(
     driver_id: int,
     data: DriverUpdate,
     db: Session = Depends(get_db),
-    current_user=Depends(get_current_user),
+    auth: AuthContext = Depends(get_auth_context),
 ):
-    driver = db.query(Driver).filter(Driver.driver_id == driver_id).first()
-    if not driver:
-        raise HTTPException(status_code=404, detail="Driver not found")
-
-    try:
-        _ = require_permission("update_driver")(current_user, db)
-        is_admin = True
-    except Exception:
-        is_admin = False
-
-    if not is_admin and driver.user.email != current_user.email:
-        raise HTTPException(status_code=403, detail="Not authorized to update this driver")
-
-    # Update driver or user fields
-    for key, value in data.dict(exclude_unset=True).items():
-        if key == "password":
-            value = bcrypt.hash(value)
-            setattr(driver.user, key, value)
-        elif hasattr(driver, key):
-            setattr(driver, key, value)
-        elif hasattr(driver.user, key):
-            setattr(driver.user, key, value)
-
-    db.commit()
-    db.refresh(driver)
-    return driver
+    return await _update_driver(driver_id, data, db, auth, "Not authorized to update this driver")
 
 
 # ✅ Partial update (Admin or driver themselves)
 @router.patch("/{driver_id}", response_model=DriverResponse)
-def partial_update_driver(
+async def partial_update_driver(
     driver_id: int,
     data: DriverUpdate,
     db: Session = Depends(get_db),
-    current_user=Depends(get_current_user),
+    auth: AuthContext = Depends(get_auth_context),
 ):
-    driver = db.query(Driver).filter(Driver.driver_id == driver_id).first()
-    if not driver:
-        raise HTTPException(status_code=404, detail="Driver not found")
+    return await _update_driver(driver_id, data, db, auth, "Not authorized to modify this driver")
 
-    try:
-        _ = require_permission("update_driver")(current_user, db)
-        is_admin = True
-    except Exception:
-        is_admin = False
 
-    if not is_admin and driver.user.email != current_user.email:
-        raise HTTPException(status_code=403, detail="Not authorized to modify this driver")
+# ✅ Report position / availability (Admin or the driver themselves)
+@router.put("/{driver_id}/location", response_model=DriverLocationResponse)
+def update_driver_location(
+    driver_id: int,
+    data: DriverLocationUpdate,
+    db: Session = Depends(get_db),
+    auth: AuthContext = Depends(get_auth_context),
+):
+    driver = db.get(Driver, driver_id)
+    if not driver:
+        raise HTTPException(status_code=404, detail="Driver not found")
 
-    for key, value in data.dict(exclude_unset=True).items():
-        if key == "password":
-            value = bcrypt.hash(value)
-            setattr(driver.user, key, value)
-        elif hasattr(driver, key):
-            setattr(driver, key, value)
-        elif hasattr(driver.user, key):
-            setattr(driver.user, key, value)
+    if not auth.has_permission("update_driver") and driver.user_id != auth.user_id:
+        raise HTTPException(status_code=403, detail="Not authorized to update this driver")
 
+    driver.latitude = data.latitude
+    driver.longitude = data.longitude
+    driver.location_updated_at = datetime.utcnow()
+    if data.is_available is not None:
+        driver.is_available = data.is_available
     db.commit()
-    db.refresh(driver)
+
+    sync_driver(driver.driver_id, driver.latitude, driver.longitude, driver.is_available)
     return driver
 
 
@@ -226,24 +295,24 @@ def partial_update_driver(
 def delete_driver(
     driver_id: int,
     db: Session = Depends(get_db),
-    current_user=Depends(get_current_user),
+    auth: AuthContext = Depends(get_auth_context),
 ):
     driver = db.query(Driver).filter(Driver.driver_id == driver_id).first()
     if not driver:
         raise HTTPException(status_code=404, detail="Driver not found")
 
-    try:
-        _ = require_permission("delete_driver")(current_user, db)
-        is_admin = True
-    except Exception:
-        is_admin = False
+    is_admin = auth.has_permission("delete_driver")
 
-    if not is_admin and driver.user.email != current_user.email:
+    if not is_admin and driver.user_id != auth.user_id:
         raise HTTPException(status_code=403, detail="Not authorized to delete this driver")
 
     driver_name = driver.user.name
     db.delete(driver)
     db.commit()
+    invalidate_principal(driver.user_id)
+    _driver_ids.pop(driver.user_id)
+    location_buffer.discard(driver_id)
+    driver_index.remove(driver_id)
     return {"message": f"Driver '{driver_name}' deleted successfully"}
 
 
@@ -251,50 +320,45 @@ def delete_driver(
 @router.get("/{driver_id}/vehicles", response_model=List[VehicleResponse])
 def view_driver_vehicles(
     driver_id: int,
+    response: Response,
     db: Session = Depends(get_db),
-    current_user=Depends(get_current_user),
+    page: PageParams = Depends(),
+    auth: AuthContext = Depends(get_auth_context),
 ):
     driver = db.query(Driver).filter(Driver.driver_id == driver_id).first()
     if not driver:
         raise HTTPException(status_code=404, detail="Driver not found")
 
-    try:
-        _ = require_permission("view_driver_vehicles")(current_user, db)
-        is_admin = True
-    except Exception:
-        is_admin = False
+    is_admin = auth.has_permission("view_driver_vehicles")
 
-    if not is_admin and driver.user.email != current_user.email:
+    if not is_admin and driver.user_id != auth.user_id:
         raise HTTPException(status_code=403, detail="Not authorized to view these vehicles")
 
-    vehicles = db.query(Vehicle).filter(Vehicle.driver_id == driver_id).all()
-    return vehicles
+    query = db.query(Vehicle).filter(Vehicle.driver_id == driver_id)
+    return paginate(query, Vehicle.vehicle_id, page, response)
 
 
 # ✅ View payments (Admin or that driver)
 @router.get("/{driver_id}/payments", response_model=List[PaymentResponse])
 def view_driver_payments(
     driver_id: int,
+    response: Response,
     db: Session = Depends(get_db),
-    current_user=Depends(get_current_user),
+    page: PageParams = Depends(),
+    auth: AuthContext = Depends(get_auth_context),
 ):
     driver = db.query(Driver).filter(Driver.driver_id == driver_id).first()
     if not driver:
         raise HTTPException(status_code=404, detail="Driver not found")
 
-    try:
-        _ = require_permission("view_driver_payments")(current_user, db)
-        is_admin = True
-    except Exception:
-        is_admin = False
+    is_admin = auth.has_permission("view_driver_payments")
 
-    if not is_admin and driver.user.email != current_user.email:
+    if not is_admin and driver.user_id != auth.user_id:
         raise HTTPException(status_code=403, detail="Not authorized to view these payments")
 
-    payments = (
+    query = (
         db.query(Payment)
         .join(Payment.booking)
         .filter(Payment.booking.has(driver_id=driver_id))
-        .all()
     )
-    return payments
+    return paginate(query, Payment.payment_id, page, response)
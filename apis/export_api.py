@@ -0,0 +1,123 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Iterator, Literal, Optional
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import literal_column, select, union_all
+
+from database import engine
+from models import ArchivedBooking, ArchivedPayment, ArchivedRide, Booking, Payment, Ride
+from utils import date_range_filter, require_permission
+
+router = APIRouter(prefix="/exports", tags=["Exports"])
+
+# Rows fetched from the cursor and flushed to the client per chunk
+EXPORT_CHUNK_SIZE = 1000
+
+ExportFormat = Literal["ndjson", "csv"]
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def _json_value(value):
+    return value.isoformat() if hasattr(value, "isoformat") else str(value)
+
+
+def _stream_rows(statement, fmt: ExportFormat) -> Iterator[str]:
+    """Yield encoded chunks from a streaming cursor; memory stays at one chunk."""
+    # The generator owns its connection: it outlives the request's session.
+    with engine.connect() as conn:
+        result = conn.execution_options(
+            stream_results=True, yield_per=EXPORT_CHUNK_SIZE
+        ).execute(statement)
+        columns = list(result.keys())
+
+        if fmt == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(columns)
+            yield buffer.getvalue()
+            for chunk in result.partitions(EXPORT_CHUNK_SIZE):
+                buffer.seek(0)
+                buffer.truncate()
+                writer.writerows(chunk)
+                yield buffer.getvalue()
+        else:
+            for chunk in result.partitions(EXPORT_CHUNK_SIZE):
+                yield "".join(
+                    json.dumps(dict(zip(columns, row)), default=_json_value) + "\n"
+                    for row in chunk
+                )
+
+
+HISTORY_QUERY = Query(True, description="Include finished bookings and their rows moved to the archive tables")
+
+
+def _dump(models, key: str, history: bool, build):
+    """build(model) for the hot table, UNION ALL the archive table with history, ordered by key.
+
+    SQLite orders each branch on its own and merges the two streams, so the rows stay streamed.
+    """
+    hot, cold = models
+    if not history:
+        return build(hot).order_by(literal_column(key))
+    return union_all(build(hot), build(cold)).order_by(literal_column(key))
+
+
+def _export(name: str, statement, fmt: ExportFormat) -> StreamingResponse:
+    return StreamingResponse(
+        _stream_rows(statement, fmt),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{fmt}"'},
+    )
+
+
+# ✅ Export Bookings (Admin) — filtered on created_at
+@router.get("/bookings")
+def export_bookings(
+    format: ExportFormat = "ndjson",
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    status: Optional[str] = None,
+    history: bool = HISTORY_QUERY,
+    _: str = Depends(require_permission("view_all_bookings")),
+):
+    def build(model):
+        statement = select(model.__table__).where(*date_range_filter(model.created_at, start_date, end_date))
+        return statement.where(model.status == status) if status is not None else statement
+
+    return _export("bookings", _dump((Booking, ArchivedBooking), "booking_id", history, build), format)
+
+
+# ✅ Export Rides (Admin) — filtered on start_time
+@router.get("/rides")
+def export_rides(
+    format: ExportFormat = "ndjson",
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    history: bool = HISTORY_QUERY,
+    _: str = Depends(require_permission("view_all_rides")),
+):
+    def build(model):
+        return select(model.__table__).where(*date_range_filter(model.start_time, start_date, end_date))
+
+    return _export("rides", _dump((Ride, ArchivedRide), "ride_id", history, build), format)
+
+
+# ✅ Export Payments (Admin) — same date-range filter as /payments/date-range/
+@router.get("/payments")
+def export_payments(
+    format: ExportFormat = "ndjson",
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    status: Optional[str] = None,
+    history: bool = HISTORY_QUERY,
+    _: str = Depends(require_permission("view_all_payments")),
+):
+    def build(model):
+        statement = select(model.__table__).where(*date_range_filter(model.timestamp, start_date, end_date))
+        return statement.where(model.status == status) if status is not None else statement
+
+    return _export("payments", _dump((Payment, ArchivedPayment), "payment_id", history, build), format)
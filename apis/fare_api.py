@@ -0,0 +1,40 @@
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException
+
+from fares import FARE_BATCH_MAX, fare_engine
+from schemas import FareQuoteRequest, FareQuoteResponse
+from surge import surge_engine
+from utils import Principal, get_current_principal
+
+router = APIRouter(prefix="/fares", tags=["Fares"])
+
+
+def _trip(request: FareQuoteRequest):
+    return request.pickup_latitude, request.pickup_longitude, request.dropoff_latitude, request.dropoff_longitude
+
+
+# ✅ Quote one trip (any logged-in user)
+@router.post("/quote", response_model=FareQuoteResponse)
+async def quote_fare(
+    request: FareQuoteRequest,
+    _: Principal = Depends(get_current_principal),
+):
+    return (await fare_engine.aquote(*_trip(request)))._asdict()
+
+
+# ✅ Quote many trips in one call; misses are routed as one batch
+@router.post("/quotes", response_model=List[FareQuoteResponse])
+async def quote_fares(
+    requests: List[FareQuoteRequest],
+    _: Principal = Depends(get_current_principal),
+):
+    if len(requests) > FARE_BATCH_MAX:
+        raise HTTPException(status_code=413, detail=f"At most {FARE_BATCH_MAX} trips per request")
+    return [quote._asdict() for quote in await fare_engine.aquote_many([_trip(r) for r in requests])]
+
+
+# ✅ Zones currently surging, for the driver app's map
+@router.get("/surge")
+def get_surge_zones(_: Principal = Depends(get_current_principal)):
+    return surge_engine.surging()
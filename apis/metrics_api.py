@@ -0,0 +1,34 @@
+from fastapi import APIRouter, Depends, HTTPException
+
+from analytics import revenue_analytics
+from archive import ride_archive
+from dispatch import dispatch_engine
+from events import broker
+from fares import fare_engine
+from heatmap import demand_heatmap
+from history import history_mover
+from location_ingest import location_buffer
+from surge import surge_engine
+from utils import get_auth_context, AuthContext, password_hasher
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+
+# ✅ In-process runtime metrics (Admin only)
+@router.get("/")
+def get_metrics(auth: AuthContext = Depends(get_auth_context)):
+    if not auth.is_admin:
+        raise HTTPException(status_code=403, detail="Only admin users can view metrics")
+
+    return {
+        "password_hashing": password_hasher.stats(),
+        "location_ingest": location_buffer.stats(),
+        "dispatch": dispatch_engine.stats(),
+        "events": broker.stats(),
+        "fares": fare_engine.stats(),
+        "analytics": revenue_analytics.stats(),
+        "heatmap": demand_heatmap.stats(),
+        "surge": surge_engine.stats(),
+        "archive": ride_archive.stats() if ride_archive is not None else None,
+        "history": history_mover.stats(),
+    }
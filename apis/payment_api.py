@@ -1,33 +1,43 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List
 from datetime import datetime
 
-from database import get_db
+from analytics import revenue_analytics
+from database import get_db, get_async_db
+from pagination import PageParams, paginate, paginate_async
 from models import *
 from schemas import *
-from utils import get_current_user, require_permission
+from utils import get_current_principal, require_permission, date_range_filter, Principal, get_auth_context, AuthContext
 
 router = APIRouter(prefix="/payments", tags=["Payments"])
 
 # ✅ 10️⃣ Get payments for a driver
 @router.get("/driver-payments", response_model=List[PaymentResponse])
-def get_payments_for_driver(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+async def get_payments_for_driver(
+    response: Response,
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_db),
+    page: PageParams = Depends(),
 ):
     # Find driver for this user
-    driver = db.query(Driver).filter(Driver.user_id == current_user.user_id).first()
+    result = await db.execute(select(Driver).where(Driver.user_id == current_user.user_id))
+    driver = result.scalars().first()
     if not driver:
         raise HTTPException(status_code=404, detail="Driver not found")
 
     # Join Payment → Booking → Ride to get ride_id
-    payments = (
-        db.query(Payment, Ride.ride_id)
+    statement = (
+        select(Payment, Ride.ride_id)
         .join(Booking, Payment.booking_id == Booking.booking_id)
         .join(Ride, Ride.booking_id == Booking.booking_id)
-        .filter(Ride.driver_id == driver.driver_id)
-        .all()
+        .where(Ride.driver_id == driver.driver_id)
+    )
+    payments = await paginate_async(
+        db, statement, Payment.payment_id, page, response,
+        key=lambda row: row[0].payment_id, scalars=False,
     )
 
     if not payments:
@@ -54,16 +64,17 @@ def get_payments_for_driver(
 
 @router.get("/me/pending", response_model=List[PaymentResponse])
 def get_my_pending_payments(
+    response: Response,
     db: Session = Depends(get_db),
-    current_user=Depends(get_current_user),
+    page: PageParams = Depends(),
+    current_user=Depends(get_current_principal),
 ):
     try:
         print(f"[DEBUG] Current user: {current_user.user_id}")
-        payments = (
-            db.query(Payment)
-            .filter(Payment.user_id == current_user.user_id, Payment.status == "pending")
-            .all()
+        query = db.query(Payment).filter(
+            Payment.user_id == current_user.user_id, Payment.status == "pending"
         )
+        payments = paginate(query, Payment.payment_id, page, response)
         print(f"[DEBUG] Found {len(payments)} payments")
         return payments
     except Exception as e:
@@ -77,15 +88,16 @@ def get_my_pending_payments(
 # ✅ 2️⃣ User — View My Completed Payments
 @router.get("/me/completed", response_model=List[PaymentResponse])
 def get_my_completed_payments(
+    response: Response,
     db: Session = Depends(get_db),
-    current_user=Depends(get_current_user),
+    page: PageParams = Depends(),
+    current_user=Depends(get_current_principal),
 ):
     try:
-        return (
-            db.query(Payment)
-            .filter(Payment.user_id == current_user.user_id, Payment.status == "completed")
-            .all()
+        query = db.query(Payment).filter(
+            Payment.user_id == current_user.user_id, Payment.status == "completed"
         )
+        return paginate(query, Payment.payment_id, page, response)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching payments: {str(e)}")
 
@@ -93,10 +105,13 @@ def get_my_completed_payments(
 # ✅ 3️⃣ Get all payments (Admin only)
 @router.get("/", response_model=List[PaymentResponse])
 def get_all_payments(
+    response: Response,
     db: Session = Depends(get_db),
+    page: PageParams = Depends(),
     _: str = Depends(require_permission("view_all_payments")),
 ):
-    return db.query(Payment).all()
+    query = db.query(Payment)
+    return paginate(query, Payment.payment_id, page, response)
 
 
 # ✅ 4️⃣ Get payment by ID (Admin or related user/driver)
@@ -104,21 +119,17 @@ def get_all_payments(
 def get_payment(
     payment_id: int,
     db: Session = Depends(get_db),
-    current_user=Depends(get_current_user),
+    auth: AuthContext = Depends(get_auth_context),
 ):
     payment = db.query(Payment).filter(Payment.payment_id == payment_id).first()
     if not payment:
         raise HTTPException(status_code=404, detail="Payment not found")
 
-    user_id = getattr(current_user, "user_id", None)
+    user_id = auth.user_id
     is_related = user_id in [payment.user_id, payment.driver_id]
 
     # Check admin permission
-    try:
-        _ = require_permission("view_all_payments")(current_user, db)
-        is_admin = True
-    except Exception:
-        is_admin = False
+    is_admin = auth.has_permission("view_all_payments")
 
     if not is_admin and not is_related:
         raise HTTPException(status_code=403, detail="Not authorized to view this payment")
@@ -130,10 +141,13 @@ def get_payment(
 @router.get("/status/{status}", response_model=List[PaymentResponse])
 def get_payments_by_status(
     status: str,
+    response: Response,
     db: Session = Depends(get_db),
+    page: PageParams = Depends(),
     _: str = Depends(require_permission("view_all_payments")),
 ):
-    return db.query(Payment).filter(Payment.status == status).all()
+    query = db.query(Payment).filter(Payment.status == status)
+    return paginate(query, Payment.payment_id, page, response)
 
 
 # ✅ 6️⃣ Filter by date range (Admin only)
@@ -141,14 +155,13 @@ def get_payments_by_status(
 def get_payments_by_date_range(
     start_date: datetime,
     end_date: datetime,
+    response: Response,
     db: Session = Depends(get_db),
+    page: PageParams = Depends(),
     _: str = Depends(require_permission("view_all_payments")),
 ):
-    return (
-        db.query(Payment)
-        .filter(Payment.timestamp >= start_date, Payment.timestamp <= end_date)
-        .all()
-    )
+    query = db.query(Payment).filter(*date_range_filter(Payment.timestamp, start_date, end_date))
+    return paginate(query, Payment.payment_id, page, response)
 
 
 # ✅ 7️⃣ Update payment status (Admin only)
@@ -163,9 +176,11 @@ def update_payment_status(
     if not payment:
         raise HTTPException(status_code=404, detail="Payment not found")
 
+    previous_timestamp = payment.timestamp
     payment.status = new_status
     payment.timestamp = datetime.utcnow()
     db.commit()
+    revenue_analytics.invalidate(previous_timestamp)
     db.refresh(payment)
     return payment
 
@@ -176,7 +191,7 @@ def complete_pending_payment(
     payment_id: int,
     payment_data: PaymentCompleteRequest,
     db: Session = Depends(get_db),
-    current_user=Depends(get_current_user),
+    current_user=Depends(get_current_principal),
 ):
     payment = db.query(Payment).filter(Payment.payment_id == payment_id).first()
     if not payment:
@@ -192,6 +207,7 @@ def complete_pending_payment(
         raise HTTPException(status_code=400, detail="Payment amount mismatch")
 
     # ✅ Update
+    raised_at = payment.timestamp
     payment.status = "completed"
     payment.payment_method = payment_data.payment_method
     payment.timestamp = datetime.utcnow()
@@ -200,6 +216,7 @@ def complete_pending_payment(
         payment.booking.status = "paid"
 
     db.commit()
+    revenue_analytics.invalidate(raised_at)  # its pending amount leaves that bucket
     db.refresh(payment)
     return payment
 
@@ -215,6 +232,8 @@ def delete_payment(
     if not payment:
         raise HTTPException(status_code=404, detail="Payment not found")
 
+    timestamp = payment.timestamp
     db.delete(payment)
     db.commit()
+    revenue_analytics.invalidate(timestamp)
     return {"message": "Payment deleted successfully"}
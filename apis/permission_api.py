@@ -2,9 +2,9 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from typing import List
 from database import get_db
-from models import Permission, RolePermission, Role, User
+from models import Permission, RolePermission, Role
 from schemas import PermissionCreate, PermissionResponse
-from utils import require_permission, get_current_user
+from utils import require_permission, invalidate_permission_cache, get_auth_context, AuthContext
 
 router = APIRouter(prefix="/permissions", tags=["Permissions"])
 
@@ -60,6 +60,7 @@ def assign_permissions_to_role(
             added_count += 1
 
     db.commit()
+    invalidate_permission_cache()
     return {"message": f"{added_count} new permissions assigned to role '{role.name}'"}
 
 
@@ -68,13 +69,12 @@ def assign_permissions_to_role(
 def delete_permission(
     permission_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    auth: AuthContext = Depends(get_auth_context)
 ):
     """Delete a permission and its related role assignments (Admin only)."""
 
     # ✅ Verify the user has admin role
-    role = db.query(Role).filter(Role.id == current_user.role_id).first()
-    if not role or role.name.lower() != "admin":
+    if not auth.is_admin:
         raise HTTPException(
             status_code=403,
             detail="Only admin users can delete permissions."
@@ -91,6 +91,7 @@ def delete_permission(
     # 🗑️ Delete the permission itself
     db.delete(permission)
     db.commit()
+    invalidate_permission_cache()
 
     return {
         "message": f"Permission '{permission.name}' and all related role links deleted successfully."
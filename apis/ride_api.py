@@ -1,12 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, joinedload
 from typing import List, Optional
 from datetime import datetime
 
-from database import get_db
-from models import Ride, Role, User, Driver
+from analytics import revenue_analytics
+from database import get_db, get_async_db
+from pagination import PageParams, paginate_async, paginate_union_async
+from driver_stats import record_ride_rating
+from ratings import record_rating
+from models import ArchivedRide, Ride, Driver
 from schemas import RideResponse, RideCreate
-from utils import get_current_user, require_permission
+from utils import require_permission, get_auth_context, AuthContext
 
 router = APIRouter(prefix="/rides", tags=["Rides"])
 
@@ -27,6 +33,7 @@ def create_ride(
     new_ride = Ride(**ride_data.dict())
     db.add(new_ride)
     db.commit()
+    revenue_analytics.invalidate(new_ride.start_time)
     db.refresh(new_ride)
     return new_ride
 
@@ -41,19 +48,18 @@ def create_ride(
 def get_ride(
     ride_id: int,
     db: Session = Depends(get_db),
-    current_user=Depends(get_current_user)
+    auth: AuthContext = Depends(get_auth_context)
 ):
     ride = db.query(Ride).filter(Ride.ride_id == ride_id).first()
     if not ride:
         raise HTTPException(status_code=404, detail="Ride not found")
 
-    role = db.query(Role).filter(Role.id == current_user.role_id).first()
-    is_admin = role and role.name.lower() == "admin"
+    is_admin = auth.is_admin
 
     # Only admin, driver of the ride, or user of the ride can view
-    if not is_admin and current_user.user_id not in [ride.user_id]:
+    if not is_admin and auth.user_id not in [ride.user_id]:
         driver = db.query(Driver).filter(Driver.driver_id == ride.driver_id).first()
-        if not driver or driver.email != current_user.email:
+        if not driver or driver.user_id != auth.user_id:
             raise HTTPException(status_code=403, detail="Not authorized to view this ride")
 
     return ride
@@ -66,11 +72,24 @@ def get_ride(
     summary="View all rides (Admin only)",
     description="Lists all rides in the system. Only admins can access this."
 )
-def get_all_rides(
-    db: Session = Depends(get_db),
-    _: str = Depends(require_permission("view_all_rides"))
+async def get_all_rides(
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    page: PageParams = Depends(),
+    _: str = Depends(require_permission("view_all_rides")),
 ):
-    return db.query(Ride).all()
+    # Booking is eager loaded: lazy loads are not possible on an AsyncSession
+    statement = select(Ride).options(joinedload(Ride.booking))
+    return await paginate_async(db, statement, Ride.ride_id, page, response)
+
+
+HISTORY_QUERY = Query(False, description="Also list rides of finished bookings moved to the archive tables")
+
+
+def _ride_sources(history: bool, criteria) -> list:
+    """(statement, key) per ride table for paginate_union_async; archived rides only with history."""
+    models = (Ride, ArchivedRide) if history else (Ride,)
+    return [(select(model).options(joinedload(model.booking)).where(criteria(model)), model.ride_id) for model in models]
 
 
 # ✅ GET RIDES BY USER (with booking status)
@@ -80,26 +99,22 @@ def get_all_rides(
     summary="Get rides for a specific user (with booking status)",
     description="Returns all rides for a user, including booking status. Admins can view any user's rides."
 )
-def get_rides_by_user(
+async def get_rides_by_user(
     user_id: int,
-    db: Session = Depends(get_db),
-    current_user=Depends(get_current_user)
+    response: Response,
+    history: bool = HISTORY_QUERY,
+    db: AsyncSession = Depends(get_async_db),
+    page: PageParams = Depends(),
+    auth: AuthContext = Depends(get_auth_context),
 ):
     # Permission check
-    role = db.query(Role).filter(Role.id == current_user.role_id).first()
-    is_admin = role and role.name.lower() == "admin"
+    is_admin = auth.is_admin
 
-    if not is_admin and current_user.user_id != user_id:
+    if not is_admin and auth.user_id != user_id:
         raise HTTPException(status_code=403, detail="Not authorized to view other users' rides")
 
     # Joined load to include booking info
-    rides = (
-        db.query(Ride)
-        .options(joinedload(Ride.booking))
-        .filter(Ride.user_id == user_id)
-        .all()
-    )
-    return rides
+    return await paginate_union_async(db, _ride_sources(history, lambda m: m.user_id == user_id), page, response)
 
 
 @router.get(
@@ -108,31 +123,26 @@ def get_rides_by_user(
     summary="Get rides handled by a driver",
     description="Driver can see their own rides; Admin can view all driver rides."
 )
-def get_rides_by_driver(
+async def get_rides_by_driver(
     driver_id: int,
-    db: Session = Depends(get_db),
-    current_user=Depends(get_current_user)
+    response: Response,
+    history: bool = HISTORY_QUERY,
+    db: AsyncSession = Depends(get_async_db),
+    page: PageParams = Depends(),
+    auth: AuthContext = Depends(get_auth_context),
 ):
-    driver = db.query(Driver).filter(Driver.driver_id == driver_id).first()
+    driver = await db.get(Driver, driver_id)
     if not driver:
         raise HTTPException(status_code=404, detail="Driver not found")
 
     # ✅ Fix email access
-    role = db.query(Role).filter(Role.id == current_user.role_id).first()
-    is_admin = role and role.name.lower() == "admin"
+    is_admin = auth.is_admin
 
-    if not is_admin and driver.user.email != current_user.email:
+    if not is_admin and driver.user_id != auth.user_id:
         raise HTTPException(status_code=403, detail="Not authorized to view these rides")
 
     # ✅ JOIN BOOKINGS to include pickup/dropoff
-    rides = (
-        db.query(Ride)
-        .options(joinedload(Ride.booking))
-        .filter(Ride.driver_id == driver_id)
-        .all()
-    )
-
-    return rides
+    return await paginate_union_async(db, _ride_sources(history, lambda m: m.driver_id == driver_id), page, response)
 
 # ✅ UPDATE RIDE FEEDBACK & RATINGS (User or Driver)
 @router.put(
@@ -148,27 +158,28 @@ def update_ride_feedback(
     user_feedback: Optional[str] = None,
     driver_feedback: Optional[str] = None,
     db: Session = Depends(get_db),
-    current_user=Depends(get_current_user)
+    auth: AuthContext = Depends(get_auth_context)
 ):
     ride = db.query(Ride).filter(Ride.ride_id == ride_id).first()
     if not ride:
         raise HTTPException(status_code=404, detail="Ride not found")
 
-    role = db.query(Role).filter(Role.id == current_user.role_id).first()
-
     # User feedback
-    if current_user.user_id == ride.user_id:
+    if auth.user_id == ride.user_id:
         if user_rating is not None:
+            record_rating(db, ride.rating_by_user, user_rating, driver_id=ride.driver_id)
+            record_ride_rating(db, ride.driver_id, ride.rating_by_user, user_rating)
             ride.rating_by_user = user_rating
         if user_feedback:
             ride.feedback = (ride.feedback or "") + f"\n[User]: {user_feedback}"
 
     # Driver feedback
-    elif role and role.name.lower() == "driver":
+    elif auth.has_role("driver"):
         driver = db.query(Driver).filter(Driver.driver_id == ride.driver_id).first()
-        if not driver or driver.email != current_user.email:
+        if not driver or driver.user_id != auth.user_id:
             raise HTTPException(status_code=403, detail="Not authorized to update this feedback")
         if driver_rating is not None:
+            record_rating(db, ride.rating_by_driver, driver_rating, user_id=ride.user_id)
             ride.rating_by_driver = driver_rating
         if driver_feedback:
             ride.feedback = (ride.feedback or "") + f"\n[Driver]: {driver_feedback}"
@@ -197,7 +208,9 @@ def delete_ride(
     if not ride:
         raise HTTPException(status_code=404, detail="Ride not found")
 
+    start_time = ride.start_time
     db.delete(ride)
     db.commit()
+    revenue_analytics.invalidate(start_time)
     return {"message": "Ride deleted successfully"}
 
@@ -4,7 +4,7 @@ from typing import List
 from database import get_db
 from models import Role
 from schemas import RoleCreate, RoleResponse
-from utils import require_permission
+from utils import require_permission, invalidate_permission_cache
 
 router = APIRouter(prefix="/roles", tags=["Roles"])
 
@@ -29,6 +29,7 @@ def create_role(
     new_role = Role(name=role_data.name)
     db.add(new_role)
     db.commit()
+    invalidate_permission_cache()
     db.refresh(new_role)
     return new_role
 
@@ -83,4 +84,5 @@ def delete_role(
 
     db.delete(role)
     db.commit()
+    invalidate_permission_cache()
     return {"message": f"Role '{role.name}' deleted successfully"}
@@ -1,38 +1,50 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.orm import Session
 from datetime import date, timedelta
 from typing import List
 
 from database import get_db
-from models import User, Role
+from pagination import PageParams, paginate
+from models import User
 from schemas import UserCreate, UserResponse, UserUpdate
 from fastapi.security import OAuth2PasswordRequestForm
+from starlette.concurrency import run_in_threadpool
 from utils import (
-    hash_password,
-    verify_password,
+    hash_password_async,
+    verify_and_update_password,
     create_access_token,
     get_current_user,
+    invalidate_principal,
+    cache_principal,
     require_permission,
-    oauth2_scheme
+    oauth2_scheme,
+    get_auth_context,
+    AuthContext
 )
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
 
 @router.post("/users", response_model=UserResponse)
-def create_user(user_data: UserCreate, db: Session = Depends(get_db)):
-    new_user = User(
-        name=user_data.name,
-        email=user_data.email,
-        phone_number=user_data.phone_number,
-        password=hash_password(user_data.password),
-        created_at=date.today(),
-        role_id=3  # 👤 rider role
-    )
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
-    return new_user
+async def create_user(user_data: UserCreate, db: Session = Depends(get_db)):
+    # bcrypt runs on the password pool; DB work stays on the request threadpool
+    hashed_password = await hash_password_async(user_data.password)
+
+    def insert_user() -> User:
+        new_user = User(
+            name=user_data.name,
+            email=user_data.email,
+            phone_number=user_data.phone_number,
+            password=hashed_password,
+            created_at=date.today(),
+            role_id=3  # 👤 rider role
+        )
+        db.add(new_user)
+        db.commit()
+        db.refresh(new_user)
+        return new_user
+
+    return await run_in_threadpool(insert_user)
 
 @router.get("/me", response_model=UserResponse)
 def read_current_user(current_user: User = Depends(get_current_user)):
@@ -44,10 +56,13 @@ def read_current_user(current_user: User = Depends(get_current_user)):
 # ✅ GET ALL USERS (Admin only)
 @router.get("/", response_model=List[UserResponse])
 def get_all_users(
+    response: Response,
     db: Session = Depends(get_db),
-    _: str = Depends(require_permission("view_user"))
+    page: PageParams = Depends(),
+    _: str = Depends(require_permission("view_user")),
 ):
-    return db.query(User).all()
+    query = db.query(User)
+    return paginate(query, User.user_id, page, response)
 
 
 # ✅ GET SINGLE USER (Self or Admin)
@@ -55,74 +70,82 @@ def get_all_users(
 def get_user(
     user_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    auth: AuthContext = Depends(get_auth_context)
 ):
     user = db.query(User).filter(User.user_id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
     # Allow if admin or self
-    role = db.query(Role).filter(Role.id == current_user.role_id).first()
-    if not role or (role.name.lower() != "admin" and current_user.user_id != user_id):
+    if not auth.is_admin and auth.user_id != user_id:
         raise HTTPException(status_code=403, detail="Not authorized")
 
     return user
 
 
-# ✅ UPDATE USER (Self or Admin)
-@router.put("/{user_id}", response_model=UserResponse)
-def update_user(
-    user_id: int,
-    updated_user: UserCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-    _: str = Depends(require_permission("update_user"))
-):
+def _user_to_update(db: Session, user_id: int, auth: AuthContext) -> User:
     user = db.query(User).filter(User.user_id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    role = db.query(Role).filter(Role.id == current_user.role_id).first()
-    if not role or (role.name.lower() != "admin" and current_user.user_id != user_id):
+    if not auth.is_admin and auth.user_id != user_id:
         raise HTTPException(status_code=403, detail="Not authorized")
+    return user
 
-    user.name = updated_user.name
-    user.email = updated_user.email
-    user.phone_number = updated_user.phone_number
-    user.password = hash_password(updated_user.password)
-    user.rating = updated_user.rating or user.rating
 
+def _save_user(db: Session, user: User) -> UserResponse:
+    """Commit, then serialize on this thread: the refreshed row must not be lazy-loaded on the loop."""
     db.commit()
+    invalidate_principal(user.user_id)
     db.refresh(user)
-    return user
+    return UserResponse.model_validate(user, from_attributes=True)
+
+
+# ✅ UPDATE USER (Self or Admin)
+@router.put("/{user_id}", response_model=UserResponse)
+async def update_user(
+    user_id: int,
+    updated_user: UserCreate,
+    db: Session = Depends(get_db),
+    auth: AuthContext = Depends(get_auth_context),
+    _: str = Depends(require_permission("update_user"))
+):
+    user = await run_in_threadpool(_user_to_update, db, user_id, auth)
+    # bcrypt runs on the password pool; DB work stays on the request threadpool
+    hashed_password = await hash_password_async(updated_user.password)
+
+    def apply() -> UserResponse:
+        user.name = updated_user.name
+        user.email = updated_user.email
+        user.phone_number = updated_user.phone_number
+        user.password = hashed_password
+        user.rating = updated_user.rating or user.rating
+        return _save_user(db, user)
+
+    return await run_in_threadpool(apply)
 
 
 # ✅ PARTIAL UPDATE USER (Self or Admin)
 @router.patch("/{user_id}", response_model=UserResponse)
-def partial_update_user(
+async def partial_update_user(
     user_id: int,
     user_update: UserUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    auth: AuthContext = Depends(get_auth_context),
     _: str = Depends(require_permission("update_user"))
 ):
-    user = db.query(User).filter(User.user_id == user_id).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-
-    role = db.query(Role).filter(Role.id == current_user.role_id).first()
-    if not role or (role.name.lower() != "admin" and current_user.user_id != user_id):
-        raise HTTPException(status_code=403, detail="Not authorized")
+    user = await run_in_threadpool(_user_to_update, db, user_id, auth)
 
     data = user_update.dict(exclude_unset=True)
     if "password" in data:
-        data["password"] = hash_password(data["password"])
-    for k, v in data.items():
-        setattr(user, k, v)
+        data["password"] = await hash_password_async(data["password"])
 
-    db.commit()
-    db.refresh(user)
-    return user
+    def apply() -> UserResponse:
+        for k, v in data.items():
+            setattr(user, k, v)
+        return _save_user(db, user)
+
+    return await run_in_threadpool(apply)
 
 
 # ✅ DELETE USER (Admin or self)
@@ -130,34 +153,51 @@ def partial_update_user(
 def delete_user(
     user_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    auth: AuthContext = Depends(get_auth_context),
     _: str = Depends(require_permission("delete_user"))
 ):
     user = db.query(User).filter(User.user_id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    role = db.query(Role).filter(Role.id == current_user.role_id).first()
-    if not role or (role.name.lower() != "admin" and current_user.user_id != user_id):
+    if not auth.is_admin and auth.user_id != user_id:
         raise HTTPException(status_code=403, detail="Not authorized to delete this user")
 
     db.delete(user)
     db.commit()
+    invalidate_principal(user_id)
     return {"message": f"User '{user.name}' deleted successfully."}
 
 
 # ✅ LOGIN
 @router.post("/login")
-def login(
+async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(get_db)
 ):
-    user = db.query(User).filter(User.email == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.password):
+    user = await run_in_threadpool(
+        lambda: db.query(User).filter(User.email == form_data.username).first()
+    )
+    if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
 
+    valid, new_hash = await verify_and_update_password(form_data.password, user.password)
+    if not valid:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+
+    # Read the claims before any commit: it expires the row, and reloading it here would block the loop
+    principal = cache_principal(user)
+
+    # ♻️ Rehash transparently when BCRYPT_ROUNDS changed since the hash was made
+    if new_hash:
+        user.password = new_hash
+        await run_in_threadpool(db.commit)
+
     access_token_expires = timedelta(hours=1)
-    access_token = create_access_token(data={"sub": user.email}, expires_delta=access_token_expires)
+    access_token = create_access_token(
+        data={"sub": principal.email, "user_id": principal.user_id, "role_id": principal.role_id},
+        expires_delta=access_token_expires,
+    )
     return {"access_token": access_token, "token_type": "bearer"}
 
 
@@ -1,11 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.orm import Session
 from typing import List
 
 from database import get_db
-from models import Vehicle, Driver, Role, User
+from pagination import PageParams, paginate
+from models import Vehicle, Driver
 from schemas import VehicleCreate, VehicleUpdate, VehicleResponse
-from utils import get_current_user, require_permission
+from utils import require_permission, get_auth_context, AuthContext
 
 router = APIRouter(prefix="/vehicles", tags=["Vehicles"])
 
@@ -15,20 +16,16 @@ router = APIRouter(prefix="/vehicles", tags=["Vehicles"])
 def create_vehicle(
     vehicle_data: VehicleCreate,
     db: Session = Depends(get_db),
-    current_user=Depends(get_current_user),
+    auth: AuthContext = Depends(get_auth_context),
     _: str = Depends(require_permission("create_vehicle")),
 ):
-    role = db.query(Role).filter(Role.id == current_user.role_id).first()
     driver = db.query(Driver).filter(Driver.driver_id == vehicle_data.driver_id).first()
 
     if not driver:
         raise HTTPException(status_code=404, detail="Driver not found")
 
-    # ✅ Access driver email through related User
-    driver_email = driver.user.email
-
     # Only admin or that specific driver can add a vehicle
-    if not role or (role.name.lower() != "admin" and current_user.email != driver_email):
+    if not auth.is_admin and auth.user_id != driver.user_id:
         raise HTTPException(status_code=403, detail="Not authorized to add vehicle")
 
     new_vehicle = Vehicle(**vehicle_data.dict())
@@ -43,7 +40,7 @@ def create_vehicle(
 def get_vehicle(
     vehicle_id: int,
     db: Session = Depends(get_db),
-    current_user=Depends(get_current_user),
+    auth: AuthContext = Depends(get_auth_context),
     _: str = Depends(require_permission("view_vehicle")),
 ):
     vehicle = db.query(Vehicle).filter(Vehicle.vehicle_id == vehicle_id).first()
@@ -54,9 +51,7 @@ def get_vehicle(
     if not driver:
         raise HTTPException(status_code=404, detail="Driver not found")
 
-    role = db.query(Role).filter(Role.id == current_user.role_id).first()
-
-    if role.name.lower() != "admin" and current_user.email != driver.user.email:
+    if not auth.is_admin and auth.user_id != driver.user_id:
         raise HTTPException(status_code=403, detail="Not authorized to view this vehicle")
 
     return vehicle
@@ -65,30 +60,33 @@ def get_vehicle(
 # ✅ GET ALL VEHICLES (Admin only)
 @router.get("/", response_model=List[VehicleResponse])
 def get_all_vehicles(
+    response: Response,
     db: Session = Depends(get_db),
+    page: PageParams = Depends(),
     _: str = Depends(require_permission("view_all_vehicles")),
 ):
-    return db.query(Vehicle).all()
+    return paginate(db.query(Vehicle), Vehicle.vehicle_id, page, response)
 
 
 # ✅ GET VEHICLES BY DRIVER ID (Admin or that driver)
 @router.get("/driver/{driver_id}", response_model=List[VehicleResponse])
 def get_vehicles_by_driver(
     driver_id: int,
+    response: Response,
     db: Session = Depends(get_db),
-    current_user=Depends(get_current_user),
+    page: PageParams = Depends(),
+    auth: AuthContext = Depends(get_auth_context),
     _: str = Depends(require_permission("view_vehicle")),
 ):
     driver = db.query(Driver).filter(Driver.driver_id == driver_id).first()
     if not driver:
         raise HTTPException(status_code=404, detail="Driver not found")
 
-    role = db.query(Role).filter(Role.id == current_user.role_id).first()
-    if role.name.lower() != "admin" and current_user.email != driver.user.email:
+    if not auth.is_admin and auth.user_id != driver.user_id:
         raise HTTPException(status_code=403, detail="Not authorized to view these vehicles")
 
-    vehicles = db.query(Vehicle).filter(Vehicle.driver_id == driver_id).all()
-    return vehicles
+    query = db.query(Vehicle).filter(Vehicle.driver_id == driver_id)
+    return paginate(query, Vehicle.vehicle_id, page, response)
 
 
 # ✅ UPDATE VEHICLE (Admin or that driver)
@@ -97,7 +95,7 @@ def update_vehicle(
     vehicle_id: int,
     vehicle_data: VehicleUpdate,
     db: Session = Depends(get_db),
-    current_user=Depends(get_current_user),
+    auth: AuthContext = Depends(get_auth_context),
     _: str = Depends(require_permission("update_vehicle")),
 ):
     vehicle = db.query(Vehicle).filter(Vehicle.vehicle_id == vehicle_id).first()
@@ -108,9 +106,7 @@ def update_vehicle(
     if not driver:
         raise HTTPException(status_code=404, detail="Driver not found")
 
-    role = db.query(Role).filter(Role.id == current_user.role_id).first()
-
-    if role.name.lower() != "admin" and current_user.email != driver.user.email:
+    if not auth.is_admin and auth.user_id != driver.user_id:
         raise HTTPException(status_code=403, detail="Not authorized to update this vehicle")
 
     for key, value in vehicle_data.dict(exclude_unset=True).items():
@@ -126,7 +122,7 @@ def update_vehicle(
 def delete_vehicle(
     vehicle_id: int,
     db: Session = Depends(get_db),
-    current_user=Depends(get_current_user),
+    auth: AuthContext = Depends(get_auth_context),
     _: str = Depends(require_permission("delete_vehicle")),
 ):
     vehicle = db.query(Vehicle).filter(Vehicle.vehicle_id == vehicle_id).first()
@@ -137,9 +133,7 @@ def delete_vehicle(
     if not driver:
         raise HTTPException(status_code=404, detail="Driver not found")
 
-    role = db.query(Role).filter(Role.id == current_user.role_id).first()
-
-    if role.name.lower() != "admin" and current_user.email != driver.user.email:
+    if not auth.is_admin and auth.user_id != driver.user_id:
         raise HTTPException(status_code=403, detail="Not authorized to delete this vehicle")
 
     db.delete(vehicle)
@@ -150,30 +144,33 @@ def delete_vehicle(
 # ✅ GET ALL VEHICLES (Admin only)
 @router.get("/", response_model=List[VehicleResponse])
 def get_all_vehicles(
+    response: Response,
     db: Session = Depends(get_db),
+    page: PageParams = Depends(),
     _: str = Depends(require_permission("view_all_vehicles")),
 ):
-    return db.query(Vehicle).all()
+    return paginate(db.query(Vehicle), Vehicle.vehicle_id, page, response)
 
 
 # ✅ GET VEHICLES BY DRIVER ID (Admin or that driver)
 @router.get("/driver/{driver_id}", response_model=List[VehicleResponse])
 def get_vehicles_by_driver(
     driver_id: int,
+    response: Response,
     db: Session = Depends(get_db),
-    current_user=Depends(get_current_user),
+    page: PageParams = Depends(),
+    auth: AuthContext = Depends(get_auth_context),
     _: str = Depends(require_permission("view_vehicle")),
 ):
     driver = db.query(Driver).filter(Driver.driver_id == driver_id).first()
     if not driver:
         raise HTTPException(status_code=404, detail="Driver not found")
 
-    role = db.query(Role).filter(Role.id == current_user.role_id).first()
-    if role.name.lower() != "admin" and current_user.email != driver.user.email:
+    if not auth.is_admin and auth.user_id != driver.user_id:
         raise HTTPException(status_code=403, detail="Not authorized to view these vehicles")
 
-    vehicles = db.query(Vehicle).filter(Vehicle.driver_id == driver_id).all()
-    return vehicles
+    query = db.query(Vehicle).filter(Vehicle.driver_id == driver_id)
+    return paginate(query, Vehicle.vehicle_id, page, response)
 
 
 # ✅ UPDATE VEHICLE (Admin or that driver)
@@ -182,7 +179,7 @@ def update_vehicle(
     vehicle_id: int,
     vehicle_data: VehicleUpdate,
     db: Session = Depends(get_db),
-    current_user=Depends(get_current_user),
+    auth: AuthContext = Depends(get_auth_context),
     _: str = Depends(require_permission("update_vehicle")),
 ):
     vehicle = db.query(Vehicle).filter(Vehicle.vehicle_id == vehicle_id).first()
@@ -193,9 +190,7 @@ def update_vehicle(
     if not driver:
         raise HTTPException(status_code=404, detail="Driver not found")
 
-    role = db.query(Role).filter(Role.id == current_user.role_id).first()
-
-    if role.name.lower() != "admin" and current_user.email != driver.user.email:
+    if not auth.is_admin and auth.user_id != driver.user_id:
         raise HTTPException(status_code=403, detail="Not authorized to update this vehicle")
 
     for key, value in vehicle_data.dict(exclude_unset=True).items():
@@ -211,7 +206,7 @@ def update_vehicle(
 def delete_vehicle(
     vehicle_id: int,
     db: Session = Depends(get_db),
-    current_user=Depends(get_current_user),
+    auth: AuthContext = Depends(get_auth_context),
     _: str = Depends(require_permission("delete_vehicle")),
 ):
     vehicle = db.query(Vehicle).filter(Vehicle.vehicle_id == vehicle_id).first()
@@ -222,9 +217,7 @@ def delete_vehicle(
     if not driver:
         raise HTTPException(status_code=404, detail="Driver not found")
 
-    role = db.query(Role).filter(Role.id == current_user.role_id).first()
-
-    if role.name.lower() != "admin" and current_user.email != driver.user.email:
+    if not auth.is_admin and auth.user_id != driver.user_id:
         raise HTTPException(status_code=403, detail="Not authorized to delete this vehicle")
 
     db.delete(vehicle)
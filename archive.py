@@ -0,0 +1,312 @@
+"""Columnar archive of closed rides in date-partitioned Parquet.
+
+Analytics over Rides, Bookings and Payments share the SQLite file with live
+traffic. RideArchive copies every ride that ended at least
+ARCHIVE_DELAY_SECONDS ago into Parquet under ARCHIVE_DIR. Each row is the
+ride joined with its booking and payment. Rides are read from Rides and from
+RidesArchive (history.py), so rides moved out of the hot tables before the
+archive was enabled are exported too. Files are hive-partitioned by the
+ride's start date:
+
+    ARCHIVE_DIR/date=2025-10-29/part-<watermark>-<chunk>-0.parquet
+
+Exports are incremental. _watermark.json records the end_time cutoff of the
+last export, and the next one reads only rides that ended after it, through
+ix_Rides_end_time and ix_RidesArchive_end_time, in ARCHIVE_BATCH_ROWS chunks. The watermark is written
+last. An export that dies halfway leaves part files newer than the
+watermark, and the next export deletes those before starting, so a ride is
+never archived twice. A row is a snapshot: a payment still pending at export
+time stays pending in the archive.
+
+Queries read the files through pyarrow.dataset. Date filters prune whole
+partitions, and column filters are pushed down to Parquet row-group
+statistics. Binning runs as NumPy over the column arrays.
+
+The background export runs every ARCHIVE_INTERVAL_SECONDS. It is off unless
+ARCHIVE_DIR is set and pyarrow is installed. To run one export by hand:
+
+    ARCHIVE_DIR=archive python archive.py
+"""
+import glob
+import json
+import logging
+import os
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+import numpy as np
+from sqlalchemy import literal_column, select, union_all
+from sqlalchemy.orm import sessionmaker
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # archive unavailable
+    pa = None
+
+from analytics import EMPTY_BUCKET, Granularity, bucket_of_seconds, bucket_range, bucket_start
+from database import SessionLocal
+from models import ArchivedBooking, ArchivedPayment, ArchivedRide, Booking, Payment, Ride
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR")  # unset disables the archive
+ARCHIVE_INTERVAL_SECONDS = float(os.getenv("ARCHIVE_INTERVAL_SECONDS", "3600"))  # 0 disables the background export
+ARCHIVE_DELAY_SECONDS = float(os.getenv("ARCHIVE_DELAY_SECONDS", "86400"))  # let payments settle first
+ARCHIVE_BATCH_ROWS = int(os.getenv("ARCHIVE_BATCH_ROWS", "50000"))
+
+_WATERMARK_FILE = "_watermark.json"  # leading underscore: pyarrow.dataset skips it
+_PART = re.compile(r"part-(\d+)-")
+
+# Archive column -> source column, in file order
+_COLUMNS = {
+    "ride_id": Ride.ride_id,
+    "booking_id": Ride.booking_id,
+    "user_id": Ride.user_id,
+    "driver_id": Ride.driver_id,
+    "start_time": Ride.start_time,
+    "end_time": Ride.end_time,
+    "distance_travelled": Ride.distance_travelled,
+    "final_fare": Ride.final_fare,
+    "rating_by_user": Ride.rating_by_user,
+    "rating_by_driver": Ride.rating_by_driver,
+    "booking_status": Booking.status,
+    "booking_created_at": Booking.created_at,
+    "fare_estimate": Booking.fare_estimate,
+    "pickup_latitude": Booking.pickup_latitude,
+    "pickup_longitude": Booking.pickup_longitude,
+    "dropoff_latitude": Booking.dropoff_latitude,
+    "dropoff_longitude": Booking.dropoff_longitude,
+    "payment_status": Payment.status,
+    "payment_amount": Payment.amount,
+    "payment_method": Payment.payment_method,
+    "payment_timestamp": Payment.timestamp,
+}
+
+
+def export_statement(cutoff: datetime, watermark: Optional[datetime] = None):
+    """Archive rows of the rides that ended in (watermark, cutoff], hot and moved to history alike."""
+    parts = []
+    for ride, booking, payment in ((Ride, Booking, Payment), (ArchivedRide, ArchivedBooking, ArchivedPayment)):
+        tables = {Ride: ride, Booking: booking, Payment: payment}
+        criteria = [ride.end_time.isnot(None), ride.end_time <= cutoff]
+        if watermark is not None:
+            criteria.append(ride.end_time > watermark)
+        parts.append(
+            select(*(getattr(tables[column.class_], column.key).label(name) for name, column in _COLUMNS.items()))
+            .join(booking, booking.booking_id == ride.booking_id)
+            .outerjoin(payment, payment.booking_id == ride.booking_id)
+            .where(*criteria)
+        )
+    # One statement, so a history move committing mid-export cannot skip or repeat a ride
+    return union_all(*parts).order_by(literal_column("end_time"))
+
+
+def _schema():
+    ts = pa.timestamp("us")
+    types = {
+        "ride_id": pa.int64(), "booking_id": pa.int64(), "user_id": pa.int64(), "driver_id": pa.int64(),
+        "start_time": ts, "end_time": ts, "distance_travelled": pa.float64(), "final_fare": pa.float64(),
+        "rating_by_user": pa.int64(), "rating_by_driver": pa.int64(),
+        "booking_status": pa.string(), "booking_created_at": ts, "fare_estimate": pa.float64(),
+        "pickup_latitude": pa.float64(), "pickup_longitude": pa.float64(),
+        "dropoff_latitude": pa.float64(), "dropoff_longitude": pa.float64(),
+        "payment_status": pa.string(), "payment_amount": pa.float64(), "payment_method": pa.string(),
+        "payment_timestamp": ts,
+    }
+    return pa.schema([(name, types[name]) for name in _COLUMNS] + [("date", pa.string())])
+
+
+def _token(moment: datetime) -> int:
+    return int((moment - datetime(1970, 1, 1)).total_seconds() * 1_000_000)
+
+
+def _seconds(column) -> np.ndarray:
+    """Unix seconds (floored) of a timestamp[us] column, as an int64 array."""
+    return np.floor_divide(column.cast(pa.int64()).to_numpy(zero_copy_only=False), 1_000_000)
+
+
+class RideArchive:
+    def __init__(self, root: str, session_factory: sessionmaker = SessionLocal,
+                 interval: float = ARCHIVE_INTERVAL_SECONDS, delay: float = ARCHIVE_DELAY_SECONDS,
+                 batch_rows: int = ARCHIVE_BATCH_ROWS):
+        if pa is None:
+            raise RuntimeError("RideArchive needs pyarrow")
+        self.root = root
+        self.session_factory = session_factory
+        self.interval = interval
+        self.delay = timedelta(seconds=delay)
+        self.batch_rows = batch_rows
+        self.schema = _schema()
+        self.partitioning = ds.partitioning(pa.schema([("date", pa.string())]), flavor="hive")
+        self._export_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._exports = 0
+        self._errors = 0
+        self._rows_exported = 0
+        self._last = {"rows": 0, "export_ms": 0.0}
+
+    # ---- export -----------------------------------------------------------
+
+    def watermark(self) -> Optional[datetime]:
+        """end_time up to which every closed ride is archived, or None before the first export."""
+        try:
+            with open(os.path.join(self.root, _WATERMARK_FILE)) as f:
+                return datetime.fromisoformat(json.load(f)["end_time"])
+        except FileNotFoundError:
+            return None
+
+    def _write_watermark(self, cutoff: datetime) -> None:
+        path = os.path.join(self.root, _WATERMARK_FILE)
+        with open(path + ".tmp", "w") as f:
+            json.dump({"end_time": cutoff.isoformat()}, f)
+        os.replace(path + ".tmp", path)
+
+    def _drop_orphans(self, watermark: Optional[datetime]) -> None:
+        """Delete part files written by an export that never committed its watermark."""
+        limit = _token(watermark) if watermark else -1
+        for path in glob.glob(os.path.join(self.root, "date=*", "part-*.parquet")):
+            match = _PART.match(os.path.basename(path))
+            if match and int(match.group(1)) > limit:
+                os.remove(path)
+
+    def export(self, now: Optional[datetime] = None) -> int:
+        """Append rides that ended in (watermark, now - delay]; returns the number written."""
+        with self._export_lock:
+            started = time.perf_counter()
+            os.makedirs(self.root, exist_ok=True)
+            watermark = self.watermark()
+            self._drop_orphans(watermark)
+            cutoff = (now or datetime.utcnow()) - self.delay
+            if watermark is not None and cutoff <= watermark:
+                return 0
+
+            statement = export_statement(cutoff, watermark)
+            token, names, written = _token(cutoff), list(_COLUMNS), 0
+            with self.session_factory() as db:
+                result = db.execute(statement.execution_options(yield_per=self.batch_rows))
+                for chunk, rows in enumerate(result.partitions(self.batch_rows)):
+                    columns = dict(zip(names, zip(*rows)))
+                    columns["date"] = [start.date().isoformat() for start in columns["start_time"]]
+                    pq.write_to_dataset(
+                        pa.table(columns, schema=self.schema), self.root,
+                        partitioning=self.partitioning,
+                        basename_template=f"part-{token}-{chunk}-{{i}}.parquet",
+                        existing_data_behavior="overwrite_or_ignore",
+                    )
+                    written += len(rows)
+            self._write_watermark(cutoff)
+
+            with self._lock:
+                self._exports += 1
+                self._rows_exported += written
+                self._last = {"rows": written, "export_ms": round((time.perf_counter() - started) * 1000, 1)}
+            return written
+
+    # ---- queries ----------------------------------------------------------
+
+    def dataset(self):
+        return ds.dataset(self.root, format="parquet", partitioning=self.partitioning, schema=self.schema)
+
+    def scan(self, columns: List[str], filter=None):
+        """Read the named columns of the rows matching a pyarrow.dataset filter expression."""
+        if not os.path.isdir(self.root):
+            return self.schema.empty_table().select(columns)
+        return self.dataset().to_table(columns=columns, filter=filter)
+
+    def revenue_series(self, granularity: Granularity, start: datetime, end: datetime) -> List[dict]:
+        """analytics.RevenueAnalytics.series() over archived rides; cancellations are not archived."""
+        first, last = bucket_range(granularity, start, end)
+        low, high = bucket_start(granularity, first), bucket_start(granularity, last + 1)
+        n = last - first + 1
+        # Rides start before they are paid, so partitions after `high` hold nothing for this range
+        in_dates = ds.field("date") <= (high - timedelta(microseconds=1)).date().isoformat()
+
+        rides = self.scan(
+            ["start_time", "final_fare"],
+            in_dates & (ds.field("date") >= low.date().isoformat())
+            & (ds.field("start_time") >= low) & (ds.field("start_time") < high),
+        )
+        index = bucket_of_seconds(granularity, _seconds(rides["start_time"])) - first
+        ride_counts = np.bincount(index, minlength=n)
+        gross = np.bincount(index, weights=rides["final_fare"].to_numpy(zero_copy_only=False), minlength=n)
+
+        payments = self.scan(
+            ["payment_timestamp", "payment_status", "payment_amount"],
+            in_dates & (ds.field("payment_timestamp") >= low) & (ds.field("payment_timestamp") < high),
+        )
+        index = bucket_of_seconds(granularity, _seconds(payments["payment_timestamp"])) - first
+        status = payments["payment_status"].to_numpy(zero_copy_only=False)
+        amount = payments["payment_amount"].to_numpy(zero_copy_only=False)
+        totals = {}
+        for name in ("completed", "pending"):
+            mask = status == name
+            totals[name] = (np.bincount(index[mask], minlength=n),
+                            np.bincount(index[mask], weights=amount[mask], minlength=n))
+
+        fields = EMPTY_BUCKET._fields
+        return [
+            {
+                "bucket_start": bucket_start(granularity, first + i),
+                **dict(zip(fields, (
+                    int(ride_counts[i]), float(gross[i]),
+                    int(totals["completed"][0][i]), float(totals["completed"][1][i]),
+                    int(totals["pending"][0][i]), float(totals["pending"][1][i]),
+                    None,
+                ))),
+            }
+            for i in range(n)
+        ]
+
+    # ---- background -------------------------------------------------------
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.export()
+            except Exception:
+                logger.exception("Ride archive export failed")
+                with self._lock:
+                    self._errors += 1
+
+    def start(self) -> None:
+        if self.interval <= 0:
+            return
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="ride-archive", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def stats(self) -> dict:
+        watermark = self.watermark()
+        with self._lock:
+            return {
+                "root": self.root,
+                "interval_s": self.interval,
+                "watermark": watermark.isoformat() if watermark else None,
+                "exports": self._exports,
+                "errors": self._errors,
+                "rows_exported": self._rows_exported,
+                "last_export": dict(self._last),
+            }
+
+
+ride_archive: Optional[RideArchive] = RideArchive(ARCHIVE_DIR) if ARCHIVE_DIR and pa is not None else None
+
+
+if __name__ == "__main__":
+    if ride_archive is None:
+        raise SystemExit("Set ARCHIVE_DIR (and install pyarrow) to use the ride archive")
+    print(f"Archived {ride_archive.export()} rides up to {ride_archive.watermark()}")
@@ -0,0 +1,154 @@
+"""Many drivers racing to accept the same booking.
+
+Every round seeds fresh "requested" bookings and fires one accept per driver
+per booking at the real `/bookings/{id}/accept` route, all at once, through
+httpx's ASGI transport. The conditional UPDATE must produce exactly one 200
+per booking; everyone else gets a 409. For contrast, the same race is run
+against the old read-then-write shape in plain threads, which lets several
+drivers "win" the same booking.
+
+    python -m benchmarks.bench_accept_race [--drivers 50] [--bookings 20] [--rounds 5] [--concurrency 25]
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+_tmp = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp.name, 'bench.db')}"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+
+import httpx  # noqa: E402
+
+from database import SessionLocal, async_engine, engine  # noqa: E402
+from main import app  # noqa: E402
+from models import Booking, Driver, Permission, Role, RolePermission, User  # noqa: E402
+from utils import create_access_token  # noqa: E402
+
+
+def seed_drivers(drivers: int) -> list:
+    db = SessionLocal()
+    db.add_all([Role(id=1, name="user"), Role(id=2, name="driver")])
+    db.add(Permission(id=1, name="accept_booking"))
+    db.add(RolePermission(role_id=2, permission_id=1))
+    db.add(User(user_id=1, name="rider", email="rider@example.com", phone_number="0",
+                password="x", created_at=datetime.utcnow().date(), role_id=1))
+    tokens = []
+    for i in range(drivers):
+        user_id = 1000 + i
+        email = f"driver{i}@example.com"
+        db.add(User(user_id=user_id, name=f"driver{i}", email=email, phone_number=str(i),
+                    password="x", created_at=datetime.utcnow().date(), role_id=2))
+        db.add(Driver(driver_id=i + 1, user_id=user_id, license=f"L{i}"))
+        tokens.append(create_access_token({"sub": email, "user_id": user_id, "role_id": 2}))
+    db.commit()
+    db.close()
+    return tokens
+
+
+def seed_bookings(count: int) -> list:
+    db = SessionLocal()
+    now = datetime.utcnow()
+    bookings = [
+        Booking(user_id=1, pickup_location="A", dropoff_location="B", pickup_time=now,
+                fare_estimate=100.0, status="requested", created_at=now)
+        for _ in range(count)
+    ]
+    db.add_all(bookings)
+    db.commit()
+    ids = [b.booking_id for b in bookings]
+    db.close()
+    return ids
+
+
+async def race_round(client: httpx.AsyncClient, tokens: list, booking_ids: list,
+                     semaphore: asyncio.Semaphore) -> Counter:
+    async def accept(token: str, booking_id: int):
+        async with semaphore:
+            response = await client.put(
+                f"/bookings/{booking_id}/accept",
+                params={"proposed_fare": 120.0},
+                headers={"Authorization": f"Bearer {token}"},
+            )
+        return booking_id, response.status_code
+
+    results = await asyncio.gather(*(accept(t, b) for b in booking_ids for t in tokens))
+    unexpected = {code for _, code in results if code not in (200, 409)}
+    if unexpected:
+        raise RuntimeError(f"unexpected status codes: {sorted(unexpected)}")
+    return Counter(booking_id for booking_id, code in results if code == 200)
+
+
+async def run_atomic(tokens: list, bookings: int, rounds: int, concurrency: int) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    semaphore = asyncio.Semaphore(concurrency)
+    requests, doubles, elapsed = 0, 0, 0.0
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for _ in range(rounds):
+            booking_ids = seed_bookings(bookings)
+            started = time.perf_counter()
+            winners = await race_round(client, tokens, booking_ids, semaphore)
+            elapsed += time.perf_counter() - started
+            requests += len(tokens) * len(booking_ids)
+            doubles += sum(1 for b in booking_ids if winners[b] != 1)
+    await async_engine.dispose()
+    return {"rps": round(requests / elapsed), "bad_bookings": doubles, "total": bookings * rounds}
+
+
+def run_legacy(drivers: int, bookings: int) -> dict:
+    """The pre-CAS shape: SELECT the requested booking, then assign it and commit."""
+    booking_ids = seed_bookings(bookings)
+    winners = Counter()
+    lock = threading.Lock()
+    barrier = threading.Barrier(drivers)
+
+    def driver(driver_id: int):
+        db = SessionLocal()
+        barrier.wait()
+        for booking_id in booking_ids:
+            booking = db.query(Booking).filter(
+                Booking.booking_id == booking_id, Booking.status == "requested"
+            ).first()
+            if booking:
+                booking.driver_id = driver_id
+                booking.status = "pending_user_confirmation"
+                db.commit()
+                with lock:
+                    winners[booking_id] += 1
+            else:
+                db.rollback()
+        db.close()
+
+    threads = [threading.Thread(target=driver, args=(i + 1,)) for i in range(drivers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return {"bad_bookings": sum(1 for b in booking_ids if winners[b] != 1), "total": bookings}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--drivers", type=int, default=50)
+    parser.add_argument("--bookings", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=25)
+    args = parser.parse_args()
+
+    tokens = seed_drivers(args.drivers)
+    atomic = asyncio.run(run_atomic(tokens, args.bookings, args.rounds, args.concurrency))
+    print(f"conditional UPDATE: {atomic['bad_bookings']}/{atomic['total']} bookings without exactly "
+          f"one winner  {atomic['rps']} accepts/s")
+    legacy = run_legacy(min(args.drivers, 16), args.bookings)
+    print(f"read-then-write:    {legacy['bad_bookings']}/{legacy['total']} bookings without exactly one winner")
+
+    engine.dispose()
+    _tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
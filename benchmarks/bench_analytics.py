@@ -0,0 +1,130 @@
+"""Revenue analytics: client-side aggregation of raw rows vs GROUP BY vs cached buckets.
+
+Seeds --rides completed rides (with a booking and a payment each) and some
+cancellations over the last --days days, then builds the daily and hourly
+series three ways:
+  rows     fetch every Ride/Payment/Booking row in range and bucket in Python,
+           which is what a chart built on /payments/date-range/ has to do
+  cold     RevenueAnalytics with an empty cache (one GROUP BY per table)
+  warm     the same query again: closed buckets from cache, open ones recomputed
+The hourly series covers the last 30 days. Checks that all three agree.
+
+    python -m benchmarks.bench_analytics [--rides 200000] [--days 90]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+_tmp = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp.name, 'bench.db')}"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+
+from sqlalchemy import select  # noqa: E402
+
+from analytics import RevenueAnalytics, bucket_index, bucket_start  # noqa: E402
+from database import Base, SessionLocal, engine  # noqa: E402
+from models import Booking, Driver, Payment, Ride, Role, User  # noqa: E402
+
+
+def seed(rides: int, days: int, now: datetime) -> None:
+    Base.metadata.create_all(bind=engine)
+    rng = random.Random(21)
+    span = days * 86400
+    with SessionLocal() as db:
+        db.add_all([Role(id=1, name="user"), Role(id=2, name="driver")])
+        db.add(User(user_id=1, name="rider", email="r@example.com", phone_number="0", password="x",
+                    created_at=now.date(), role_id=1))
+        db.add(User(user_id=2, name="driver", email="d@example.com", phone_number="1", password="x",
+                    created_at=now.date(), role_id=2))
+        db.add(Driver(driver_id=1, user_id=2, license="L"))
+        db.flush()
+        bookings, ride_rows, payments = [], [], []
+        for i in range(rides):
+            created = now - timedelta(seconds=rng.uniform(0, span))
+            started = created + timedelta(minutes=rng.uniform(2, 20))
+            fare = round(rng.uniform(60, 600), 2)
+            paid = rng.random() < 0.8
+            cancelled = rng.random() < 0.1
+            bookings.append({"booking_id": i + 1, "user_id": 1, "driver_id": 1, "pickup_location": "A",
+                             "dropoff_location": "B", "pickup_time": created, "fare_estimate": fare,
+                             "status": "cancelled" if cancelled else "paid" if paid else "completed",
+                             "created_at": created})
+            if cancelled:
+                continue
+            ride_rows.append({"booking_id": i + 1, "user_id": 1, "driver_id": 1, "start_time": started,
+                              "end_time": started + timedelta(minutes=15), "distance_travelled": 5.0,
+                              "final_fare": fare})
+            payments.append({"booking_id": i + 1, "user_id": 1, "amount": fare, "payment_method": "cash",
+                             "transaction_id": f"TXN-{i}", "status": "completed" if paid else "pending",
+                             "timestamp": started + timedelta(minutes=rng.uniform(15, 600) if paid else 15)})
+        db.bulk_insert_mappings(Booking, bookings)
+        db.bulk_insert_mappings(Ride, ride_rows)
+        db.bulk_insert_mappings(Payment, payments)
+        db.commit()
+
+
+def from_rows(db, granularity: str, start: datetime, end: datetime) -> list:
+    first, last = bucket_index(granularity, start), bucket_index(granularity, end)
+    low, high = bucket_start(granularity, first), bucket_start(granularity, last + 1)
+    totals = defaultdict(lambda: defaultdict(float))
+    for started, fare in db.execute(select(Ride.start_time, Ride.final_fare)
+                                    .where(Ride.start_time >= low, Ride.start_time < high)):
+        bucket = totals[bucket_index(granularity, started)]
+        bucket["rides"] += 1
+        bucket["gross_fare"] += fare
+    for timestamp, status, amount in db.execute(select(Payment.timestamp, Payment.status, Payment.amount)
+                                                .where(Payment.timestamp >= low, Payment.timestamp < high)):
+        bucket = totals[bucket_index(granularity, timestamp)]
+        bucket[f"{status}_payments"] += 1
+        bucket[f"{status}_amount"] += amount
+    for (created,) in db.execute(select(Booking.created_at).where(
+            Booking.status == "cancelled", Booking.created_at >= low, Booking.created_at < high)):
+        totals[bucket_index(granularity, created)]["cancellations"] += 1
+    return [(index, dict(totals[index])) for index in range(first, last + 1)]
+
+
+def comparable(series: list) -> list:
+    return [(round(b["rides"]), round(b["gross_fare"], 2), round(b["completed_amount"], 2),
+             round(b["pending_amount"], 2), round(b["cancellations"])) for b in series]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rides", type=int, default=200_000)
+    parser.add_argument("--days", type=int, default=90)
+    args = parser.parse_args()
+
+    now = datetime.utcnow()
+    seed(args.rides, args.days, now)
+    starts = {"day": now - timedelta(days=args.days), "hour": now - timedelta(days=min(args.days, 30))}
+    keys = ("rides", "gross_fare", "completed_amount", "pending_amount", "cancellations")
+    analytics = RevenueAnalytics()
+    with SessionLocal() as db:
+        for granularity, start in starts.items():
+            started = time.perf_counter()
+            rows = [{k: v.get(k, 0) for k in keys} for _, v in from_rows(db, granularity, start, now)]
+            rows_ms = (time.perf_counter() - started) * 1000
+
+            started = time.perf_counter()
+            cold = analytics.series(db, granularity, start, now, now=now)
+            cold_ms = (time.perf_counter() - started) * 1000
+
+            started = time.perf_counter()
+            warm = analytics.series(db, granularity, start, now, now=now)
+            warm_ms = (time.perf_counter() - started) * 1000
+
+            match = comparable(rows) == comparable(cold) == comparable(warm)
+            print(f"{granularity:>5} x {len(cold):>5} buckets: rows {rows_ms:>8.1f} ms   cold {cold_ms:>7.1f} ms   "
+                  f"warm {warm_ms:>6.2f} ms   match {match}")
+    print(analytics.stats())
+
+    engine.dispose()
+    _tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Ride archive: Parquet export throughput and archive vs OLTP analytics.
+
+Seeds --rides closed rides (booking + payment each) over the last --days
+days, exports them with RideArchive in two incremental runs (everything up
+to a week ago, then the rest), and builds the daily revenue series for the
+last week and for the whole range two ways:
+  live     RevenueAnalytics with an empty cache, GROUP BYs on SQLite
+  archive  RideArchive.revenue_series(), a pyarrow.dataset scan with the
+           date range pushed down to partitions and row groups
+Checks the two agree on every archived column (cancellations are live only)
+and that a repeated export writes nothing.
+
+    python -m benchmarks.bench_archive [--rides 200000] [--days 90] [--batch 50000]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+_tmp = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp.name, 'bench.db')}"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+
+from analytics import RevenueAnalytics  # noqa: E402
+from archive import RideArchive  # noqa: E402
+from database import Base, SessionLocal, engine  # noqa: E402
+from models import Booking, Driver, Payment, Ride, Role, User  # noqa: E402
+
+ARCHIVED = ("rides", "gross_fare", "completed_payments", "completed_amount", "pending_payments", "pending_amount")
+
+
+def seed(rides: int, days: int, now: datetime) -> None:
+    Base.metadata.create_all(bind=engine)
+    rng = random.Random(24)
+    span = days * 86400
+    with SessionLocal() as db:
+        db.add_all([Role(id=1, name="user"), Role(id=2, name="driver")])
+        db.add(User(user_id=1, name="rider", email="r@example.com", phone_number="0", password="x",
+                    created_at=now.date(), role_id=1))
+        db.add(User(user_id=2, name="driver", email="d@example.com", phone_number="1", password="x",
+                    created_at=now.date(), role_id=2))
+        db.add(Driver(driver_id=1, user_id=2, license="L"))
+        db.flush()
+        bookings, ride_rows, payments = [], [], []
+        for i in range(rides):
+            # Keep the newest rides a day clear of now so all of them are past the export delay
+            created = now - timedelta(days=1, seconds=rng.uniform(3600, span))
+            started = created + timedelta(minutes=rng.uniform(2, 20))
+            fare = round(rng.uniform(60, 600), 2)
+            paid = rng.random() < 0.8
+            bookings.append({"booking_id": i + 1, "user_id": 1, "driver_id": 1, "pickup_location": "A",
+                             "dropoff_location": "B", "pickup_time": created, "fare_estimate": fare,
+                             "status": "paid" if paid else "completed", "created_at": created,
+                             "pickup_latitude": 12.9, "pickup_longitude": 77.6,
+                             "dropoff_latitude": 13.0, "dropoff_longitude": 77.5})
+            ride_rows.append({"booking_id": i + 1, "user_id": 1, "driver_id": 1, "start_time": started,
+                              "end_time": started + timedelta(minutes=15), "distance_travelled": 5.0,
+                              "final_fare": fare, "rating_by_user": rng.randint(1, 5)})
+            payments.append({"booking_id": i + 1, "user_id": 1, "amount": fare, "payment_method": "cash",
+                             "transaction_id": f"TXN-{i}", "status": "completed" if paid else "pending",
+                             "timestamp": started + timedelta(minutes=rng.uniform(15, 600) if paid else 15)})
+        db.bulk_insert_mappings(Booking, bookings)
+        db.bulk_insert_mappings(Ride, ride_rows)
+        db.bulk_insert_mappings(Payment, payments)
+        db.commit()
+
+
+def comparable(series: list) -> list:
+    return [tuple(round(b[k], 2) for k in ARCHIVED) for b in series]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rides", type=int, default=200_000)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--batch", type=int, default=50_000, help="rows per Parquet write")
+    args = parser.parse_args()
+
+    now = datetime.utcnow()
+    seed(args.rides, args.days, now)
+    archive = RideArchive(os.path.join(_tmp.name, "archive"), delay=0, batch_rows=args.batch)
+
+    total = 0
+    for label, moment in (("first export", now - timedelta(days=7)), ("incremental", now), ("repeat", now)):
+        started = time.perf_counter()
+        written = archive.export(now=moment)
+        elapsed = time.perf_counter() - started
+        total += written
+        rate = f"{written / elapsed:>9.0f} rows/s" if written else ""
+        print(f"{label:>13}: {written:>7} rides in {elapsed * 1000:>7.1f} ms  {rate}")
+    size = sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(archive.root) for f in files)
+    print(f"archive: {total} rides, {size / 1e6:.1f} MB on disk, watermark {archive.watermark()}")
+
+    with SessionLocal() as db:
+        for label, start in (("last week", now - timedelta(days=7)), ("full range", now - timedelta(days=args.days))):
+            started = time.perf_counter()
+            live = RevenueAnalytics().series(db, "day", start, now, now=now)
+            live_ms = (time.perf_counter() - started) * 1000
+            started = time.perf_counter()
+            cold = archive.revenue_series("day", start, now)
+            archive_ms = (time.perf_counter() - started) * 1000
+            print(f"{label:>10} x {len(live):>3} days: live {live_ms:>7.1f} ms   archive {archive_ms:>6.1f} ms   "
+                  f"match {comparable(live) == comparable(cold)}")
+    print(archive.stats())
+
+    engine.dispose()
+    _tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Sync (get_db + threadpool) vs async (get_async_db) endpoint throughput.
+
+Both endpoints run the same "available bookings" query against a scratch
+copy of the schema. Requests are driven in-process through httpx's ASGI
+transport, so the numbers measure the server path only.
+
+    python -m benchmarks.bench_async_db [--requests 5000] [--concurrency 500]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+_tmp = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp.name, 'bench.db')}"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+
+import httpx  # noqa: E402
+from fastapi import Depends, FastAPI  # noqa: E402
+from sqlalchemy import select  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncSession  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from database import Base, SessionLocal, async_engine, engine, get_async_db, get_db  # noqa: E402
+from models import Booking, Role, User  # noqa: E402
+
+app = FastAPI()
+
+
+@app.get("/sync")
+def available_sync(db: Session = Depends(get_db)):
+    return len(db.query(Booking).filter(Booking.status == "requested").limit(50).all())
+
+
+@app.get("/async")
+async def available_async(db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(select(Booking).where(Booking.status == "requested").limit(50))
+    return len(result.scalars().all())
+
+
+def seed(bookings: int) -> None:
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    db.add(Role(id=1, name="user"))
+    db.add(User(user_id=1, name="bench", email="bench@example.com", phone_number="0",
+                password="x", created_at=datetime.utcnow().date(), role_id=1))
+    now = datetime.utcnow()
+    db.add_all(
+        Booking(user_id=1, pickup_location="A", dropoff_location="B", pickup_time=now,
+                fare_estimate=100.0, status="requested" if i % 10 == 0 else "paid", created_at=now)
+        for i in range(bookings)
+    )
+    db.commit()
+    db.close()
+
+
+async def drive(path: str, total: int, concurrency: int) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one():
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.get(path)
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(total)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "rps": round(total / elapsed),
+        "p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 1),
+    }
+
+
+async def main_async(args) -> None:
+    for path in ("/sync", "/async"):
+        await drive(path, min(200, args.requests), args.concurrency)  # warm up pools
+        result = await drive(path, args.requests, args.concurrency)
+        print(f"{path:>6}: {result['rps']:>6} req/s  p50 {result['p50_ms']} ms  p99 {result['p99_ms']} ms")
+    await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=500)
+    parser.add_argument("--bookings", type=int, default=20_000)
+    args = parser.parse_args()
+
+    seed(args.bookings)
+    asyncio.run(main_async(args))
+    engine.dispose()
+    _tmp.cleanup()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,139 @@
+"""Booking status push over WebSocket vs riders polling GET /bookings/{id}.
+
+Starts the app under uvicorn in a background thread, seeds one booking per
+rider and opens one /bookings/ws socket per rider. Every booking then goes
+through accept, confirm, start and end via the real routes. Reports how long
+each transition takes to reach its rider. It also reports the request rate
+the same riders would put on the API by polling at --poll-interval.
+
+    python -m benchmarks.bench_booking_ws [--riders 500] [--poll-interval 2]
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+_tmp = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp.name, 'bench.db')}"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+
+import httpx  # noqa: E402
+import uvicorn  # noqa: E402
+import websockets  # noqa: E402
+
+from database import SessionLocal, engine  # noqa: E402
+from events import broker  # noqa: E402
+from main import app  # noqa: E402
+from models import Booking, Driver, Permission, Role, RolePermission, User  # noqa: E402
+from utils import create_access_token  # noqa: E402
+
+TRANSITIONS = (("accept", {"proposed_fare": 120.0}), ("confirm", None), ("start", None), ("end", None))
+
+
+def seed(riders: int) -> tuple:
+    db = SessionLocal()
+    db.add_all([Role(id=1, name="user"), Role(id=2, name="driver")])
+    grants = [(1, "confirm_booking"), (2, "accept_booking"), (2, "start_ride"), (2, "end_ride_with_rating")]
+    for permission_id, (role_id, name) in enumerate(grants, start=1):
+        db.add(Permission(id=permission_id, name=name))
+        db.add(RolePermission(role_id=role_id, permission_id=permission_id))
+    now = datetime.utcnow()
+    db.add(User(user_id=1, name="driver", email="driver@example.com", phone_number="0",
+                password="x", created_at=now.date(), role_id=2))
+    db.add(Driver(driver_id=1, user_id=1, license="L1"))
+    bookings = []
+    for i in range(riders):
+        user_id, email = 1000 + i, f"rider{i}@example.com"
+        db.add(User(user_id=user_id, name=f"rider{i}", email=email, phone_number=str(i),
+                    password="x", created_at=now.date(), role_id=1))
+        booking = Booking(user_id=user_id, pickup_location="A", dropoff_location="B", pickup_time=now,
+                          fare_estimate=100.0, status="requested", created_at=now)
+        db.add(booking)
+        bookings.append((booking, create_access_token({"sub": email, "user_id": user_id, "role_id": 1})))
+    db.commit()
+    pairs = [(booking.booking_id, token) for booking, token in bookings]
+    db.close()
+    return pairs, create_access_token({"sub": "driver@example.com", "user_id": 1, "role_id": 2})
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def run(port: int, riders: list, driver_token: str) -> list:
+    received = {}  # (booking_id, status) -> perf_counter when its rider saw it
+
+    async def listen(token: str, ready: asyncio.Event):
+        async with websockets.connect(f"ws://127.0.0.1:{port}/bookings/ws?token={token}") as ws:
+            ready.set()
+            async for raw in ws:
+                data = json.loads(raw)["data"]
+                received[(data["booking_id"], data["status"])] = time.perf_counter()
+
+    readies = [asyncio.Event() for _ in riders]
+    listeners = [asyncio.create_task(listen(token, ready)) for (_, token), ready in zip(riders, readies)]
+    for ready in readies:
+        await ready.wait()
+    while broker.subscriber_count() < len(riders):
+        await asyncio.sleep(0.01)
+    print(f"{len(riders)} sockets open; {threading.active_count()} threads in process")
+
+    latencies = []
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=None) as client:
+        for step, params in TRANSITIONS:
+            for booking_id, rider_token in riders:
+                token = rider_token if step == "confirm" else driver_token
+                sent = time.perf_counter()
+                response = await client.put(
+                    f"/bookings/{booking_id}/{step}", params=params, headers={"Authorization": f"Bearer {token}"}
+                )
+                response.raise_for_status()
+                key = (booking_id, response.json()["status"])
+                while key not in received:
+                    await asyncio.sleep(0.0005)
+                latencies.append(received[key] - sent)
+
+    for task in listeners:
+        task.cancel()
+    await asyncio.gather(*listeners, return_exceptions=True)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--riders", type=int, default=500)
+    parser.add_argument("--poll-interval", type=float, default=2.0)
+    args = parser.parse_args()
+
+    riders, driver_token = seed(args.riders)
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning",
+                                           backlog=args.riders, lifespan="off"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+
+    latencies = sorted(asyncio.run(run(port, riders, driver_token)))
+    print(f"{len(latencies)} transitions pushed: request sent -> rider notified "
+          f"p50 {statistics.median(latencies) * 1000:.1f} ms  "
+          f"p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:.1f} ms")
+    print(f"polling every {args.poll_interval:g} s instead: {args.riders / args.poll_interval:.0f} GET/s "
+          f"while idle, and up to {args.poll_interval:g} s to notice each change")
+
+    server.should_exit = True
+    thread.join(timeout=10)
+    engine.dispose()
+    _tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Driver dashboard cost vs ride history: per-request aggregates vs stored totals.
+
+Seeds one driver with --history rides, then times --loads dashboard loads
+each way: the old handler (four aggregates over Rides, then a lazy booking
+load per recent ride) and get_driver_dashboard (the Drivers row plus one
+joined query). Prints SQL statements per load and checks the two agree.
+
+    python -m benchmarks.bench_driver_dashboard [--history 100000] [--loads 200]
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+_tmp = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp.name, 'bench.db')}"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+
+from sqlalchemy import event, func  # noqa: E402
+
+from apis.driver_api import get_driver_dashboard  # noqa: E402
+from database import Base, SessionLocal, engine  # noqa: E402
+from driver_stats import backfill_driver_stats  # noqa: E402
+from models import Booking, Driver, Ride, Role, User  # noqa: E402
+from utils import AuthContext, Principal, RoleGrant  # noqa: E402
+
+
+def seed(history: int) -> None:
+    Base.metadata.create_all(bind=engine)
+    now = datetime.utcnow()
+    with SessionLocal() as db:
+        db.add_all([Role(id=1, name="user"), Role(id=2, name="driver")])
+        db.add(User(user_id=1, name="rider", email="r@example.com", phone_number="0", password="x",
+                    created_at=now.date(), role_id=1))
+        db.add(User(user_id=2, name="driver", email="d@example.com", phone_number="1", password="x",
+                    created_at=now.date(), role_id=2))
+        db.add(Driver(driver_id=1, user_id=2, license="L"))
+        db.flush()
+        db.bulk_insert_mappings(Booking, [
+            {"booking_id": i + 1, "user_id": 1, "driver_id": 1, "pickup_location": f"P{i}",
+             "dropoff_location": f"D{i}", "pickup_time": now, "fare_estimate": 100.0 + i % 50,
+             "status": "completed", "created_at": now}
+            for i in range(history)
+        ])
+        db.bulk_insert_mappings(Ride, [
+            {"booking_id": i + 1, "user_id": 1, "driver_id": 1, "start_time": now - timedelta(minutes=i),
+             "end_time": now if i % 10 else None, "distance_travelled": 1.0, "final_fare": 100.0 + i % 50,
+             "rating_by_user": 1 + i % 5 if i % 3 else None}
+            for i in range(history)
+        ])
+        db.commit()
+    backfill_driver_stats(engine)
+
+
+def legacy(db, driver_id: int) -> dict:
+    driver = db.query(Driver).filter(Driver.driver_id == driver_id).first()
+    total_rides = db.query(Ride).filter(Ride.driver_id == driver.driver_id).count()
+    completed_rides = db.query(Ride).filter(Ride.driver_id == driver.driver_id, Ride.end_time.isnot(None)).count()
+    total_earnings = db.query(func.sum(Ride.final_fare)).filter(Ride.driver_id == driver.driver_id).scalar() or 0
+    avg_rating = db.query(func.avg(Ride.rating_by_user)).filter(Ride.driver_id == driver.driver_id).scalar() or 0
+    recent = db.query(Ride).filter(Ride.driver_id == driver.driver_id).order_by(Ride.start_time.desc()).limit(5).all()
+    return {
+        "driver_id": driver.driver_id,
+        "total_rides": total_rides,
+        "completed_rides": completed_rides,
+        "total_earnings": total_earnings,
+        "avg_rating": round(avg_rating, 1),
+        "recent_rides": [
+            {"ride_id": r.ride_id, "pickup": r.booking.pickup_location, "dropoff": r.booking.dropoff_location,
+             "status": r.booking.status}
+            for r in recent
+        ],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--history", type=int, default=100_000)
+    parser.add_argument("--loads", type=int, default=200)
+    args = parser.parse_args()
+
+    seed(args.history)
+    auth = AuthContext(Principal(2, "d@example.com", 2), RoleGrant("driver", frozenset()))
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *a: statements.append(a[2]))
+
+    results = {}
+    runs = (("aggregate", lambda db: legacy(db, 1)), ("stored", lambda db: get_driver_dashboard(1, db=db, auth=auth)))
+    for name, load in runs:
+        with SessionLocal() as db:
+            statements.clear()
+            started = time.perf_counter()
+            for _ in range(args.loads):
+                results[name] = load(db)
+                db.expire_all()
+            per_load = (time.perf_counter() - started) / args.loads
+        queries = sum(not s.lstrip().upper().startswith(("BEGIN", "COMMIT", "ROLLBACK")) for s in statements)
+        print(f"{name:>9}: {per_load * 1000:>8.3f} ms per load, {queries / args.loads:.0f} queries, "
+              f"{args.history} rides")
+    print(f"dashboards match: {results['aggregate'] == results['stored']}")
+
+    engine.dispose()
+    _tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Fare/ETA quotes: cache hits vs routing misses, single vs batch.
+
+Trips are random pickup/dropoff pairs over a metro-sized box, drawn from a
+pool of --distinct trips so that repeats hit the route cache. Runs the
+Haversine provider and a synthetic --grid x --grid road graph.
+
+    python -m benchmarks.bench_fares [--quotes 100000] [--distinct 5000] [--grid 150]
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from fares import FareEngine, HaversineProvider, RoadGraphProvider
+
+LAT_RANGE = (12.75, 13.15)
+LON_RANGE = (77.35, 77.80)
+
+
+def grid_graph(n: int) -> RoadGraphProvider:
+    """n x n street grid over the box, both directions, with random per-edge speeds."""
+    rng = np.random.default_rng(5)
+    lat, lon = np.meshgrid(np.linspace(*LAT_RANGE, n), np.linspace(*LON_RANGE, n), indexing="ij")
+    node = np.arange(n * n).reshape(n, n)
+    pairs = np.concatenate([
+        np.column_stack([node[:, :-1].ravel(), node[:, 1:].ravel()]),
+        np.column_stack([node[:-1, :].ravel(), node[1:, :].ravel()]),
+    ])
+    pairs = np.concatenate([pairs, pairs[:, ::-1]])
+    flat_lat, flat_lon = lat.ravel(), lon.ravel()
+    km = HaversineProvider(detour_factor=1.0)
+    edge_km = np.array([km.route(flat_lat[a], flat_lon[a], flat_lat[b], flat_lon[b]).distance_km for a, b in pairs])
+    edge_min = edge_km / rng.uniform(15, 45, len(pairs)) * 60
+    return RoadGraphProvider(flat_lat, flat_lon, pairs[:, 0], pairs[:, 1], edge_km, edge_min)
+
+
+def run(name: str, engine: FareEngine, pool: list, quotes: int, rng: random.Random) -> None:
+    started = time.perf_counter()
+    for trip in pool:
+        engine.quote(*trip)
+    miss_us = (time.perf_counter() - started) / len(pool) * 1e6
+
+    trips = [rng.choice(pool) for _ in range(quotes)]
+    started = time.perf_counter()
+    for trip in trips:
+        engine.cached_quote(*trip)
+    hit_us = (time.perf_counter() - started) / quotes * 1e6
+
+    engine.clear()
+    batch = pool[:1000]
+    started = time.perf_counter()
+    engine.quote_many(batch)
+    batch_us = (time.perf_counter() - started) / len(batch) * 1e6
+
+    print(f"{name:>10}: miss {miss_us:>9.1f} us   hit {hit_us:>5.2f} us   "
+          f"batch of {len(batch)} cold {batch_us:>8.1f} us/trip   {engine.stats()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--quotes", type=int, default=100_000)
+    parser.add_argument("--distinct", type=int, default=5000)
+    parser.add_argument("--grid", type=int, default=150)
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    # Batches from a few hubs (airport, station) share a Dijkstra run per origin
+    hubs = [(rng.uniform(*LAT_RANGE), rng.uniform(*LON_RANGE)) for _ in range(20)]
+    pool = [
+        (*rng.choice(hubs), rng.uniform(*LAT_RANGE), rng.uniform(*LON_RANGE))
+        for _ in range(args.distinct)
+    ]
+
+    run("haversine", FareEngine(HaversineProvider()), pool, args.quotes, rng)
+    started = time.perf_counter()
+    graph = grid_graph(args.grid)
+    print(f"road graph: {args.grid * args.grid} nodes built in {time.perf_counter() - started:.1f} s")
+    run("road graph", FareEngine(graph), pool[: max(1, args.distinct // 10)], args.quotes, rng)
+
+
+if __name__ == "__main__":
+    main()
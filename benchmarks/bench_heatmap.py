@@ -0,0 +1,120 @@
+"""Demand heatmap refresh: binning from Bookings vs the in-memory window.
+
+Seeds --bookings bookings spread over --days days, with pickups and dropoffs
+clustered around a few hotspots, then renders a --cells x --cells heatmap of
+the last hour and the last day:
+  database  read the window's coordinates from Bookings, one histogram2d
+  memory    DemandHeatmap slots, one histogram2d
+  loop      the memory points binned one booking at a time in Python
+Also times DemandHeatmap.record() and checks all three grids agree.
+
+    python -m benchmarks.bench_heatmap [--bookings 1000000] [--days 30] [--cells 100]
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+_tmp = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp.name, 'bench.db')}"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+
+import numpy as np  # noqa: E402
+
+from database import Base, SessionLocal, engine  # noqa: E402
+from heatmap import Bounds, DemandHeatmap, bin_points, points_from_db  # noqa: E402
+from models import Booking, Role, User  # noqa: E402
+
+BOUNDS = Bounds(12.75, 13.15, 77.35, 77.80)
+CHUNK = 100_000
+
+
+def seed(bookings: int, days: int, now: datetime) -> None:
+    Base.metadata.create_all(bind=engine)
+    rng = np.random.default_rng(8)
+    hotspots = rng.uniform((BOUNDS.min_lat, BOUNDS.min_lon), (BOUNDS.max_lat, BOUNDS.max_lon), (12, 2))
+    with SessionLocal() as db:
+        db.add(Role(id=1, name="user"))
+        db.add(User(user_id=1, name="rider", email="r@example.com", phone_number="0", password="x",
+                    created_at=now.date(), role_id=1))
+        db.commit()
+    for offset in range(0, bookings, CHUNK):
+        n = min(CHUNK, bookings - offset)
+        pickup = hotspots[rng.integers(0, len(hotspots), n)] + rng.normal(0, 0.01, (n, 2))
+        dropoff = rng.uniform((BOUNDS.min_lat, BOUNDS.min_lon), (BOUNDS.max_lat, BOUNDS.max_lon), (n, 2))
+        ages = rng.uniform(0, days * 86400, n)
+        with SessionLocal() as db:
+            db.bulk_insert_mappings(Booking, [
+                {"user_id": 1, "pickup_location": "A", "dropoff_location": "B", "pickup_time": now,
+                 "fare_estimate": 100.0, "status": "requested", "created_at": now - timedelta(seconds=float(age)),
+                 "pickup_latitude": float(p[0]), "pickup_longitude": float(p[1]),
+                 "dropoff_latitude": float(d[0]), "dropoff_longitude": float(d[1])}
+                for p, d, age in zip(pickup, dropoff, ages)
+            ])
+            db.commit()
+
+
+def loop_bin(points: np.ndarray, cells: int) -> np.ndarray:
+    counts = np.zeros((cells, cells), dtype=np.int64)
+    lat_step = (BOUNDS.max_lat - BOUNDS.min_lat) / cells
+    lon_step = (BOUNDS.max_lon - BOUNDS.min_lon) / cells
+    for lat, lon, _, _ in points.tolist():
+        if BOUNDS.min_lat <= lat <= BOUNDS.max_lat and BOUNDS.min_lon <= lon <= BOUNDS.max_lon:
+            row = min(int((lat - BOUNDS.min_lat) / lat_step), cells - 1)
+            col = min(int((lon - BOUNDS.min_lon) / lon_step), cells - 1)
+            counts[row, col] += 1
+    return counts
+
+
+def timed(fn, repeat: int = 5):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bookings", type=int, default=1_000_000)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--cells", type=int, default=100)
+    args = parser.parse_args()
+
+    now = datetime.utcnow()
+    started = time.perf_counter()
+    seed(args.bookings, args.days, now)
+    print(f"seeded {args.bookings} bookings in {time.perf_counter() - started:.1f} s")
+
+    heatmap = DemandHeatmap()
+    with SessionLocal() as db:
+        started = time.perf_counter()
+        loaded = heatmap.load(db, now=now)
+        print(f"loaded {loaded} bookings from the last {heatmap.horizon} in {time.perf_counter() - started:.2f} s")
+
+        for label, window in (("hour", timedelta(hours=1)), ("day", timedelta(hours=23, minutes=59))):
+            start = now - window
+            db_ms, (db_counts, _) = timed(lambda: bin_points(points_from_db(db, start, now), "pickup",
+                                                              args.cells, args.cells, BOUNDS))
+            mem_ms, (mem_counts, _) = timed(lambda: bin_points(heatmap.points(start, now), "pickup",
+                                                               args.cells, args.cells, BOUNDS))
+            loop_ms, loop_counts = timed(lambda: loop_bin(heatmap.points(start, now), args.cells), repeat=1)
+            # Memory rounds the window out to whole minutes; the database reads it exactly
+            agree = abs(int(mem_counts.sum()) - int(db_counts.sum())) <= int(db_counts.sum()) * 0.01
+            print(f"{label:>5}: {int(db_counts.sum()):>7} pickups  database {db_ms:>8.1f} ms  memory {mem_ms:>6.2f} ms  "
+                  f"loop {loop_ms:>8.1f} ms  totals agree {agree}  loop matches {np.array_equal(mem_counts, loop_counts)}")
+
+    n = 100_000
+    started = time.perf_counter()
+    for i in range(n):
+        heatmap.record(now, 12.9, 77.6, 13.0, 77.5)
+    print(f"record: {(time.perf_counter() - started) / n * 1e6:.2f} us per booking  {heatmap.stats()}")
+
+    engine.dispose()
+    _tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
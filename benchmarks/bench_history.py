@@ -0,0 +1,233 @@
+"""Hot/cold split: mover throughput, listing cost and results before vs after.
+
+Seeds --bookings bookings over the last --days days for many riders and
+drivers. Most are paid, some cancelled, and recent ones are still in flight.
+Each finished booking has its ride and payment, and a few have complaints,
+some still open. Then:
+  before   time the first page of bookings_by_user / get_rides_by_driver for
+           every sampled rider and driver, and walk their full listings
+  move     HistoryMover with --retention-days, --batch bookings per transaction
+  after    the same first pages (hot tables only), and the full walks again
+           with history=true, which must match the walks from before
+Also checks that revenue analytics and the stats backfills give the same
+numbers once rows have moved.
+
+    python -m benchmarks.bench_history [--bookings 200000] [--days 365] [--retention-days 90] [--batch 1000]
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+_tmp = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp.name, 'bench.db')}"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+
+from fastapi import Response  # noqa: E402
+from sqlalchemy import func, select  # noqa: E402
+
+from analytics import RevenueAnalytics  # noqa: E402
+from apis.booking_api import bookings_by_user  # noqa: E402
+from apis.ride_api import get_rides_by_driver  # noqa: E402
+from database import AsyncSessionLocal, Base, SessionLocal, async_engine, engine  # noqa: E402
+from driver_stats import backfill_driver_stats  # noqa: E402
+from history import HistoryMover  # noqa: E402
+from migrations import run_migrations  # noqa: E402
+from models import (  # noqa: E402
+    ArchivedBooking, ArchivedRide, Booking, Complaint, Driver, Payment, Ride, Role, User,
+)
+from pagination import NEXT_CURSOR_HEADER, PageParams  # noqa: E402
+from ratings import backfill_rating_stats  # noqa: E402
+from schemas import BookingResponse, RideResponse  # noqa: E402
+from utils import AuthContext, Principal, RoleGrant  # noqa: E402
+
+RIDERS = 2000
+DRIVERS = 200
+SAMPLE = 50
+PAGE = 100
+ADMIN = AuthContext(Principal(0, "admin@example.com", 3), RoleGrant("admin", frozenset()))
+
+
+def seed(bookings: int, days: int, now: datetime) -> None:
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    rng = random.Random(25)
+    with SessionLocal() as db:
+        db.add_all([Role(id=1, name="user"), Role(id=2, name="driver")])
+        db.bulk_insert_mappings(User, [
+            {"user_id": i, "name": f"u{i}", "email": f"u{i}@example.com", "phone_number": str(i), "password": "x",
+             "created_at": now.date(), "role_id": 2 if i > RIDERS else 1}
+            for i in range(1, RIDERS + DRIVERS + 1)
+        ])
+        db.bulk_insert_mappings(Driver, [
+            {"driver_id": d, "user_id": RIDERS + d, "license": f"L{d}"} for d in range(1, DRIVERS + 1)
+        ])
+        booking_rows, rides, payments, complaints = [], [], [], []
+        for booking_id in range(1, bookings + 1):
+            # Ids grow with time, as they do when rows are inserted live
+            created = now - timedelta(days=days) * (1 - booking_id / (bookings + 1))
+            user_id, driver_id = rng.randint(1, RIDERS), rng.randint(1, DRIVERS)
+            fare = round(rng.uniform(60, 600), 2)
+            roll = rng.random()
+            recent = now - created < timedelta(hours=2)
+            status = ("ongoing" if roll < 0.5 else "requested") if recent else "cancelled" if roll < 0.15 else "paid"
+            booking_rows.append({
+                "booking_id": booking_id, "user_id": user_id, "driver_id": driver_id, "pickup_location": "A",
+                "dropoff_location": "B", "pickup_time": created, "fare_estimate": fare, "status": status,
+                "created_at": created, "pickup_latitude": 12.9, "pickup_longitude": 77.6,
+            })
+            if status in ("paid", "ongoing"):
+                started = created + timedelta(minutes=10)
+                ended = started + timedelta(minutes=20) if status == "paid" else None
+                rides.append({
+                    "ride_id": len(rides) + 1, "booking_id": booking_id, "user_id": user_id, "driver_id": driver_id,
+                    "start_time": started, "end_time": ended, "distance_travelled": 5.0, "final_fare": fare,
+                    "rating_by_user": rng.randint(1, 5) if ended else None,
+                    "rating_by_driver": rng.randint(1, 5) if ended else None,
+                })
+            if status == "paid":
+                payments.append({
+                    "booking_id": booking_id, "user_id": user_id, "amount": fare, "payment_method": "cash",
+                    "transaction_id": f"TXN-{booking_id}", "status": "completed",
+                    "timestamp": created + timedelta(minutes=40),
+                })
+                if rng.random() < 0.01:
+                    open_complaint = rng.random() < 0.2
+                    complaints.append({
+                        "user_id": user_id, "ride_id": len(rides), "description": "late", "created_at": created,
+                        "status": "open" if open_complaint else "resolved",
+                        "resolved_at": None if open_complaint else created + timedelta(days=1),
+                    })
+        db.bulk_insert_mappings(Booking, booking_rows)
+        db.bulk_insert_mappings(Ride, rides)
+        db.bulk_insert_mappings(Payment, payments)
+        db.bulk_insert_mappings(Complaint, complaints)
+        db.commit()
+    backfill_driver_stats(engine)
+    backfill_rating_stats(engine)
+
+
+def walk(fetch) -> list:
+    """Every row of a keyset-paginated listing, following the cursor header."""
+    rows, cursor = [], None
+    while True:
+        response = Response()
+        rows += fetch(PageParams(limit=PAGE, cursor=cursor), response)
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if cursor is None:
+            return rows
+
+
+async def walk_async(fetch) -> list:
+    rows, cursor = [], None
+    while True:
+        response = Response()
+        rows += await fetch(PageParams(limit=PAGE, cursor=cursor), response)
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if cursor is None:
+            return rows
+
+
+def user_bookings(db, user_id: int, history: bool):
+    return lambda page, response: bookings_by_user(user_id, response, history=history, db=db, page=page, _=None)
+
+
+def driver_rides(db, driver_id: int, history: bool):
+    return lambda page, response: get_rides_by_driver(driver_id, response, history=history, db=db, page=page,
+                                                      auth=ADMIN)
+
+
+async def listings(users: list, drivers: list, history: bool) -> dict:
+    """First-page timings and full walks for the sampled riders and drivers."""
+    result = {"bookings": {}, "rides": {}}
+    with SessionLocal() as db:
+        started = time.perf_counter()
+        for user_id in users:
+            user_bookings(db, user_id, history)(PageParams(limit=PAGE, cursor=None), Response())
+        result["bookings_ms"] = (time.perf_counter() - started) / len(users) * 1000
+        for user_id in users:
+            rows = walk(user_bookings(db, user_id, history))
+            result["bookings"][user_id] = [BookingResponse.model_validate(r, from_attributes=True) for r in rows]
+    async with AsyncSessionLocal() as db:
+        started = time.perf_counter()
+        for driver_id in drivers:
+            await driver_rides(db, driver_id, history)(PageParams(limit=PAGE, cursor=None), Response())
+        result["rides_ms"] = (time.perf_counter() - started) / len(drivers) * 1000
+        for driver_id in drivers:
+            rows = await walk_async(driver_rides(db, driver_id, history))
+            result["rides"][driver_id] = [RideResponse.model_validate(r, from_attributes=True) for r in rows]
+    return result
+
+
+def snapshot(now: datetime, days: int) -> tuple:
+    """Everything that must not change when rows move: analytics and rebuilt stats."""
+    backfill_driver_stats(engine)
+    backfill_rating_stats(engine)
+    with SessionLocal() as db:
+        series = RevenueAnalytics().series(db, "week", now - timedelta(days=days), now, now=now)
+        drivers = db.execute(select(Driver.driver_id, Driver.total_rides, Driver.completed_rides,
+                                    func.round(Driver.total_earnings, 2), Driver.rating_sum,
+                                    Driver.rating_count).order_by(Driver.driver_id)).all()
+        users = db.execute(select(User.user_id, User.rating_sum, User.rating_count).order_by(User.user_id)).all()
+    rounded = [{k: round(v, 2) if isinstance(v, float) else v for k, v in b.items()} for b in series]
+    return rounded, drivers, users
+
+
+def counts() -> dict:
+    with SessionLocal() as db:
+        return {
+            "Bookings": db.scalar(select(func.count()).select_from(Booking)),
+            "Rides": db.scalar(select(func.count()).select_from(Ride)),
+            "BookingsArchive": db.scalar(select(func.count()).select_from(ArchivedBooking)),
+            "RidesArchive": db.scalar(select(func.count()).select_from(ArchivedRide)),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bookings", type=int, default=200_000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--retention-days", type=float, default=90)
+    parser.add_argument("--batch", type=int, default=1000, help="bookings moved per transaction")
+    args = parser.parse_args()
+
+    now = datetime.utcnow()
+    started = time.perf_counter()
+    seed(args.bookings, args.days, now)
+    print(f"seeded {args.bookings} bookings over {args.days} days in {time.perf_counter() - started:.1f} s")
+
+    rng = random.Random(7)
+    users, drivers = rng.sample(range(1, RIDERS + 1), SAMPLE), rng.sample(range(1, DRIVERS + 1), SAMPLE // 5)
+    expected = snapshot(now, args.days)
+    before = asyncio.run(listings(users, drivers, history=False))
+    print(f"before: {counts()}")
+
+    mover = HistoryMover(retention_days=args.retention_days, interval=0, batch_size=args.batch, ride_archive=None)
+    started = time.perf_counter()
+    moved = mover.run(now=now)
+    elapsed = time.perf_counter() - started
+    print(f"moved {moved} bookings in {elapsed:.1f} s ({moved / elapsed:.0f} bookings/s, "
+          f"{mover.stats()['batches']} transactions)")
+    print(f"after:  {counts()}")
+    print(f"repeat run moved {mover.run(now=now)} bookings")
+
+    hot = asyncio.run(listings(users, drivers, history=False))
+    full = asyncio.run(listings(users, drivers, history=True))
+    for kind in ("bookings", "rides"):
+        rows_before = sum(map(len, before[kind].values())) / len(before[kind])
+        rows_hot = sum(map(len, hot[kind].values())) / len(hot[kind])
+        print(f"{kind:>9} first page: before {before[f'{kind}_ms']:>6.2f} ms  hot {hot[f'{kind}_ms']:>6.2f} ms  "
+              f"history {full[f'{kind}_ms']:>6.2f} ms   rows per listing {rows_before:.0f} -> {rows_hot:.0f} hot")
+        print(f"{kind:>9} history=true matches the listings from before the move: {full[kind] == before[kind]}")
+    print(f"analytics and rebuilt driver/user stats unchanged: {snapshot(now, args.days) == expected}")
+
+    engine.dispose()
+    asyncio.run(async_engine.dispose())
+    _tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""Driver GPS ingestion: one transaction per ping vs the buffered endpoint.
+
+A simulated fleet pings through the real routes, in-process via httpx's ASGI
+transport:
+  per-ping  PUT  /drivers/{id}/location   (UPDATE + COMMIT each time)
+  buffered  POST /drivers/locations       (memory, group-committed by the flusher)
+  bulk      POST /drivers/locations       (an admin gateway posting --batch points at once)
+
+    python -m benchmarks.bench_location_ingest [--drivers 2000] [--pings 20000] [--concurrency 25] [--batch 200]
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime
+
+_tmp = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp.name, 'bench.db')}"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+
+import httpx  # noqa: E402
+
+from database import SessionLocal, async_engine, engine  # noqa: E402
+from location_ingest import location_buffer  # noqa: E402
+from main import app  # noqa: E402
+from models import Driver, Role, User  # noqa: E402
+from utils import create_access_token  # noqa: E402
+
+
+def seed_drivers(drivers: int) -> list:
+    db = SessionLocal()
+    db.add_all([Role(id=1, name="admin"), Role(id=2, name="driver")])
+    db.add(User(user_id=1, name="gateway", email="gateway@example.com", phone_number="0",
+                password="x", created_at=datetime.utcnow().date(), role_id=1))
+    fleet = []
+    for i in range(drivers):
+        user_id, email = 1000 + i, f"driver{i}@example.com"
+        db.add(User(user_id=user_id, name=f"driver{i}", email=email, phone_number=str(i),
+                    password="x", created_at=datetime.utcnow().date(), role_id=2))
+        db.add(Driver(driver_id=i + 1, user_id=user_id, license=f"L{i}", is_available=True))
+        fleet.append((i + 1, create_access_token({"sub": email, "user_id": user_id, "role_id": 2})))
+    db.commit()
+    db.close()
+    return fleet
+
+
+async def drive(client: httpx.AsyncClient, fleet: list, pings: int, concurrency: int, buffered: bool) -> dict:
+    rng = random.Random(1)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def ping():
+        driver_id, token = rng.choice(fleet)
+        body = {"latitude": rng.uniform(12.8, 13.1), "longitude": rng.uniform(77.4, 77.8)}
+        headers = {"Authorization": f"Bearer {token}"}
+        async with semaphore:
+            started = time.perf_counter()
+            if buffered:
+                response = await client.post("/drivers/locations", json=body, headers=headers)
+            else:
+                response = await client.put(f"/drivers/{driver_id}/location", json=body, headers=headers)
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(ping() for _ in range(pings)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "rps": round(pings / elapsed),
+        "p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 1),
+    }
+
+
+async def drive_bulk(client: httpx.AsyncClient, fleet: list, pings: int, concurrency: int, batch: int) -> dict:
+    rng = random.Random(2)
+    semaphore = asyncio.Semaphore(concurrency)
+    headers = {"Authorization": "Bearer " + create_access_token(
+        {"sub": "gateway@example.com", "user_id": 1, "role_id": 1}
+    )}
+
+    async def post(size: int):
+        body = [
+            {"driver_id": rng.choice(fleet)[0], "latitude": rng.uniform(12.8, 13.1),
+             "longitude": rng.uniform(77.4, 77.8)}
+            for _ in range(size)
+        ]
+        async with semaphore:
+            response = await client.post("/drivers/locations", json=body, headers=headers)
+            response.raise_for_status()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(post(min(batch, pings - i)) for i in range(0, pings, batch)))
+    return {"rps": round(pings / (time.perf_counter() - started))}
+
+
+async def main_async(args, fleet: list) -> None:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # Warm the principal and driver-id caches so both runs measure the write path
+        await drive(client, fleet, len(fleet), args.concurrency, buffered=True)
+        location_buffer.flush()
+        for name, buffered in (("per-ping", False), ("buffered", True)):
+            result = await drive(client, fleet, args.pings, args.concurrency, buffered)
+            print(f"{name:>9}: {result['rps']:>6} pings/s  p50 {result['p50_ms']} ms  p99 {result['p99_ms']} ms")
+        result = await drive_bulk(client, fleet, args.pings * 5, args.concurrency, args.batch)
+        print(f"{'bulk':>9}: {result['rps']:>6} pings/s  ({args.batch} points per request)")
+    await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--drivers", type=int, default=2000)
+    parser.add_argument("--pings", type=int, default=20_000)
+    parser.add_argument("--concurrency", type=int, default=25)
+    parser.add_argument("--batch", type=int, default=200)
+    args = parser.parse_args()
+
+    fleet = seed_drivers(args.drivers)
+    location_buffer.start()
+    asyncio.run(main_async(args, fleet))
+    location_buffer.stop()
+
+    stats = location_buffer.stats()
+    print(f"flusher: {stats['flushes']} group commits, {stats['rows_flushed']} rows for "
+          f"{stats['points_received']} pings, avg lag {stats['avg_flush_lag_ms']} ms, "
+          f"max lag {stats['max_flush_lag_ms']} ms")
+    engine.dispose()
+    _tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""k-nearest available drivers: grid index vs a linear scan over every driver.
+
+Drivers are scattered uniformly over a metro-sized box; queries are random
+points inside it. Both methods must return the same drivers.
+
+    python -m benchmarks.bench_nearest_driver [--drivers 50000] [--queries 2000] [--k 10]
+"""
+import argparse
+import heapq
+import random
+import time
+
+from spatial import DriverGrid, NEAREST_MAX_RADIUS_KM, haversine_km
+
+# Roughly 45 km x 45 km around Bengaluru
+LAT_RANGE = (12.75, 13.15)
+LON_RANGE = (77.35, 77.80)
+
+
+def linear_nearest(drivers: dict, lat: float, lon: float, k: int, max_radius_km: float) -> list:
+    candidates = (
+        (haversine_km(lat, lon, d_lat, d_lon), driver_id)
+        for driver_id, (d_lat, d_lon) in drivers.items()
+    )
+    return [driver_id for distance, driver_id in heapq.nsmallest(k, candidates) if distance <= max_radius_km]
+
+
+def time_queries(fn, points: list) -> tuple:
+    results = []
+    started = time.perf_counter()
+    for lat, lon in points:
+        results.append(fn(lat, lon))
+    elapsed = time.perf_counter() - started
+    return results, elapsed / len(points) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--drivers", type=int, default=50_000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    drivers = {i: (rng.uniform(*LAT_RANGE), rng.uniform(*LON_RANGE)) for i in range(args.drivers)}
+    points = [(rng.uniform(*LAT_RANGE), rng.uniform(*LON_RANGE)) for _ in range(args.queries)]
+
+    grid = DriverGrid()
+    started = time.perf_counter()
+    for driver_id, (lat, lon) in drivers.items():
+        grid.upsert(driver_id, lat, lon)
+    build_ms = (time.perf_counter() - started) * 1000
+
+    grid_results, grid_us = time_queries(
+        lambda lat, lon: [n.driver_id for n in grid.nearest(lat, lon, args.k, NEAREST_MAX_RADIUS_KM)], points
+    )
+    # The linear scan is slow; a slice of the queries is enough to time and check it
+    sample = points[: max(1, min(len(points), 200))]
+    linear_results, linear_us = time_queries(
+        lambda lat, lon: linear_nearest(drivers, lat, lon, args.k, NEAREST_MAX_RADIUS_KM), sample
+    )
+    mismatches = sum(1 for a, b in zip(grid_results, linear_results) if a != b)
+
+    print(f"{args.drivers} drivers, k={args.k}, grid built in {build_ms:.0f} ms")
+    print(f"  grid:   {grid_us:>10.1f} us/query")
+    print(f"  linear: {linear_us:>10.1f} us/query  ({linear_us / grid_us:.0f}x slower)")
+    print(f"  mismatches vs linear scan: {mismatches}/{len(sample)}")
+
+
+if __name__ == "__main__":
+    main()
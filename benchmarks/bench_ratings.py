@@ -0,0 +1,94 @@
+"""Rating write cost vs history length: full recompute vs running aggregates.
+
+Seeds one driver and one rider with --history rated rides, then times
+--writes rating writes each way: the old end_ride recompute (load every rated
+ride, average in Python) and ratings.record_rating (one relative UPDATE).
+Also checks the backfilled and running totals against the seeded ratings.
+
+    python -m benchmarks.bench_ratings [--history 50000] [--writes 200]
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime
+
+_tmp = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp.name, 'bench.db')}"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+
+from database import Base, SessionLocal, engine  # noqa: E402
+from models import Booking, Driver, Ride, Role, User  # noqa: E402
+from ratings import backfill_rating_stats, record_rating  # noqa: E402
+
+
+def seed(history: int) -> None:
+    Base.metadata.create_all(bind=engine)
+    now = datetime.utcnow()
+    with SessionLocal() as db:
+        db.add_all([Role(id=1, name="user"), Role(id=2, name="driver")])
+        db.add(User(user_id=1, name="rider", email="r@example.com", phone_number="0", password="x",
+                    created_at=now.date(), role_id=1))
+        db.add(User(user_id=2, name="driver", email="d@example.com", phone_number="1", password="x",
+                    created_at=now.date(), role_id=2))
+        db.add(Driver(driver_id=1, user_id=2, license="L"))
+        db.add(Booking(booking_id=1, user_id=1, driver_id=1, pickup_location="A", dropoff_location="B",
+                       pickup_time=now, fare_estimate=100.0, status="completed", created_at=now))
+        db.flush()
+        db.bulk_insert_mappings(Ride, [
+            {"booking_id": 1, "user_id": 1, "driver_id": 1, "start_time": now, "end_time": now,
+             "distance_travelled": 1.0, "final_fare": 100.0, "rating_by_user": 1 + i % 5,
+             "rating_by_driver": 1 + (i * 7) % 5}
+            for i in range(history)
+        ])
+        db.commit()
+    backfill_rating_stats(engine)
+
+
+def legacy(db, rating: int) -> None:
+    driver = db.get(Driver, 1)
+    rides = db.query(Ride).filter(Ride.driver_id == 1, Ride.rating_by_user.isnot(None)).all()
+    driver.user.rating = (sum(r.rating_by_user for r in rides) + rating) / (len(rides) + 1)
+    db.commit()
+
+
+def incremental(db, rating: int) -> None:
+    record_rating(db, None, rating, driver_id=1)
+    db.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--history", type=int, default=50_000)
+    parser.add_argument("--writes", type=int, default=200)
+    args = parser.parse_args()
+
+    seed(args.history)
+    expected = (sum(1 + i % 5 for i in range(args.history)), args.history)
+    runs = (("recompute", legacy, max(1, args.writes // 10)), ("aggregate", incremental, args.writes))
+    for name, write, writes in runs:
+        with SessionLocal() as db:
+            started = time.perf_counter()
+            for i in range(writes):
+                write(db, 1 + i % 5)
+            per_write = (time.perf_counter() - started) / writes
+        print(f"{name:>9}: {per_write * 1000:>8.3f} ms per rating with {args.history} rated rides")
+
+    # The aggregate run adds ratings without Ride rows: running = backfilled history + those writes
+    written = (sum(1 + i % 5 for i in range(args.writes)), args.writes)
+    with SessionLocal() as db:
+        driver_user = db.get(User, 2)
+        running = (driver_user.rating_sum, driver_user.rating_count)
+    backfill_rating_stats(engine)
+    with SessionLocal() as db:
+        driver_user = db.get(User, 2)
+        rebuilt = (driver_user.rating_sum, driver_user.rating_count)
+    print(f"backfill matches history: {rebuilt == expected}; running totals consistent: "
+          f"{running == (expected[0] + written[0], expected[1] + written[1])}")
+
+    engine.dispose()
+    _tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
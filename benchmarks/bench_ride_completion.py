@@ -0,0 +1,73 @@
+"""Latency of the ride lifecycle writes.
+
+Calls start_ride and end_ride directly on a scratch database and times each
+one, half of the rides ending with both ratings. The exact statement count
+of each call is asserted by tests/test_ride_completion.py.
+
+    python -m benchmarks.bench_ride_completion [--rides 500]
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime
+
+_tmp = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp.name, 'bench.db')}"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+
+from apis.booking_api import end_ride, start_ride  # noqa: E402
+from database import Base, SessionLocal, engine  # noqa: E402
+from models import Booking, Driver, Role, User  # noqa: E402
+
+
+def seed(rides: int) -> list:
+    Base.metadata.create_all(bind=engine)
+    now = datetime.utcnow()
+    with SessionLocal() as db:
+        db.add_all([Role(id=1, name="user"), Role(id=2, name="driver")])
+        db.add(User(user_id=1, name="rider", email="r@example.com", phone_number="0", password="x",
+                    created_at=now.date(), role_id=1))
+        db.add(User(user_id=2, name="driver", email="d@example.com", phone_number="1", password="x",
+                    created_at=now.date(), role_id=2))
+        db.add(Driver(driver_id=1, user_id=2, license="L", latitude=12.97, longitude=77.59))
+        bookings = [
+            Booking(user_id=1, driver_id=1, pickup_location="A", dropoff_location="B", pickup_time=now,
+                    fare_estimate=100.0, status="accepted", created_at=now)
+            for _ in range(rides)
+        ]
+        db.add_all(bookings)
+        db.commit()
+        return [b.booking_id for b in bookings]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rides", type=int, default=500)
+    args = parser.parse_args()
+
+    booking_ids = seed(args.rides)
+    db = SessionLocal()
+    timings = {"start_ride": 0.0, "end_ride": 0.0}
+    for i, booking_id in enumerate(booking_ids):
+        rated = i % 2 == 0
+        started = time.perf_counter()
+        start_ride(booking_id, db=db, _=None)
+        mid = time.perf_counter()
+        end_ride(
+            booking_id, user_rating=5 if rated else None, driver_rating=4 if rated else None,
+            user_feedback=None, driver_feedback=None, db=db, _=None,
+        )
+        timings["start_ride"] += mid - started
+        timings["end_ride"] += time.perf_counter() - mid
+    db.close()
+
+    for name, total in timings.items():
+        print(f"{name:>10}: {total / len(booking_ids) * 1000:.2f} ms per call over {len(booking_ids)} rides")
+
+    engine.dispose()
+    _tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""Booking path under load with an external routing service (the local fake).
+
+Starts benchmarks.fake_routing on a free port with --latency-ms per call
+and points ROUTING_URL at it. Riders then create bookings with coordinates
+through the real POST /bookings/ route, in-process via httpx's ASGI
+transport:
+  distinct  every booking a different trip (one upstream call each)
+  hot       many riders booking the same few trips at once (coalesced)
+  outage    the service hangs; calls time out, the breaker opens and
+            quotes fall back to the offline estimate
+Also compares the pooled client against a new connection per call.
+SQLite's single writer caps the booking rate. Concurrency well above 10
+mostly measures write-lock waits, not routing.
+
+    python -m benchmarks.bench_routing [--bookings 1000] [--concurrency 10] [--latency-ms 40]
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import statistics
+import tempfile
+import time
+from datetime import datetime
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+_tmp = tempfile.TemporaryDirectory()
+_port = free_port()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp.name, 'bench.db')}"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+os.environ["ROUTING_URL"] = f"http://127.0.0.1:{_port}"
+os.environ.setdefault("ROUTING_TIMEOUT_SECONDS", "0.5")
+
+import httpx  # noqa: E402
+
+from benchmarks import fake_routing  # noqa: E402
+from database import SessionLocal, async_engine, engine  # noqa: E402
+from fares import fare_engine  # noqa: E402
+from main import app  # noqa: E402
+from models import Permission, Role, RolePermission, User  # noqa: E402
+from utils import create_access_token  # noqa: E402
+
+LAT_RANGE = (12.75, 13.15)
+LON_RANGE = (77.35, 77.80)
+
+
+def seed() -> str:
+    db = SessionLocal()
+    db.add(Role(id=1, name="user"))
+    db.add(Permission(id=1, name="create_booking"))
+    db.add(RolePermission(role_id=1, permission_id=1))
+    db.add(User(user_id=1, name="rider", email="rider@example.com", phone_number="0",
+                password="x", created_at=datetime.utcnow().date(), role_id=1))
+    db.commit()
+    db.close()
+    return create_access_token({"sub": "rider@example.com", "user_id": 1, "role_id": 1})
+
+
+def upstream_requests() -> int:
+    return fake_routing.state["requests"]
+
+
+async def book(client: httpx.AsyncClient, token: str, trips: list, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(trip):
+        body = {
+            "user_id": 1, "pickup_location": "A", "dropoff_location": "B",
+            "pickup_latitude": trip[0], "pickup_longitude": trip[1],
+            "dropoff_latitude": trip[2], "dropoff_longitude": trip[3],
+            "pickup_time": datetime.utcnow().isoformat(),
+        }
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.post("/bookings/", json=body, headers={"Authorization": f"Bearer {token}"})
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - started)
+
+    fare_engine.clear()
+    before = upstream_requests()
+    started = time.perf_counter()
+    await asyncio.gather(*(one(trip) for trip in trips))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "rps": round(len(trips) / elapsed),
+        "p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 1),
+        "upstream": upstream_requests() - before,
+    }
+
+
+async def compare_pooling(trips: list, concurrency: int) -> None:
+    remote = fare_engine.remote
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def pooled(trip):
+        async with semaphore:
+            await remote.route(trip)
+
+    async def fresh(trip):
+        async with semaphore:
+            async with httpx.AsyncClient(base_url=remote.base_url, timeout=remote.timeout) as client:
+                o_lat, o_lon, d_lat, d_lon = trip
+                (await client.get(f"/directions/v5/mapbox/driving/{o_lon},{o_lat};{d_lon},{d_lat}")).json()
+
+    for name, call in (("pooled", pooled), ("per-call", fresh)):
+        started = time.perf_counter()
+        await asyncio.gather(*(call(trip) for trip in trips))
+        print(f"{name:>9} client: {len(trips) / (time.perf_counter() - started):>6.0f} routes/s")
+
+
+async def main_async(args, token: str) -> None:
+    rng = random.Random(4)
+
+    def trip():
+        return (rng.uniform(*LAT_RANGE), rng.uniform(*LON_RANGE), rng.uniform(*LAT_RANGE), rng.uniform(*LON_RANGE))
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        distinct = [trip() for _ in range(args.bookings)]
+        hot_trips = [trip() for _ in range(10)]
+        hot = [rng.choice(hot_trips) for _ in range(args.bookings)]
+        for name, trips in (("distinct", distinct), ("hot", hot)):
+            result = await book(client, token, trips, args.concurrency)
+            print(f"{name:>9}: {result['rps']:>5} bookings/s  p50 {result['p50_ms']} ms  "
+                  f"p99 {result['p99_ms']} ms  {result['upstream']} upstream calls")
+
+        await compare_pooling([trip() for _ in range(args.bookings)], args.concurrency)
+
+        fake_routing.state["mode"] = "hang"
+        result = await book(client, token, [trip() for _ in range(args.bookings)], args.concurrency)
+        stats = fare_engine.stats()
+        print(f"{'outage':>9}: {result['rps']:>5} bookings/s  p50 {result['p50_ms']} ms  "
+              f"p99 {result['p99_ms']} ms  breaker {stats['remote']['breaker']}, "
+              f"{stats['remote']['failures']} timeouts, {stats['remote']['shed_by_breaker']} shed, "
+              f"{stats['offline_fallbacks']} offline fallbacks")
+        await fare_engine.aclose()
+    await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bookings", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--latency-ms", type=float, default=40.0)
+    args = parser.parse_args()
+
+    server = fake_routing.serve_in_thread(_port, latency_ms=args.latency_ms)
+    token = seed()
+    asyncio.run(main_async(args, token))
+    server.should_exit = True
+    engine.dispose()
+    _tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
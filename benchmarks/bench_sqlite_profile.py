@@ -0,0 +1,117 @@
+"""Concurrent read/write throughput: default SQLite settings vs the engine profile.
+
+Writers insert bookings while readers run the driver "available bookings"
+query, mirroring booking writes racing driver reads.
+
+    python -m benchmarks.bench_sqlite_profile [--seconds 5] [--readers 8] [--writers 2]
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from database import Base, SQLITE_PRAGMAS, build_engine
+from models import Booking, Role, User
+
+DEFAULT_PROFILE = {"journal_mode": "DELETE", "synchronous": "FULL"}
+
+
+def seed(session_factory, bookings: int) -> None:
+    db = session_factory()
+    db.add(Role(id=1, name="user"))
+    db.add(User(user_id=1, name="bench", email="bench@example.com", phone_number="0",
+                password="x", created_at=datetime.utcnow().date(), role_id=1))
+    now = datetime.utcnow()
+    db.add_all(
+        Booking(user_id=1, pickup_location="A", dropoff_location="B", pickup_time=now,
+                fare_estimate=100.0, status="requested" if i % 10 == 0 else "paid", created_at=now)
+        for i in range(bookings)
+    )
+    db.commit()
+    db.close()
+
+
+def run_profile(name: str, pragmas: dict, seconds: float, readers: int, writers: int, bookings: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = build_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}", pragmas)
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(bind=engine, autoflush=False)
+        seed(session_factory, bookings)
+
+        counts = {"reads": 0, "writes": 0, "errors": 0}
+        lock = threading.Lock()
+        deadline = time.perf_counter() + seconds
+
+        def reader():
+            done = 0
+            db = session_factory()
+            while time.perf_counter() < deadline:
+                try:
+                    db.query(Booking).filter(Booking.status == "requested").limit(50).all()
+                    db.rollback()
+                    done += 1
+                except OperationalError:
+                    db.rollback()
+                    with lock:
+                        counts["errors"] += 1
+            db.close()
+            with lock:
+                counts["reads"] += done
+
+        def writer():
+            done = 0
+            db = session_factory()
+            while time.perf_counter() < deadline:
+                now = datetime.utcnow()
+                try:
+                    db.add(Booking(user_id=1, pickup_location="A", dropoff_location="B", pickup_time=now,
+                                   fare_estimate=100.0, status="requested", created_at=now))
+                    db.commit()
+                    done += 1
+                except OperationalError:
+                    db.rollback()
+                    with lock:
+                        counts["errors"] += 1
+            db.close()
+            with lock:
+                counts["writes"] += done
+
+        threads = [threading.Thread(target=reader) for _ in range(readers)]
+        threads += [threading.Thread(target=writer) for _ in range(writers)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        engine.dispose()
+
+    return {
+        "profile": name,
+        "reads_per_s": round(counts["reads"] / seconds),
+        "writes_per_s": round(counts["writes"] / seconds),
+        "errors": counts["errors"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--bookings", type=int, default=20_000)
+    args = parser.parse_args()
+
+    for name, pragmas in (("default", DEFAULT_PROFILE), ("profile", SQLITE_PRAGMAS)):
+        result = run_profile(name, pragmas, args.seconds, args.readers, args.writers, args.bookings)
+        print(
+            f"{result['profile']:>8}: {result['reads_per_s']:>7} reads/s  "
+            f"{result['writes_per_s']:>6} writes/s  {result['errors']} lock errors"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""Thousands of idle SSE subscribers on one worker.
+
+Starts the app under uvicorn in a background thread, opens --clients
+connections to /bookings/available/stream, then publishes --events deltas
+from a plain thread, as sync routes and dispatch do. Reports fan-out
+latency (publish until every client has the event), the server's thread
+count and memory per connection.
+
+    python -m benchmarks.bench_sse [--clients 2000] [--events 20]
+"""
+import argparse
+import asyncio
+import os
+import resource
+import socket
+import statistics
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+_tmp = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp.name, 'bench.db')}"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+
+import httpx  # noqa: E402
+import uvicorn  # noqa: E402
+
+from database import SessionLocal, engine  # noqa: E402
+from events import AVAILABLE_BOOKINGS_TOPIC, broker  # noqa: E402
+from main import app  # noqa: E402
+from models import Permission, Role, RolePermission, User  # noqa: E402
+from utils import create_access_token  # noqa: E402
+
+
+def seed() -> str:
+    db = SessionLocal()
+    db.add(Role(id=2, name="driver"))
+    db.add(Permission(id=1, name="view_available_bookings"))
+    db.add(RolePermission(role_id=2, permission_id=1))
+    db.add(User(user_id=1, name="driver", email="driver@example.com", phone_number="0",
+                password="x", created_at=datetime.utcnow().date(), role_id=2))
+    db.commit()
+    db.close()
+    return create_access_token({"sub": "driver@example.com", "user_id": 1, "role_id": 2})
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def rss_mb() -> float:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * resource.getpagesize() / 2**20
+
+
+async def run_clients(url: str, clients: int, events: int) -> None:
+    received = [dict() for _ in range(clients)]
+    connected = asyncio.Semaphore(0)
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=0)
+
+    async with httpx.AsyncClient(limits=limits, timeout=None) as client:
+        async def listen(slot: int):
+            async with client.stream("GET", url) as response:
+                response.raise_for_status()
+                connected.release()
+                event_id = None
+                async for line in response.aiter_lines():
+                    if line.startswith("id: "):
+                        event_id = int(line[4:])
+                    elif line.startswith("data: ") and event_id is not None:
+                        received[slot][event_id] = time.perf_counter()
+
+        before_rss = rss_mb()
+        tasks = [asyncio.create_task(listen(i)) for i in range(clients)]
+        started = time.perf_counter()
+        for _ in range(clients):
+            await connected.acquire()
+        while broker.subscriber_count(AVAILABLE_BOOKINGS_TOPIC) < clients:
+            await asyncio.sleep(0.01)
+        print(f"{clients} streams open in {time.perf_counter() - started:.1f} s; "
+              f"{threading.active_count()} threads in process, "
+              f"~{(rss_mb() - before_rss) * 1024 / clients:.1f} KiB RSS per connection (client + server)")
+
+        latencies = []
+        for n in range(events):
+            published = {}
+
+            def publish():
+                published["at"] = time.perf_counter()
+                published["id"] = broker.publish(
+                    AVAILABLE_BOOKINGS_TOPIC, "booking.created", {"booking_id": n, "fare_estimate": 100.0}
+                )
+
+            await asyncio.to_thread(publish)
+            while sum(1 for r in received if published["id"] in r) < clients:
+                await asyncio.sleep(0.001)
+            last = max(r[published["id"]] for r in received)
+            latencies.append(last - published["at"])
+
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    latencies.sort()
+    print(f"fan-out to all {clients}: p50 {statistics.median(latencies) * 1000:.1f} ms  "
+          f"max {latencies[-1] * 1000:.1f} ms over {events} events")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=2000)
+    parser.add_argument("--events", type=int, default=20)
+    args = parser.parse_args()
+
+    token = seed()
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning",
+                                           backlog=args.clients, lifespan="off"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+
+    url = f"http://127.0.0.1:{port}/bookings/available/stream?token={token}"
+    asyncio.run(run_clients(url, args.clients, args.events))
+
+    server.should_exit = True
+    thread.join(timeout=10)
+    engine.dispose()
+    _tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Surge engine under a synthetic event stream: update cost and recompute cost.
+
+Replays --events seeded events on a virtual clock (--rate per second) over a
+metro box: booking requests clustered around a few hotspots, and driver
+moves / going busy / coming back. Drivers go through a real DriverGrid, so
+supply arrives through the same watcher as in the app. Every
+SURGE_RECOMPUTE_SECONDS of virtual time the multipliers are rebuilt two ways:
+  engine  SurgeEngine.recompute(), one pass over the zones with demand
+  naive   recount the window from the raw event log and the grid snapshot
+and the results are compared. A given --seed always replays the same stream
+and ends with the same multipliers.
+
+    python -m benchmarks.bench_surge [--events 200000] [--drivers 5000] [--rate 20] [--seed 3]
+"""
+import argparse
+import random
+import time
+from collections import Counter, deque
+
+from spatial import DriverGrid
+from surge import SURGE_MIN_REQUESTS, SURGE_RECOMPUTE_SECONDS, SurgeEngine, surge_multiplier
+
+LAT_RANGE = (12.75, 13.15)
+LON_RANGE = (77.35, 77.80)
+
+
+def naive(engine: SurgeEngine, log: deque, grid: DriverGrid, now: float) -> dict:
+    """Multipliers from scratch: O(events in window + drivers)."""
+    first_bucket = int(now // engine.bucket_seconds) - engine.buckets + 1
+    while log and log[0][0] < first_bucket * engine.bucket_seconds:
+        log.popleft()
+    demand = Counter(zone for _, zone in log)
+    _, lats, lons = grid.snapshot()
+    supply = Counter(engine.zone(lat, lon) for lat, lon in zip(lats, lons))
+    result = {}
+    for zone, requests in demand.items():
+        if requests >= SURGE_MIN_REQUESTS:
+            value = surge_multiplier(requests, supply.get(zone, 0))
+            if value > 1.0:
+                result[zone] = value
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=200_000)
+    parser.add_argument("--drivers", type=int, default=5000)
+    parser.add_argument("--rate", type=float, default=20.0, help="events per virtual second")
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    hotspots = [(rng.uniform(*LAT_RANGE), rng.uniform(*LON_RANGE)) for _ in range(8)]
+    engine = SurgeEngine(clock=lambda: 0.0)
+    grid = DriverGrid()
+    grid.watch(engine.driver_changed)
+    for driver_id in range(args.drivers):
+        grid.upsert(driver_id, rng.uniform(*LAT_RANGE), rng.uniform(*LON_RANGE))
+
+    log = deque()  # (time, zone) of every request, for the naive recount
+    request_s = driver_s = engine_s = naive_s = 0.0
+    requests = driver_events = recomputes = mismatches = 0
+    next_recompute = SURGE_RECOMPUTE_SECONDS
+    for i in range(args.events):
+        now = i / args.rate
+        if rng.random() < 0.5:
+            if rng.random() < 0.7:
+                lat, lon = rng.choice(hotspots)
+                lat, lon = lat + rng.gauss(0, 0.01), lon + rng.gauss(0, 0.01)
+            else:
+                lat, lon = rng.uniform(*LAT_RANGE), rng.uniform(*LON_RANGE)
+            started = time.perf_counter()
+            engine.record_request(lat, lon, now)
+            request_s += time.perf_counter() - started
+            log.append((now, engine.zone(lat, lon)))
+            requests += 1
+        else:
+            driver_id = rng.randrange(args.drivers)
+            roll = rng.random()
+            started = time.perf_counter()
+            if roll < 0.1:
+                grid.remove(driver_id)  # took a ride
+            elif roll < 0.2 or driver_id not in grid:
+                grid.upsert(driver_id, rng.uniform(*LAT_RANGE), rng.uniform(*LON_RANGE))  # free again
+            else:
+                grid.move(driver_id, rng.uniform(*LAT_RANGE), rng.uniform(*LON_RANGE))
+            driver_s += time.perf_counter() - started
+            driver_events += 1
+
+        if now >= next_recompute:
+            next_recompute += SURGE_RECOMPUTE_SECONDS
+            started = time.perf_counter()
+            fast = engine.recompute(now)
+            engine_s += time.perf_counter() - started
+            started = time.perf_counter()
+            slow = naive(engine, log, grid, now)
+            naive_s += time.perf_counter() - started
+            mismatches += fast != slow
+            recomputes += 1
+
+    stats = engine.stats()
+    print(f"{args.events} events over {args.events / args.rate:.0f} virtual s, {args.drivers} drivers")
+    print(f"  request update: {request_s / requests * 1e6:>7.2f} us   driver update (grid + surge): "
+          f"{driver_s / driver_events * 1e6:>6.2f} us")
+    print(f"  recompute: engine {engine_s / recomputes * 1e3:>7.3f} ms   naive {naive_s / recomputes * 1e3:>8.3f} ms   "
+          f"({recomputes} passes, {mismatches} mismatches)")
+    print(f"  now: {stats['zones_with_demand']} zones with demand, {stats['surging_zones']} surging, "
+          f"max {stats['max_multiplier']}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Local stand-in for a Mapbox-style Directions service.
+
+Answers GET /directions/v5/mapbox/driving/{lon},{lat};{lon},{lat} with a
+Haversine x 1.35 route at 24 km/h, after --latency-ms. POST /_control
+changes the latency or makes it fail (status 503 or a hang past the
+client's timeout), so tests and benchmarks can exercise the circuit breaker
+without network access. GET /_stats counts the requests served.
+
+    python -m benchmarks.fake_routing [--port 9000] [--latency-ms 40]
+    ROUTING_URL=http://127.0.0.1:9000 uvicorn main:app
+"""
+import argparse
+import asyncio
+import threading
+import time
+from typing import Optional
+
+import uvicorn
+from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel
+
+from spatial import haversine_km
+
+app = FastAPI(title="Fake routing service")
+state = {"latency_ms": 40.0, "mode": "ok", "requests": 0}
+
+
+class Control(BaseModel):
+    latency_ms: Optional[float] = None
+    mode: Optional[str] = None  # "ok", "error" or "hang"
+
+
+@app.get("/directions/v5/mapbox/driving/{coordinates}")
+async def directions(coordinates: str):
+    state["requests"] += 1
+    if state["mode"] == "hang":
+        await asyncio.sleep(3600)
+    await asyncio.sleep(state["latency_ms"] / 1000)
+    if state["mode"] == "error":
+        raise HTTPException(status_code=503, detail="upstream unavailable")
+    try:
+        (o_lon, o_lat), (d_lon, d_lat) = (map(float, point.split(",")) for point in coordinates.split(";"))
+    except ValueError:
+        raise HTTPException(status_code=422, detail="expected lon,lat;lon,lat")
+    metres = haversine_km(o_lat, o_lon, d_lat, d_lon) * 1.35 * 1000
+    return {"code": "Ok", "routes": [{"distance": metres, "duration": metres / (24 / 3.6)}]}
+
+
+@app.post("/_control")
+def control(body: Control):
+    state.update({k: v for k, v in body.dict().items() if v is not None})
+    return state
+
+
+@app.get("/_stats")
+def stats():
+    return state
+
+
+def serve_in_thread(port: int, **settings) -> uvicorn.Server:
+    """Start the fake service on 127.0.0.1:port in a daemon thread; returns once it accepts."""
+    state.update(settings)
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency-ms", type=float, default=40.0)
+    args = parser.parse_args()
+    state["latency_ms"] = args.latency_ms
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="info")
+
+
+if __name__ == "__main__":
+    main()
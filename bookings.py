@@ -0,0 +1,63 @@
+"""Booking state changes shared by the booking API and batch dispatch.
+
+Every transition is a compare-and-set UPDATE: it applies only while the
+booking is still in the expected state, so concurrent requests (or a
+dispatch tick racing a driver's manual accept) cannot both win. Status
+changes are pushed to the rider and the assigned driver over the event
+broker.
+"""
+from typing import Optional
+
+from sqlalchemy import bindparam, update
+
+from events import broker, driver_topic, user_topic
+from models import Booking
+
+
+def booking_transition(booking_id: int, *criteria, **values):
+    """Compare-and-set UPDATE of one booking, applied only while `criteria` still hold.
+
+    Callers check rowcount: of any number of concurrent requests, exactly one
+    sees 1 and the rest see 0.
+    """
+    return (
+        update(Booking)
+        .where(Booking.booking_id == booking_id, *criteria)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def accept_booking_statement(booking_id: int, driver_id: int, fare: float):
+    """requested -> pending_user_confirmation for one driver."""
+    return booking_transition(
+        booking_id,
+        Booking.status == "requested",
+        driver_id=driver_id,
+        status="pending_user_confirmation",
+        fare_estimate=fare,
+    )
+
+
+# The same transition as a Core executemany (params: b=booking_id, d=driver_id, f=fare)
+_bookings = Booking.__table__
+ACCEPT_BOOKINGS_BATCH = (
+    update(_bookings)
+    .where(_bookings.c.booking_id == bindparam("b"), _bookings.c.status == "requested")
+    .values(driver_id=bindparam("d"), status="pending_user_confirmation", fare_estimate=bindparam("f"))
+)
+
+
+def publish_booking_status(
+    booking_id: int, user_id: int, driver_id: Optional[int], status: str, fare_estimate: Optional[float]
+) -> None:
+    """Push a booking's new state to its rider and, once assigned, its driver."""
+    topics = [user_topic(user_id)]
+    if driver_id is not None:
+        topics.append(driver_topic(driver_id))
+    broker.publish(topics, "booking.status", {
+        "booking_id": booking_id,
+        "status": status,
+        "driver_id": driver_id,
+        "fare_estimate": fare_estimate,
+    })
@@ -1,20 +1,118 @@
-from sqlalchemy import create_engine
+import os
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./cab_booking.db"
-
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False}
+SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./cab_booking.db")
+ASYNC_DATABASE_URL = os.getenv(
+    "ASYNC_DATABASE_URL",
+    SQLALCHEMY_DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1),
 )
 
+# SQLite engine profile, applied to every new connection.
+# WAL lets driver reads proceed while bookings are being written.
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", "-65536")),  # negative = KiB
+}
+
+# Connection pool sizing
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+
+def apply_sqlite_pragmas(dbapi_connection, pragmas: dict) -> None:
+    """Run PRAGMA statements on a raw DBAPI connection."""
+    cursor = dbapi_connection.cursor()
+    for name, value in pragmas.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+
+def build_engine(url: str = SQLALCHEMY_DATABASE_URL, pragmas: dict = SQLITE_PRAGMAS):
+    """Create an engine using the configured pool and, for SQLite, pragma profile."""
+    if not url.startswith("sqlite"):
+        return create_engine(
+            url,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_pre_ping=True,
+        )
+
+    if ":memory:" in url or url.rstrip("/") == "sqlite:":
+        # In-memory databases live and die with a single connection
+        return create_engine(url, connect_args={"check_same_thread": False})
+
+    new_engine = create_engine(
+        url,
+        connect_args={"check_same_thread": False},
+        poolclass=QueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+    )
+    if pragmas:
+        event.listen(
+            new_engine,
+            "connect",
+            lambda dbapi_connection, _record: apply_sqlite_pragmas(dbapi_connection, pragmas),
+        )
+    return new_engine
+
+
+def build_async_engine(url: str = ASYNC_DATABASE_URL, pragmas: dict = SQLITE_PRAGMAS):
+    """Async counterpart of build_engine (aiosqlite for SQLite URLs)."""
+    if not url.startswith("sqlite"):
+        return create_async_engine(
+            url,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_pre_ping=True,
+        )
+
+    new_engine = create_async_engine(
+        url,
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+    )
+    if pragmas:
+        event.listen(
+            new_engine.sync_engine,
+            "connect",
+            lambda dbapi_connection, _record: apply_sqlite_pragmas(dbapi_connection, pragmas),
+        )
+    return new_engine
+
+
+engine = build_engine()
+async_engine = build_async_engine()
+
 SessionLocal = sessionmaker(
     autocommit=False,
     autoflush=False,
     bind=engine
 )
 
+# expire_on_commit=False: attributes cannot be lazily refreshed outside the
+# event loop, and handlers return the committed objects for serialization.
+AsyncSessionLocal = sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
 Base = declarative_base()
 
 
@@ -27,3 +125,12 @@ def get_db():
         raise
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        try:
+            yield db
+        except Exception:
+            await db.rollback()
+            raise
@@ -0,0 +1,87 @@
+"""Per-driver dashboard totals kept on the Drivers row.
+
+Drivers.total_rides and Drivers.total_earnings grow when a ride starts (its
+final_fare is set then). Drivers.completed_rides grows when it ends.
+Drivers.rating_sum and Drivers.rating_count hold the riders' ratings of the
+driver's rides (Rides.rating_by_user). Every change is a relative UPDATE in
+the same transaction as the ride write, so the dashboard reads one row
+instead of aggregating the driver's whole ride history.
+
+Admin ride corrections (POST/DELETE /rides) do not adjust the totals.
+backfill_driver_stats() rebuilds them from Rides and RidesArchive. Migrations run it when the
+columns are first added. Rerun it with:
+
+    python migrations.py --backfill-driver-stats
+"""
+from typing import Optional
+
+from sqlalchemy import func, select, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from models import ArchivedRide, Driver, Ride
+from ratings import rating_change
+
+
+def ride_started_statement(driver_id: int, fare: Optional[float]):
+    """UPDATE counting a newly started ride and its fare."""
+    return (
+        update(Driver)
+        .where(Driver.driver_id == driver_id)
+        .values(
+            total_rides=Driver.total_rides + 1,
+            total_earnings=Driver.total_earnings + (fare or 0),
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+def ride_rating_values(old: Optional[int], new: Optional[int]) -> dict:
+    """Drivers column updates for a rider's rating of a ride going old -> new.
+
+    Empty when nothing changes, so callers can merge it into another UPDATE.
+    """
+    change = rating_change(old, new)
+    if change is None:
+        return {}
+    delta, added = change
+    return {"rating_sum": Driver.rating_sum + delta, "rating_count": Driver.rating_count + added}
+
+
+def record_ride_rating(db: Session, driver_id: int, old: Optional[int], new: Optional[int]) -> None:
+    """Apply ride_rating_values to one driver in the caller's transaction."""
+    values = ride_rating_values(old, new)
+    if values:
+        db.execute(
+            update(Driver)
+            .where(Driver.driver_id == driver_id)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+
+
+def average_rating(driver: Driver) -> float:
+    return round(driver.rating_sum / driver.rating_count, 1) if driver.rating_count else 0
+
+
+def _rides(aggregate):
+    """Correlated subqueries: aggregate(rides) over the outer Drivers row's hot plus archived rides."""
+    hot, cold = (
+        select(aggregate(rides)).where(rides.driver_id == Driver.driver_id).scalar_subquery()
+        for rides in (Ride, ArchivedRide)
+    )
+    return hot + cold
+
+
+def backfill_driver_stats(bind: Engine) -> None:
+    """Recompute every driver's totals from Rides and RidesArchive, in one statement."""
+    with bind.begin() as conn:
+        conn.execute(
+            update(Driver).values(
+                total_rides=_rides(lambda rides: func.count()),
+                completed_rides=_rides(lambda rides: func.count(rides.end_time)),
+                total_earnings=_rides(lambda rides: func.coalesce(func.sum(rides.final_fare), 0)),
+                rating_sum=_rides(lambda rides: func.coalesce(func.sum(rides.rating_by_user), 0)),
+                rating_count=_rides(lambda rides: func.count(rides.rating_by_user)),
+            )
+        )
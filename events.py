@@ -0,0 +1,219 @@
+"""In-process pub/sub for pushing booking changes to connected clients.
+
+Publishers may run anywhere: async routes on the event loop, sync routes in
+the threadpool, or background threads such as dispatch. Each subscriber is an
+asyncio queue owned by the loop that created it. A publish from another
+thread costs one call_soon_threadsafe per loop, not one per subscriber.
+Idle subscribers therefore cost only a queue and a suspended coroutine, and
+no thread.
+
+A short replay history per topic lets SSE clients resume from Last-Event-ID
+after a reconnect instead of refetching everything. Every rider and driver
+has their own topic, so history is kept only while a topic has subscribers
+or has been active (published to, or left by its last subscriber) within
+EVENT_REPLAY_TTL_SECONDS. Older histories are dropped as later events are
+published, which bounds memory by recent activity rather than by every
+rider and driver seen since startup.
+
+A subscription may cover several topics (a WebSocket follows both its user's
+and its driver's channel), and one event may go to several topics (a status
+change goes to the rider and the driver). Each client still gets each event
+once.
+"""
+import asyncio
+import itertools
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import AsyncIterator, Deque, Dict, Iterable, Optional, Set, Tuple, Union
+
+EVENT_QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", "256"))
+EVENT_REPLAY_SIZE = int(os.getenv("EVENT_REPLAY_SIZE", "1000"))
+EVENT_REPLAY_TTL_SECONDS = float(os.getenv("EVENT_REPLAY_TTL_SECONDS", "300"))
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+SSE_RETRY_MS = 3000
+
+AVAILABLE_BOOKINGS_TOPIC = "bookings.available"
+
+
+def user_topic(user_id: int) -> str:
+    return f"user:{user_id}"
+
+
+def driver_topic(driver_id: int) -> str:
+    return f"driver:{driver_id}"
+
+
+# (event id, event name, JSON payload)
+Message = Tuple[int, str, str]
+
+
+class Subscription:
+    """One client's bounded queue; the oldest message is dropped when it overflows."""
+
+    __slots__ = ("topics", "loop", "queue", "dropped")
+
+    def __init__(self, topics: Tuple[str, ...], loop: asyncio.AbstractEventLoop, size: int):
+        self.topics = topics
+        self.loop = loop
+        self.queue: "asyncio.Queue[Message]" = asyncio.Queue(maxsize=size)
+        self.dropped = 0
+
+    def push(self, message: Message) -> None:
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(message)
+
+    async def get(self) -> Message:
+        return await self.queue.get()
+
+
+class EventBroker:
+    def __init__(self, queue_size: int = EVENT_QUEUE_SIZE, replay: int = EVENT_REPLAY_SIZE,
+                 replay_ttl: float = EVENT_REPLAY_TTL_SECONDS):
+        self.queue_size = queue_size
+        self.replay = replay
+        self.replay_ttl = replay_ttl
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._history: Dict[str, Deque[Message]] = {}
+        self._touched: "OrderedDict[str, float]" = OrderedDict()  # history topics, least recently active first
+        self._next_expiry = 0.0
+        self._published = 0
+        self._dropped_gone = 0
+
+    def publish(self, topics: Union[str, Iterable[str]], event: str, data: dict) -> int:
+        """Send an event to every subscriber of `topics`; safe from any thread. Returns its id."""
+        topics = (topics,) if isinstance(topics, str) else tuple(topics)
+        payload = json.dumps(data, default=str, separators=(",", ":"))
+        with self._lock:
+            message = (next(self._ids), event, payload)
+            self._published += 1
+            loops = set()
+            for topic in topics:
+                if self.replay:
+                    self._history.setdefault(topic, deque(maxlen=self.replay)).append(message)
+                    self._touch(topic)
+                loops.update(sub.loop for sub in self._subscribers.get(topic, ()))
+            if self.replay:
+                self._expire_history()
+
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        for loop in loops:
+            if loop is running:
+                self._fanout(loop, topics, message)
+            else:
+                try:
+                    loop.call_soon_threadsafe(self._fanout, loop, topics, message)
+                except RuntimeError:  # loop already closed
+                    pass
+        return message[0]
+
+    def _touch(self, topic: str) -> None:
+        self._touched[topic] = time.monotonic()
+        self._touched.move_to_end(topic)
+
+    def _expire_history(self) -> None:
+        """Drop the history of topics idle for replay_ttl with nobody subscribed; caller holds the lock."""
+        now = time.monotonic()
+        if now < self._next_expiry:
+            return
+        self._next_expiry = now + self.replay_ttl / 10
+        while self._touched:
+            topic, touched = next(iter(self._touched.items()))
+            if now - touched <= self.replay_ttl:
+                break
+            if topic in self._subscribers:
+                self._touch(topic)  # still followed; look again a TTL from now
+            else:
+                del self._touched[topic]
+                self._history.pop(topic, None)
+
+    def _fanout(self, loop: asyncio.AbstractEventLoop, topics: Tuple[str, ...], message: Message) -> None:
+        with self._lock:
+            if len(topics) == 1:
+                targets = [sub for sub in self._subscribers.get(topics[0], ()) if sub.loop is loop]
+            else:
+                targets = {sub for topic in topics for sub in self._subscribers.get(topic, ()) if sub.loop is loop}
+        for sub in targets:
+            sub.push(message)
+
+    def subscribe(self, *topics: str, last_event_id: Optional[int] = None) -> Subscription:
+        """Register a subscriber on the running loop, pre-filled with events after last_event_id."""
+        sub = Subscription(topics, asyncio.get_running_loop(), self.queue_size)
+        with self._lock:
+            for topic in topics:
+                self._subscribers.setdefault(topic, set()).add(sub)
+            if last_event_id is not None:
+                missed = {
+                    message for topic in topics for message in self._history.get(topic, ())
+                    if message[0] > last_event_id
+                }
+                for message in sorted(missed):
+                    sub.push(message)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        with self._lock:
+            for topic in sub.topics:
+                subscribers = self._subscribers.get(topic)
+                if subscribers is not None:
+                    subscribers.discard(sub)
+                    if not subscribers:
+                        del self._subscribers[topic]
+                        if topic in self._history:
+                            self._touch(topic)  # replayable for a reconnect within the TTL
+            self._dropped_gone += sub.dropped
+
+    def _live(self) -> Set[Subscription]:
+        return {sub for subs in self._subscribers.values() for sub in subs}
+
+    def subscriber_count(self, topic: Optional[str] = None) -> int:
+        with self._lock:
+            if topic is not None:
+                return len(self._subscribers.get(topic, ()))
+            return len(self._live())
+
+    def stats(self) -> dict:
+        with self._lock:
+            live = self._live()
+            return {
+                "topics": len(self._subscribers),
+                "subscribers": len(live),
+                "published": self._published,
+                "replay_topics": len(self._history),
+                "dropped": self._dropped_gone + sum(sub.dropped for sub in live),
+            }
+
+
+broker = EventBroker()
+
+
+def parse_last_event_id(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
+
+
+async def sse_stream(topic: str, last_event_id: Optional[int] = None) -> AsyncIterator[str]:
+    """Server-Sent Events framing for one subscriber, with heartbeat comments."""
+    sub = broker.subscribe(topic, last_event_id=last_event_id)
+    try:
+        yield f"retry: {SSE_RETRY_MS}\n\n"
+        while True:
+            try:
+                event_id, event, payload = await asyncio.wait_for(sub.get(), SSE_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            yield f"id: {event_id}\nevent: {event}\ndata: {payload}\n\n"
+    finally:
+        broker.unsubscribe(sub)
@@ -0,0 +1,303 @@
+"""Server-side fare and ETA quotes.
+
+A quote needs a driving distance and duration between pickup and dropoff.
+These come from a pluggable DistanceProvider. Both built-in providers work
+offline:
+  HaversineProvider   great-circle distance x ROAD_DETOUR_FACTOR at AVERAGE_SPEED_KMH
+  RoadGraphProvider   fastest path over a local road graph (ROAD_GRAPH_PATH, needs scipy)
+
+Routes are cached in a bounded LRU keyed on coordinates rounded to
+FARE_CACHE_PRECISION decimals (3 is about 110 m). The route is computed from
+the rounded points, so every request that maps to a key gets the same answer.
+Prices are applied on top of the cached route, so a tariff change takes
+effect at once. The same goes for the pickup zone's surge multiplier
+(surge.py), which is read at every quote.
+
+When ROUTING_URL is set, async quotes (aquote / aquote_many) ask that
+service first, through routing.RoutingClient. If it fails or its breaker is
+open, they fall back to the offline provider. Fallback routes are not
+cached, so real routes replace them once the service recovers.
+"""
+import abc
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence
+
+from starlette.concurrency import run_in_threadpool
+
+import numpy as np
+
+try:
+    from scipy.sparse import csr_matrix
+    from scipy.sparse.csgraph import dijkstra
+    from scipy.spatial import cKDTree
+except ImportError:  # road graph routing unavailable; Haversine only
+    dijkstra = None
+
+from routing import Route, RoutingClient, RoutingUnavailable, Trip, default_client
+from spatial import haversine_km
+from surge import SURGE_ENABLED, SurgeEngine, surge_engine
+from utils import TTLCache
+
+logger = logging.getLogger(__name__)
+
+FARE_BASE = float(os.getenv("FARE_BASE", "30"))
+FARE_PER_KM = float(os.getenv("FARE_PER_KM", "12"))
+FARE_PER_MIN = float(os.getenv("FARE_PER_MIN", "1.5"))
+FARE_MINIMUM = float(os.getenv("FARE_MINIMUM", "50"))
+
+ROAD_DETOUR_FACTOR = float(os.getenv("ROAD_DETOUR_FACTOR", "1.3"))  # road km per straight-line km
+AVERAGE_SPEED_KMH = float(os.getenv("AVERAGE_SPEED_KMH", "25"))
+ROAD_GRAPH_PATH = os.getenv("ROAD_GRAPH_PATH")  # .npz, see RoadGraphProvider
+
+FARE_CACHE_SIZE = int(os.getenv("FARE_CACHE_SIZE", "100000"))
+FARE_CACHE_PRECISION = int(os.getenv("FARE_CACHE_PRECISION", "3"))
+FARE_CACHE_TTL_SECONDS = float(os.getenv("FARE_CACHE_TTL_SECONDS", "3600"))
+FARE_BATCH_MAX = int(os.getenv("FARE_BATCH_MAX", "1000"))
+
+class Quote(NamedTuple):
+    distance_km: float
+    duration_min: float
+    fare: float
+    provider: str
+    cached: bool
+    surge: float
+
+
+class DistanceProvider(abc.ABC):
+    """Driving distance and duration between points. Subclasses implement `route`."""
+
+    name = "base"
+
+    @abc.abstractmethod
+    def route(self, o_lat: float, o_lon: float, d_lat: float, d_lon: float) -> Route:
+        ...
+
+    def routes(self, trips: Sequence[Trip]) -> List[Route]:
+        """Batch form; providers that can share work across trips override this."""
+        return [self.route(*trip) for trip in trips]
+
+
+class HaversineProvider(DistanceProvider):
+    name = "haversine"
+
+    def __init__(self, detour_factor: float = ROAD_DETOUR_FACTOR, speed_kmh: float = AVERAGE_SPEED_KMH):
+        self.detour_factor = detour_factor
+        self.speed_kmh = speed_kmh
+
+    def route(self, o_lat: float, o_lon: float, d_lat: float, d_lon: float) -> Route:
+        km = haversine_km(o_lat, o_lon, d_lat, d_lon) * self.detour_factor
+        return Route(km, km / self.speed_kmh * 60)
+
+
+class RoadGraphProvider(DistanceProvider):
+    """Fastest path over a directed road graph loaded from an .npz file.
+
+    Arrays: node_lat, node_lon (per node) and edge_from, edge_to, edge_km,
+    edge_min (per directed edge). Parallel edges between the same pair of
+    nodes are reduced to the fastest one (its km goes with it), since a sparse
+    matrix would add them up. Endpoints snap to the nearest node, and the snap
+    legs are added at Haversine speed. A batch runs one Dijkstra per distinct
+    origin node.
+    """
+
+    name = "road_graph"
+
+    def __init__(self, node_lat, node_lon, edge_from, edge_to, edge_km, edge_min,
+                 fallback: Optional[DistanceProvider] = None):
+        if dijkstra is None:
+            raise RuntimeError("RoadGraphProvider needs scipy")
+        self.node_lat = np.asarray(node_lat, dtype=np.float64)
+        self.node_lon = np.asarray(node_lon, dtype=np.float64)
+        n = len(self.node_lat)
+        self._x_scale = float(np.cos(np.radians(self.node_lat.mean())))
+        self._tree = cKDTree(np.column_stack([self.node_lat, self.node_lon * self._x_scale]))
+        edge_from, edge_to, edge_km, edge_min = _fastest_edges(edge_from, edge_to, edge_km, edge_min)
+        self._minutes = csr_matrix((edge_min, (edge_from, edge_to)), shape=(n, n))
+        self._km = csr_matrix((edge_km, (edge_from, edge_to)), shape=(n, n))
+        self.fallback = fallback or HaversineProvider()
+
+    @classmethod
+    def load(cls, path: str) -> "RoadGraphProvider":
+        with np.load(path) as data:
+            return cls(*(data[key] for key in ("node_lat", "node_lon", "edge_from", "edge_to", "edge_km", "edge_min")))
+
+    def _snap(self, lat: float, lon: float) -> int:
+        return int(self._tree.query((lat, lon * self._x_scale))[1])
+
+    def _leg(self, lat: float, lon: float, node: int) -> Route:
+        return self.fallback.route(lat, lon, float(self.node_lat[node]), float(self.node_lon[node]))
+
+    def route(self, o_lat: float, o_lon: float, d_lat: float, d_lon: float) -> Route:
+        return self.routes([(o_lat, o_lon, d_lat, d_lon)])[0]
+
+    def routes(self, trips: Sequence[Trip]) -> List[Route]:
+        snapped = [(self._snap(t[0], t[1]), self._snap(t[2], t[3])) for t in trips]
+        by_origin: Dict[int, List[int]] = {}
+        for i, (origin, _) in enumerate(snapped):
+            by_origin.setdefault(origin, []).append(i)
+
+        results: List[Optional[Route]] = [None] * len(trips)
+        for origin, indices in by_origin.items():
+            minutes, predecessors = dijkstra(self._minutes, indices=origin, return_predecessors=True)
+            for i in indices:
+                trip, target = trips[i], snapped[i][1]
+                if not np.isfinite(minutes[target]):
+                    results[i] = self.fallback.route(*trip)
+                    continue
+                path = [target]
+                while path[-1] != origin:
+                    path.append(predecessors[path[-1]])
+                km = float(self._km[path[1:], path[:-1]].sum()) if len(path) > 1 else 0.0
+                start, end = self._leg(trip[0], trip[1], origin), self._leg(trip[2], trip[3], target)
+                results[i] = Route(
+                    km + start.distance_km + end.distance_km,
+                    float(minutes[target]) + start.duration_min + end.duration_min,
+                )
+        return results
+
+
+def _fastest_edges(edge_from, edge_to, edge_km, edge_min):
+    """Keep one edge per (from, to) pair: the fastest, then the shortest on a tie."""
+    edge_from = np.asarray(edge_from, dtype=np.int64)
+    edge_to = np.asarray(edge_to, dtype=np.int64)
+    edge_km = np.asarray(edge_km, dtype=np.float64)
+    edge_min = np.asarray(edge_min, dtype=np.float64)
+    order = np.lexsort((edge_km, edge_min, edge_to, edge_from))
+    edge_from, edge_to = edge_from[order], edge_to[order]
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = (edge_from[1:] != edge_from[:-1]) | (edge_to[1:] != edge_to[:-1])
+    keep = order[first]
+    return edge_from[first], edge_to[first], edge_km[keep], edge_min[keep]
+
+
+def default_provider() -> DistanceProvider:
+    if ROAD_GRAPH_PATH:
+        try:
+            return RoadGraphProvider.load(ROAD_GRAPH_PATH)
+        except Exception:
+            logger.exception("could not load road graph %s; using Haversine estimates", ROAD_GRAPH_PATH)
+    return HaversineProvider()
+
+
+def price(route: Route, surge: float = 1.0) -> float:
+    fare = (FARE_BASE + FARE_PER_KM * route.distance_km + FARE_PER_MIN * route.duration_min) * surge
+    return round(max(FARE_MINIMUM, fare), 2)
+
+
+class FareEngine:
+    """Cached fare/ETA quotes over a DistanceProvider; safe to share across threads."""
+
+    def __init__(self, provider: Optional[DistanceProvider] = None, cache_size: int = FARE_CACHE_SIZE,
+                 precision: int = FARE_CACHE_PRECISION, ttl: float = FARE_CACHE_TTL_SECONDS,
+                 remote: Optional[RoutingClient] = None, surge: Optional[SurgeEngine] = None):
+        self.provider = provider or default_provider()
+        self.remote = remote
+        self.surge = surge
+        self.precision = precision
+        self._lock = threading.Lock()
+        self._cache = TTLCache(maxsize=cache_size, ttl=ttl)  # key -> (Route, provider name)
+        self._hits = 0
+        self._misses = 0
+        self._compute_total = 0.0
+        self._fallbacks = 0
+
+    def key(self, o_lat: float, o_lon: float, d_lat: float, d_lon: float) -> Trip:
+        p = self.precision
+        return round(o_lat, p), round(o_lon, p), round(d_lat, p), round(d_lon, p)
+
+    def _quote(self, key: Trip, route: Route, cached: bool, provider: Optional[str] = None) -> Quote:
+        surge = self.surge.multiplier(key[0], key[1]) if self.surge else 1.0
+        return Quote(round(route.distance_km, 3), round(route.duration_min, 1), price(route, surge),
+                     provider or self.provider.name, cached, surge)
+
+    def cached_quote(self, o_lat: float, o_lon: float, d_lat: float, d_lon: float) -> Optional[Quote]:
+        """The quote if its route is cached, else None; never calls the provider."""
+        key = self.key(o_lat, o_lon, d_lat, d_lon)
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        with self._lock:
+            self._hits += 1
+        return self._quote(key, entry[0], True, entry[1])
+
+    def quote(self, o_lat: float, o_lon: float, d_lat: float, d_lon: float) -> Quote:
+        return self.quote_many([(o_lat, o_lon, d_lat, d_lon)])[0]
+
+    def quote_many(self, trips: Iterable[Trip]) -> List[Quote]:
+        """Quotes for many trips, routing all cache misses in one provider batch."""
+        keys = [self.key(*trip) for trip in trips]
+        entries = [self._cache.get(key) for key in keys]
+        missing = list(dict.fromkeys(key for key, entry in zip(keys, entries) if entry is None))
+        computed: Dict[Trip, Route] = {}
+        if missing:
+            started = time.perf_counter()
+            computed = dict(zip(missing, self.provider.routes(missing)))
+            elapsed = time.perf_counter() - started
+            for key, route in computed.items():
+                self._cache.set(key, (route, self.provider.name))
+        else:
+            elapsed = 0.0
+        with self._lock:
+            self._misses += len(missing)
+            self._hits += len(keys) - len(missing)
+            self._compute_total += elapsed
+        return [
+            self._quote(key, entry[0], True, entry[1]) if entry is not None else self._quote(key, computed[key], False)
+            for key, entry in zip(keys, entries)
+        ]
+
+    async def aquote(self, o_lat: float, o_lon: float, d_lat: float, d_lon: float) -> Quote:
+        """Like `quote`, but for async routes: misses go to the routing service if configured."""
+        cached = self.cached_quote(o_lat, o_lon, d_lat, d_lon)
+        if cached is not None:
+            return cached
+        if self.remote is None:
+            return await run_in_threadpool(self.quote, o_lat, o_lon, d_lat, d_lon)
+
+        key = self.key(o_lat, o_lon, d_lat, d_lon)
+        started = time.perf_counter()
+        try:
+            route = await self.remote.route(key)
+        except RoutingUnavailable:
+            with self._lock:
+                self._fallbacks += 1
+            route = (await run_in_threadpool(self.provider.routes, [key]))[0]
+            return self._quote(key, route, False)
+        self._cache.set(key, (route, "remote"))
+        with self._lock:
+            self._misses += 1
+            self._compute_total += time.perf_counter() - started
+        return self._quote(key, route, False, "remote")
+
+    async def aquote_many(self, trips: Iterable[Trip]) -> List[Quote]:
+        if self.remote is None:
+            return await run_in_threadpool(self.quote_many, list(trips))
+        return list(await asyncio.gather(*(self.aquote(*trip) for trip in trips)))
+
+    async def aclose(self) -> None:
+        if self.remote is not None:
+            await self.remote.aclose()
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "provider": self.provider.name,
+                "cache_size": len(self._cache),
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 3) if lookups else 0.0,
+                "avg_route_us": round(self._compute_total / (self._misses or 1) * 1e6, 1),
+                "offline_fallbacks": self._fallbacks,
+                "remote": self.remote.stats() if self.remote else None,
+            }
+
+
+fare_engine = FareEngine(remote=default_client(), surge=surge_engine if SURGE_ENABLED else None)
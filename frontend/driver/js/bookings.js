@@ -15,6 +15,20 @@ const headers = {
 };
 
 // ===================== LOAD AVAILABLE BOOKINGS =====================
+function availableBookingRow(b) {
+  return `
+          <tr data-booking-id="${b.booking_id}">
+            <td>${b.booking_id}</td>
+            <td>${b.pickup_location}</td>
+            <td>${b.dropoff_location}</td>
+            <td>${new Date(b.pickup_time).toLocaleString()}</td>
+            <td>₹${b.fare_estimate?.toFixed(2) || "N/A"}</td>
+            <td>
+              <button class="action-btn" onclick="acceptBooking(${b.booking_id})">Accept</button>
+            </td>
+          </tr>`;
+}
+
 async function loadAvailableBookings() {
   const tableBody = document.querySelector("#available-bookings-table tbody");
   const errorText = document.getElementById("available-bookings-error");
@@ -38,27 +52,51 @@ async function loadAvailableBookings() {
       return;
     }
 
-    tableBody.innerHTML = data
-      .map(
-        (b) => `
-          <tr>
-            <td>${b.booking_id}</td>
-            <td>${b.pickup_location}</td>
-            <td>${b.dropoff_location}</td>
-            <td>${new Date(b.pickup_time).toLocaleString()}</td>
-            <td>₹${b.fare_estimate?.toFixed(2) || "N/A"}</td>
-            <td>
-              <button class="action-btn" onclick="acceptBooking(${b.booking_id})">Accept</button>
-            </td>
-          </tr>`
-      )
-      .join("");
+    tableBody.innerHTML = data.map(availableBookingRow).join("");
   } catch (err) {
     console.error("Error loading available bookings:", err);
     errorText.textContent = err.message;
   }
 }
 
+// ===================== LIVE UPDATES (SSE) =====================
+// New, taken and cancelled bookings arrive as deltas instead of re-fetching the list
+function subscribeAvailableBookings() {
+  const tableBody = document.querySelector("#available-bookings-table tbody");
+  const stream = new EventSource(
+    `${API_BASE_URL}/bookings/available/stream?token=${encodeURIComponent(token)}`
+  );
+
+  stream.addEventListener("booking.created", (e) => {
+    const b = JSON.parse(e.data);
+    if (tableBody.querySelector(`tr[data-booking-id="${b.booking_id}"]`)) return;
+    if (!tableBody.querySelector("tr[data-booking-id]")) tableBody.innerHTML = "";
+    tableBody.insertAdjacentHTML("beforeend", availableBookingRow(b));
+  });
+
+  const removeRow = (e) => {
+    const { booking_id } = JSON.parse(e.data);
+    tableBody.querySelector(`tr[data-booking-id="${booking_id}"]`)?.remove();
+    if (!tableBody.querySelector("tr[data-booking-id]")) {
+      tableBody.innerHTML = "<tr><td colspan='6'>No available bookings.</td></tr>";
+    }
+  };
+  stream.addEventListener("booking.taken", removeRow);
+  stream.addEventListener("booking.cancelled", removeRow);
+}
+
+// ===================== LIVE STATUS OF MY BOOKINGS =====================
+// Riders confirming or cancelling are pushed over a WebSocket, no polling
+function subscribeBookingStatus() {
+  const socket = new WebSocket(
+    `${API_BASE_URL.replace(/^http/, "ws")}/bookings/ws?token=${encodeURIComponent(token)}`
+  );
+  socket.onmessage = () => fetchMyBookings();
+  socket.onclose = (e) => {
+    if (e.code !== 1008) setTimeout(subscribeBookingStatus, 3000);
+  };
+}
+
 // ===================== FETCH DRIVER’S OWN BOOKINGS =====================
 async function fetchMyBookings() {
   const tableBody = document.querySelector("#my-bookings-table tbody");
@@ -105,15 +143,17 @@ async function fetchMyBookings() {
 
 // ===================== ACCEPT BOOKING =====================
 async function acceptBooking(bookingId) {
-  const proposedFare = prompt("Enter your proposed fare:");
-  if (!proposedFare || isNaN(proposedFare)) {
+  const proposedFare = prompt("Enter your proposed fare (leave empty for the current quote):");
+  if (proposedFare === null) return;
+  if (proposedFare.trim() && isNaN(proposedFare)) {
     alert("Invalid fare amount.");
     return;
   }
+  const query = proposedFare.trim() ? `?proposed_fare=${encodeURIComponent(proposedFare)}` : "";
 
   try {
     const res = await fetch(
-      `${API_BASE_URL}/bookings/${bookingId}/accept?proposed_fare=${encodeURIComponent(proposedFare)}`,
+      `${API_BASE_URL}/bookings/${bookingId}/accept${query}`,
       {
         method: "PUT",
         headers,
@@ -124,7 +164,6 @@ async function acceptBooking(bookingId) {
       throw new Error(`Error ${res.status}: ${errText}`);
     }
     alert("Booking accepted successfully!");
-    await loadAvailableBookings();
     await fetchMyBookings();
   } catch (err) {
     console.error("Error accepting booking:", err);
@@ -173,5 +212,5 @@ document.getElementById("logout-btn").addEventListener("click", () => {
 });
 
 // ===================== INITIALIZE =====================
-loadAvailableBookings();
-fetchMyBookings();
+loadAvailableBookings().then(subscribeAvailableBookings);
+fetchMyBookings().then(subscribeBookingStatus);
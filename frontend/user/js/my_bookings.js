@@ -1,4 +1,20 @@
-import { apiFetch } from "./utils.js";
+import { apiFetch, openBookingSocket } from "./utils.js";
+
+function bookingCard(b) {
+  return `
+        <div class="booking-card" data-booking-id="${b.booking_id}">
+          <p><b>ID:</b> ${b.booking_id}</p>
+          <p><b>Pickup:</b> ${b.pickup_location}</p>
+          <p><b>Dropoff:</b> ${b.dropoff_location}</p>
+          <p><b>Status:</b> <span class="status ${b.status}">${b.status}</span></p>
+          <p><b>Fare Estimate:</b> ₹${b.fare_estimate}</p>
+          ${
+            b.status === "pending_user_confirmation"
+              ? `<button class="btn confirm-btn" data-id="${b.booking_id}">Confirm Booking</button>`
+              : ""
+          }
+        </div>`;
+}
 
 document.addEventListener("DOMContentLoaded", async () => {
   const bookingsDiv =
@@ -27,40 +43,33 @@ document.addEventListener("DOMContentLoaded", async () => {
       return;
     }
 
-    bookingsDiv.innerHTML = bookings
-      .map(
-        (b) => `
-        <div class="booking-card">
-          <p><b>ID:</b> ${b.booking_id}</p>
-          <p><b>Pickup:</b> ${b.pickup_location}</p>
-          <p><b>Dropoff:</b> ${b.dropoff_location}</p>
-          <p><b>Status:</b> <span class="status ${b.status}">${b.status}</span></p>
-          <p><b>Fare Estimate:</b> ₹${b.fare_estimate}</p>
-          ${
-            b.status === "pending_user_confirmation"
-              ? `<button class="btn confirm-btn" data-id="${b.booking_id}">Confirm Booking</button>`
-              : ""
-          }
-        </div>`
-      )
-      .join("");
+    const byId = new Map(bookings.map((b) => [b.booking_id, b]));
+    bookingsDiv.innerHTML = bookings.map(bookingCard).join("");
+
+    // ✅ Step 4: Add confirmation handlers (delegated, cards are re-rendered live)
+    bookingsDiv.addEventListener("click", async (e) => {
+      if (!e.target.classList.contains("confirm-btn")) return;
+      const bookingId = e.target.dataset.id;
+      try {
+        const confirmRes = await apiFetch(`/bookings/${bookingId}/confirm`, {
+          method: "PUT",
+        });
+        if (!confirmRes.ok) throw new Error("Confirmation failed");
+        alert("Booking confirmed!");
+      } catch (err) {
+        alert(err.message);
+      }
+    });
 
-    // ✅ Step 4: Add confirmation handlers
-    document.querySelectorAll(".confirm-btn").forEach((btn) =>
-      btn.addEventListener("click", async (e) => {
-        const bookingId = e.target.dataset.id;
-        try {
-          const confirmRes = await apiFetch(`/bookings/${bookingId}/confirm`, {
-            method: "PUT",
-          });
-          if (!confirmRes.ok) throw new Error("Confirmation failed");
-          alert("Booking confirmed!");
-          window.location.reload();
-        } catch (err) {
-          alert(err.message);
-        }
-      })
-    );
+    // ✅ Step 5: Status changes are pushed over a WebSocket, no polling
+    openBookingSocket(({ event, data }) => {
+      const booking = byId.get(data.booking_id);
+      if (event !== "booking.status" || !booking) return;
+      Object.assign(booking, data);
+      bookingsDiv
+        .querySelector(`.booking-card[data-booking-id="${data.booking_id}"]`)
+        ?.replaceWith(document.createRange().createContextualFragment(bookingCard(booking)));
+    });
   } catch (err) {
     console.error("Error fetching bookings:", err);
     bookingsDiv.innerHTML = `<p class="error">${err.message}</p>`;
@@ -48,3 +48,20 @@ export async function parseJSON(res){
   if (!txt) return null;
   try { return JSON.parse(txt); } catch(e) { return null; }
 }
+
+// Live booking status pushes; reconnects unless the token was rejected
+export function openBookingSocket(onEvent, lastEventId = null){
+  const params = new URLSearchParams({ token: getToken() || "" });
+  if (lastEventId !== null) params.set("last_event_id", lastEventId);
+  const socket = new WebSocket(`${API_BASE.replace(/^http/, "ws")}/bookings/ws?${params}`);
+
+  socket.onmessage = (e) => {
+    const msg = JSON.parse(e.data);
+    lastEventId = msg.id;
+    onEvent(msg);
+  };
+  socket.onclose = (e) => {
+    if (e.code !== 1008) setTimeout(() => openBookingSocket(onEvent, lastEventId), 3000);
+  };
+  return socket;
+}
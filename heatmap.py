@@ -0,0 +1,177 @@
+"""Demand heatmap of booking pickups and dropoffs.
+
+Recent bookings live in memory, in HEATMAP_SLOT_SECONDS slots covering the
+last HEATMAP_HORIZON_MINUTES. create_booking records each new booking after
+commit, startup reloads the horizon from Bookings, and slots that fall out of
+it are dropped as new ones open. A slot keeps its coordinates as one NumPy
+array, built once and reused until the slot changes. A heatmap of any window
+inside the horizon concatenates the slot arrays and bins them with a single
+np.histogram2d. Its cost depends on the bookings in the window, not the
+table. Window edges are rounded out to whole slots.
+
+Windows that start before the horizon read the coordinates from Bookings
+and BookingsArchive (by created_at) and bin them the same way.
+"""
+import calendar
+import math
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select, union_all
+from sqlalchemy.orm import Session
+
+from models import ArchivedBooking, Booking
+
+HEATMAP_HORIZON_MINUTES = int(os.getenv("HEATMAP_HORIZON_MINUTES", "1440"))
+HEATMAP_SLOT_SECONDS = int(os.getenv("HEATMAP_SLOT_SECONDS", "60"))
+HEATMAP_MAX_CELLS = int(os.getenv("HEATMAP_MAX_CELLS", "500"))  # per side
+
+# Column order of a slot array
+PICKUP_LAT, PICKUP_LON, DROPOFF_LAT, DROPOFF_LON = range(4)
+_COLUMNS = {"pickup": (PICKUP_LAT, PICKUP_LON), "dropoff": (DROPOFF_LAT, DROPOFF_LON)}
+
+
+class Bounds(NamedTuple):
+    min_lat: float
+    max_lat: float
+    min_lon: float
+    max_lon: float
+
+
+def _seconds(when: datetime) -> float:
+    return calendar.timegm(when.utctimetuple()) + when.microsecond / 1e6
+
+
+def _coordinate(value: Optional[float]) -> float:
+    return math.nan if value is None else value
+
+
+class _Slot:
+    __slots__ = ("rows", "array")
+
+    def __init__(self):
+        self.rows: List[Tuple[float, float, float, float]] = []
+        self.array: Optional[np.ndarray] = None
+
+    def points(self) -> np.ndarray:
+        if self.array is None:
+            self.array = np.array(self.rows, dtype=np.float64).reshape(-1, 4)
+        return self.array
+
+
+class DemandHeatmap:
+    """Thread-safe sliding window of recent booking coordinates."""
+
+    def __init__(self, horizon_minutes: int = HEATMAP_HORIZON_MINUTES, slot_seconds: int = HEATMAP_SLOT_SECONDS):
+        self.slot_seconds = slot_seconds
+        self.horizon = timedelta(minutes=horizon_minutes)
+        self.horizon_slots = max(1, horizon_minutes * 60 // slot_seconds)
+        self._slots: Dict[int, _Slot] = {}
+        self._latest: Optional[int] = None
+        self._loaded_from: Optional[datetime] = None  # memory is complete from here on
+        self._lock = threading.Lock()
+        self._recorded = 0
+
+    def _slot_of(self, when: datetime) -> int:
+        return int(_seconds(when) // self.slot_seconds)
+
+    def record(self, created_at: datetime, pickup_lat: Optional[float], pickup_lon: Optional[float],
+               dropoff_lat: Optional[float] = None, dropoff_lon: Optional[float] = None) -> None:
+        """Add one booking: O(1), the slot array is rebuilt on its next read."""
+        if pickup_lat is None and dropoff_lat is None:
+            return
+        slot = self._slot_of(created_at)
+        row = (_coordinate(pickup_lat), _coordinate(pickup_lon), _coordinate(dropoff_lat), _coordinate(dropoff_lon))
+        with self._lock:
+            if self._latest is not None and slot <= self._latest - self.horizon_slots:
+                return  # already outside the horizon
+            entry = self._slots.get(slot)
+            if entry is None:
+                entry = self._slots[slot] = _Slot()
+            entry.rows.append(row)
+            entry.array = None
+            self._recorded += 1
+            if self._latest is None or slot > self._latest:
+                self._latest = slot
+                self._evict()
+
+    def _evict(self) -> None:
+        oldest = self._latest - self.horizon_slots
+        for slot in [s for s in self._slots if s <= oldest]:
+            del self._slots[slot]
+
+    def covers(self, start: datetime, now: Optional[datetime] = None) -> bool:
+        """Whether a window from start can be served from memory."""
+        now = now or datetime.utcnow()
+        return self._loaded_from is not None and start >= max(self._loaded_from, now - self.horizon)
+
+    def points(self, start: datetime, end: datetime) -> np.ndarray:
+        """(n, 4) array of the bookings created in [start, end], slot-rounded."""
+        first, last = self._slot_of(start), self._slot_of(end)
+        with self._lock:
+            arrays = [entry.points() for slot, entry in self._slots.items() if first <= slot <= last]
+        return np.concatenate(arrays) if arrays else np.empty((0, 4))
+
+    def load(self, db: Session, now: Optional[datetime] = None) -> int:
+        """Rebuild the window from Bookings; returns the number of bookings loaded."""
+        since = (now or datetime.utcnow()) - self.horizon
+        rows = db.execute(
+            select(Booking.created_at, Booking.pickup_latitude, Booking.pickup_longitude,
+                   Booking.dropoff_latitude, Booking.dropoff_longitude)
+            .where(Booking.created_at >= since)
+        ).all()
+        with self._lock:
+            self._slots.clear()
+            self._latest = None
+        for row in rows:
+            self.record(*row)
+        self._loaded_from = since
+        return len(rows)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "horizon_minutes": int(self.horizon.total_seconds() // 60),
+                "slots": len(self._slots),
+                "points": sum(len(entry.rows) for entry in self._slots.values()),
+                "recorded": self._recorded,
+            }
+
+
+def points_from_db(db: Session, start: datetime, end: datetime) -> np.ndarray:
+    """(n, 4) array of the bookings created in [start, end], read from Bookings and BookingsArchive."""
+    rows = db.execute(union_all(*(
+        select(bookings.pickup_latitude, bookings.pickup_longitude,
+               bookings.dropoff_latitude, bookings.dropoff_longitude)
+        .where(bookings.created_at >= start, bookings.created_at <= end)
+        for bookings in (Booking, ArchivedBooking)
+    ))).all()
+    return np.array(rows, dtype=np.float64).reshape(-1, 4)  # NULL -> nan
+
+
+def bin_points(points: np.ndarray, kind: str, rows: int, cols: int,
+               bounds: Optional[Bounds] = None) -> Tuple[np.ndarray, Optional[Bounds]]:
+    """Counts per cell, rows south to north and columns west to east.
+
+    Without bounds the grid spans the points themselves. Points outside the
+    bounds and bookings without that end's coordinates are not counted.
+    """
+    lat_col, lon_col = _COLUMNS[kind]
+    lat, lon = points[:, lat_col], points[:, lon_col]
+    keep = np.isfinite(lat) & np.isfinite(lon)
+    lat, lon = lat[keep], lon[keep]
+    if bounds is None:
+        if not len(lat):
+            return np.zeros((rows, cols), dtype=np.int64), None
+        bounds = Bounds(float(lat.min()), float(lat.max()), float(lon.min()), float(lon.max()))
+    counts, _, _ = np.histogram2d(
+        lat, lon, bins=(rows, cols),
+        range=((bounds.min_lat, bounds.max_lat), (bounds.min_lon, bounds.max_lon)),
+    )
+    return counts.astype(np.int64), bounds
+
+
+demand_heatmap = DemandHeatmap()
@@ -0,0 +1,206 @@
+"""Hot/cold split: move finished bookings out of the live tables.
+
+Almost every Bookings row ends up `paid` or `cancelled` and is never written
+again, yet every listing, index probe and page cache pays for it. Bookings
+in one of HISTORY_STATUSES created more than HISTORY_RETENTION_DAYS ago are
+moved, with their ride, payment and complaints, into the *Archive tables of
+models.py. Each chunk of HISTORY_BATCH_BOOKINGS bookings moves in one
+transaction: INSERT ... SELECT into the archive, then DELETE from the hot
+table, so a booking is always in exactly one place.
+
+Kept hot:
+- bookings with a complaint that is not resolved yet
+- rides the Parquet archive (archive.py) has not exported yet, when it is on
+- the newest row of each table. SQLite picks max(id) + 1 for a new row, so
+  moving the newest row would let its id be handed out again.
+
+Moved rows keep their ids. Listings that take `history=true` merge both
+tables by id. These always read both:
+- revenue analytics
+- the demand heatmap
+- the rating and driver-total backfills
+- the /exports dumps (unless called with history=false)
+- the Parquet ride archive export
+By-id endpoints only see hot rows.
+
+The mover runs every HISTORY_INTERVAL_SECONDS on a background thread. To
+run it once by hand:
+
+    python history.py
+"""
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import List, NamedTuple, Optional
+
+from sqlalchemy import delete, exists, func, insert, or_, select
+from sqlalchemy.orm import Session, sessionmaker
+
+from archive import ride_archive
+from database import SessionLocal
+from models import (
+    ArchivedBooking, ArchivedComplaint, ArchivedPayment, ArchivedRide,
+    Booking, Complaint, Payment, Ride,
+)
+
+logger = logging.getLogger(__name__)
+
+HISTORY_RETENTION_DAYS = float(os.getenv("HISTORY_RETENTION_DAYS", "90"))
+HISTORY_INTERVAL_SECONDS = float(os.getenv("HISTORY_INTERVAL_SECONDS", "3600"))  # 0 disables the background mover
+HISTORY_BATCH_BOOKINGS = int(os.getenv("HISTORY_BATCH_BOOKINGS", "1000"))  # per write transaction
+HISTORY_STATUSES = ("paid", "cancelled")  # no transition leaves these
+
+# (hot, archive) pairs in insert order; deletes run in reverse
+_TABLES = ((Booking, ArchivedBooking), (Ride, ArchivedRide), (Payment, ArchivedPayment), (Complaint, ArchivedComplaint))
+
+
+class NewestIds(NamedTuple):
+    booking_id: int
+    ride_id: int
+    payment_id: int
+    complaint_id: int
+
+
+def newest_ids(db: Session) -> NewestIds:
+    row = db.execute(select(
+        select(func.max(Booking.booking_id)).scalar_subquery(),
+        select(func.max(Ride.ride_id)).scalar_subquery(),
+        select(func.max(Payment.payment_id)).scalar_subquery(),
+        select(func.max(Complaint.complaint_id)).scalar_subquery(),
+    )).one()
+    return NewestIds(*(value or 0 for value in row))
+
+
+def _owned_rows(hot, booking_ids: List[int]):
+    """WHERE clause for the rows of `hot` that belong to these bookings."""
+    if hot in (Booking, Ride, Payment):
+        return hot.booking_id.in_(booking_ids)
+    return hot.ride_id.in_(select(Ride.ride_id).where(Ride.booking_id.in_(booking_ids)))
+
+
+class HistoryMover:
+    def __init__(self, session_factory: sessionmaker = SessionLocal,
+                 retention_days: float = HISTORY_RETENTION_DAYS,
+                 interval: float = HISTORY_INTERVAL_SECONDS,
+                 batch_size: int = HISTORY_BATCH_BOOKINGS,
+                 ride_archive=ride_archive):
+        self.session_factory = session_factory
+        self.retention = timedelta(days=retention_days)
+        self.interval = interval
+        self.batch_size = batch_size
+        self.ride_archive = ride_archive
+        self._run_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._runs = 0
+        self._errors = 0
+        self._batches = 0
+        self._bookings_moved = 0
+        self._last = {"bookings": 0, "move_ms": 0.0}
+
+    def candidate_statement(self, cutoff: datetime, newest: NewestIds):
+        """SELECT of up to batch_size booking ids that may move now."""
+        ride_stays = Ride.ride_id == newest.ride_id
+        if self.ride_archive is not None:
+            exported_through = self.ride_archive.watermark()
+            not_exported = Ride.end_time.isnot(None)
+            if exported_through is not None:
+                not_exported = Ride.end_time > exported_through
+            ride_stays = or_(ride_stays, not_exported)
+
+        return (
+            select(Booking.booking_id)
+            .where(
+                Booking.status.in_(HISTORY_STATUSES),
+                Booking.created_at < cutoff,
+                Booking.booking_id != newest.booking_id,
+                ~exists().where(Ride.booking_id == Booking.booking_id, ride_stays),
+                ~exists().where(Payment.booking_id == Booking.booking_id, Payment.payment_id == newest.payment_id),
+                ~exists().where(
+                    Ride.booking_id == Booking.booking_id,
+                    Complaint.ride_id == Ride.ride_id,
+                    or_(Complaint.status != "resolved", Complaint.complaint_id == newest.complaint_id),
+                ),
+            )
+            .limit(self.batch_size)  # no ORDER BY: each batch stops as soon as it is full
+        )
+
+    def move(self, db: Session, booking_ids: List[int]) -> None:
+        """Move these bookings and their rows to the archive tables in one transaction."""
+        for hot, cold in _TABLES:
+            names = [column.name for column in hot.__table__.columns]
+            rows = select(*(hot.__table__.c[name] for name in names)).where(_owned_rows(hot, booking_ids))
+            db.execute(insert(cold).from_select(names, rows))
+        for hot, _ in reversed(_TABLES):
+            db.execute(delete(hot).where(_owned_rows(hot, booking_ids)).execution_options(synchronize_session=False))
+        db.commit()
+
+    def run(self, now: Optional[datetime] = None) -> int:
+        """Move every eligible booking, a batch per transaction; returns how many moved."""
+        with self._run_lock:
+            started = time.perf_counter()
+            cutoff = (now or datetime.utcnow()) - self.retention
+            moved = 0
+            with self.session_factory() as db:
+                candidates = self.candidate_statement(cutoff, newest_ids(db))
+                while not self._stop.is_set():
+                    booking_ids = list(db.scalars(candidates))
+                    db.rollback()  # end the read so the move starts with its write
+                    if not booking_ids:
+                        break
+                    self.move(db, booking_ids)
+                    moved += len(booking_ids)
+                    with self._lock:
+                        self._batches += 1
+                        self._bookings_moved += len(booking_ids)
+                    if len(booking_ids) < self.batch_size:
+                        break
+            with self._lock:
+                self._runs += 1
+                self._last = {"bookings": moved, "move_ms": round((time.perf_counter() - started) * 1000, 1)}
+            return moved
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.run()
+            except Exception:
+                logger.exception("Moving finished bookings to history failed")
+                with self._lock:
+                    self._errors += 1
+
+    def start(self) -> None:
+        if self.interval <= 0:
+            return
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="history-mover", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "retention_days": self.retention.total_seconds() / 86400,
+                "interval_s": self.interval,
+                "runs": self._runs,
+                "errors": self._errors,
+                "batches": self._batches,
+                "bookings_moved": self._bookings_moved,
+                "last_run": dict(self._last),
+            }
+
+
+history_mover = HistoryMover()
+
+
+if __name__ == "__main__":
+    print(f"Moved {history_mover.run()} bookings older than {history_mover.retention.days} days to history")
@@ -0,0 +1,225 @@
+"""Buffered ingestion of driver GPS updates.
+
+Updates land in memory, newest per driver wins, and a background flusher
+writes whatever is pending to the Drivers table in one transaction every
+LOCATION_FLUSH_INTERVAL_SECONDS. A driver pinging every few seconds therefore
+costs one row in a periodic batch instead of one SQLite transaction per ping.
+The nearest-driver grid is moved immediately; only persistence is deferred.
+A driver who is not in the grid yet (first fix arrives by ping) is added at
+flush time, once the Drivers row shows them available with a position.
+"""
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.orm import sessionmaker
+
+from database import SessionLocal
+from models import Driver
+from spatial import driver_index
+
+logger = logging.getLogger(__name__)
+
+LOCATION_FLUSH_INTERVAL_SECONDS = float(os.getenv("LOCATION_FLUSH_INTERVAL_SECONDS", "1.0"))
+# Flush early once this many drivers are waiting, instead of at the next tick
+LOCATION_FLUSH_MAX_PENDING = int(os.getenv("LOCATION_FLUSH_MAX_PENDING", "20000"))
+LOCATION_BATCH_MAX_POINTS = int(os.getenv("LOCATION_BATCH_MAX_POINTS", "5000"))
+
+_INDEX_CHECK_CHUNK = 1000  # driver ids per availability lookup after a flush
+
+
+# Core executemany: unlike ORM bulk UPDATE it does not fail the whole batch
+# when a driver row has been deleted since the ping was accepted.
+_drivers = Driver.__table__
+_FLUSH_STATEMENT = (
+    update(_drivers)
+    .where(_drivers.c.driver_id == bindparam("id"))
+    .values(
+        latitude=bindparam("lat"),
+        longitude=bindparam("lon"),
+        location_updated_at=bindparam("at"),
+    )
+)
+
+
+class LocationUpdate(NamedTuple):
+    latitude: float
+    longitude: float
+    recorded_at: datetime
+    received_at: float  # time.monotonic() when accepted
+    indexed: bool  # False: the driver was not in the nearest-driver grid
+
+
+class LocationBuffer:
+    """Latest-position-per-driver buffer with periodic group commits."""
+
+    def __init__(
+        self,
+        session_factory: sessionmaker = SessionLocal,
+        interval: float = LOCATION_FLUSH_INTERVAL_SECONDS,
+        max_pending: int = LOCATION_FLUSH_MAX_PENDING,
+    ):
+        self.session_factory = session_factory
+        self.interval = interval
+        self.max_pending = max_pending
+        self._pending: Dict[int, LocationUpdate] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # Metrics
+        self._received = 0
+        self._coalesced = 0
+        self._requests = 0
+        self._ingest_total = 0.0
+        self._ingest_max = 0.0
+        self._flushes = 0
+        self._flush_errors = 0
+        self._rows_flushed = 0
+        self._last_flush = 0.0
+        self._lag_total = 0.0
+        self._lag_max = 0.0
+
+    def record(self, points: Iterable[tuple]) -> int:
+        """Accept (driver_id, latitude, longitude, recorded_at) tuples; returns how many."""
+        started = time.perf_counter()
+        now = time.monotonic()
+        count = 0
+        with self._lock:
+            pending = self._pending
+            for driver_id, lat, lon, recorded_at in points:
+                count += 1
+                previous = pending.get(driver_id)
+                first_received = now
+                if previous is not None:
+                    self._coalesced += 1
+                    if previous.recorded_at > recorded_at:
+                        continue  # out-of-order ping; keep the newer fix
+                    # Flush lag counts from the oldest unflushed ping for this driver
+                    first_received = previous.received_at
+                indexed = driver_index.move(driver_id, lat, lon)
+                pending[driver_id] = LocationUpdate(lat, lon, recorded_at, first_received, indexed)
+
+            elapsed = time.perf_counter() - started
+            self._received += count
+            self._requests += 1
+            self._ingest_total += elapsed
+            self._ingest_max = max(self._ingest_max, elapsed)
+            backlog = len(pending)
+
+        if backlog >= self.max_pending:
+            self._wake.set()
+        return count
+
+    def flush(self) -> int:
+        """Write every pending position in one transaction; returns rows written."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                return 0
+
+            started = time.perf_counter()
+            rows = [
+                {"id": driver_id, "lat": point.latitude, "lon": point.longitude, "at": point.recorded_at}
+                for driver_id, point in batch.items()
+            ]
+            unindexed = [driver_id for driver_id, point in batch.items() if not point.indexed]
+            try:
+                with self.session_factory() as db:
+                    db.execute(_FLUSH_STATEMENT, rows)
+                    db.commit()
+            except Exception:
+                logger.exception("Location flush of %d drivers failed; will retry", len(rows))
+                with self._lock:
+                    self._flush_errors += 1
+                    # Put the batch back unless a newer ping arrived meanwhile
+                    for driver_id, point in batch.items():
+                        self._pending.setdefault(driver_id, point)
+                return 0
+
+            if unindexed:
+                try:
+                    with self.session_factory() as db:
+                        self._index_available(db, unindexed)
+                except Exception:
+                    logger.exception("Indexing %d newly located drivers failed", len(unindexed))
+
+            finished = time.monotonic()
+            oldest = min(point.received_at for point in batch.values())
+            with self._lock:
+                self._flushes += 1
+                self._rows_flushed += len(rows)
+                self._last_flush = time.perf_counter() - started
+                self._lag_total += finished - oldest
+                self._lag_max = max(self._lag_max, finished - oldest)
+            return len(rows)
+
+    def _index_available(self, db, driver_ids: List[int]) -> None:
+        """Add the available drivers among these to the grid, at their committed position.
+
+        Busy drivers ping too, so most of these stay out; a driver who turns
+        available later is indexed by that transition (spatial.sync_driver).
+        """
+        for start in range(0, len(driver_ids), _INDEX_CHECK_CHUNK):
+            chunk = driver_ids[start:start + _INDEX_CHECK_CHUNK]
+            available = db.execute(
+                select(_drivers.c.driver_id, _drivers.c.latitude, _drivers.c.longitude)
+                .where(_drivers.c.driver_id.in_(chunk), _drivers.c.is_available.is_(True))
+            )
+            for driver_id, lat, lon in available:
+                if lat is not None and lon is not None:
+                    driver_index.upsert(driver_id, lat, lon)
+
+    def discard(self, driver_id: int) -> None:
+        """Drop a buffered position, e.g. when the driver row is deleted."""
+        with self._lock:
+            self._pending.pop(driver_id, None)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.flush()
+        self.flush()
+
+    def start(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="location-flusher", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the flusher after a final flush."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            requests = self._requests or 1
+            flushes = self._flushes or 1
+            return {
+                "flush_interval_s": self.interval,
+                "pending": len(self._pending),
+                "points_received": self._received,
+                "points_coalesced": self._coalesced,
+                "avg_ingest_us": round(self._ingest_total / requests * 1e6, 1),
+                "max_ingest_us": round(self._ingest_max * 1e6, 1),
+                "flushes": self._flushes,
+                "flush_errors": self._flush_errors,
+                "rows_flushed": self._rows_flushed,
+                "last_flush_ms": round(self._last_flush * 1000, 3),
+                "avg_flush_lag_ms": round(self._lag_total / flushes * 1000, 1),
+                "max_flush_lag_ms": round(self._lag_max * 1000, 1),
+            }
+
+
+location_buffer = LocationBuffer()
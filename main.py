@@ -1,8 +1,34 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from database import Base, engine
+from archive import ride_archive
+from database import Base, SessionLocal, engine
+from dispatch import dispatch_engine
+from fares import fare_engine
+from heatmap import demand_heatmap
+from history import history_mover
+from location_ingest import location_buffer
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # ✅ Background group commits for driver GPS pings; final flush on shutdown
+    location_buffer.start()
+    dispatch_engine.start()  # ✅ batch driver assignment tick
+    if ride_archive is not None:
+        ride_archive.start()  # ✅ periodic Parquet export of closed rides
+    history_mover.start()  # ✅ moves old finished bookings to the archive tables
+    yield
+    history_mover.stop()
+    if ride_archive is not None:
+        ride_archive.stop()
+    dispatch_engine.stop()
+    location_buffer.stop()
+    await fare_engine.aclose()  # ✅ pooled routing-service connections, if configured
 
-app = FastAPI(title="Cab Booking API")
+
+app = FastAPI(title="Cab Booking API", lifespan=lifespan)
 
 
 
@@ -19,14 +45,19 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],  # keyset pagination cursor
 )
 import models
+from migrations import run_migrations
+from spatial import load_driver_index
 
 # Import all APIs
 from apis import (
     user_api, role_api, permission_api,
     booking_api, ride_api, payment_api,
-    driver_api, complaint_api, vehicle_api
+    driver_api, complaint_api, vehicle_api,
+    metrics_api, export_api, fare_api,
+    analytics_api
 )
 
 
@@ -41,10 +72,22 @@ app.include_router(payment_api.router)
 app.include_router(driver_api.router)
 app.include_router(complaint_api.router)
 app.include_router(vehicle_api.router)
+app.include_router(metrics_api.router)
+app.include_router(export_api.router)
+app.include_router(fare_api.router)
+app.include_router(analytics_api.router)
 
 # ✅ Initialize DB tables
 Base.metadata.create_all(bind=engine)
 
+# ✅ Bring existing databases up to date (indexes added after creation)
+run_migrations(engine)
+
+# ✅ Warm the nearest-driver index and the recent demand heatmap
+with SessionLocal() as db:
+    load_driver_index(db)
+    demand_heatmap.load(db)
+
 @app.get("/")
 def root():
     return {"message": "Cab Booking API is running!"}
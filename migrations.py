@@ -0,0 +1,167 @@
+"""Schema upgrades for databases created by an older models.py.
+
+Base.metadata.create_all() only creates missing tables, so columns and indexes
+added to existing tables are applied here.
+
+    python migrations.py                          # apply pending migrations
+    python migrations.py --check-plans            # also fail if a hot query does a full scan
+    python migrations.py --backfill-ratings       # rebuild Users.rating_* from Rides
+    python migrations.py --backfill-driver-stats  # rebuild Drivers dashboard totals from Rides
+"""
+import sys
+from datetime import date, datetime
+from typing import Dict, List, Set
+
+from sqlalchemy import inspect, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import CreateColumn
+
+from analytics import bucket_statement
+from archive import export_statement
+from database import Base, engine
+from driver_stats import backfill_driver_stats
+from history import NewestIds, history_mover
+from models import (
+    ArchivedBooking, ArchivedRide, Booking, Complaint, Driver, Payment, Ride, User, Vehicle,
+)
+from ratings import backfill_rating_stats
+
+
+def add_missing_columns(bind: Engine) -> Set[str]:
+    """ALTER TABLE ... ADD COLUMN for every model column the database lacks.
+
+    New columns must be nullable or carry a server_default so existing rows stay valid.
+    Returns the "table.column" names that were added.
+    """
+    added = set()
+    inspector = inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+    preparer = bind.dialect.identifier_preparer
+    with bind.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            present = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in present:
+                    ddl = CreateColumn(column).compile(dialect=bind.dialect)
+                    conn.exec_driver_sql(f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {ddl}")
+                    added.add(f"{table.name}.{column.name}")
+    return added
+
+
+def create_missing_indexes(bind: Engine) -> None:
+    """Create every index declared in models.py that the database lacks."""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=bind, checkfirst=True)
+
+
+def run_migrations(bind: Engine = engine) -> None:
+    added = add_missing_columns(bind)
+    create_missing_indexes(bind)
+    # Rating aggregates start at zero on existing rows; seed them from ride history once
+    if f"{User.__tablename__}.rating_count" in added:
+        backfill_rating_stats(bind)
+    if f"{Driver.__tablename__}.total_rides" in added:
+        backfill_driver_stats(bind)
+
+
+# Queries behind the busiest endpoints; none of them may scan a whole table.
+_NOW = datetime(2025, 1, 1)
+HOT_QUERIES = {
+    "available_bookings": select(Booking).where(Booking.status == "requested"),
+    "bookings_page": select(Booking)
+    .where(Booking.booking_id > 100)
+    .order_by(Booking.booking_id)
+    .limit(101),
+    "rides_page": select(Ride).where(Ride.ride_id > 100).order_by(Ride.ride_id).limit(101),
+    "payments_page": select(Payment)
+    .where(Payment.payment_id > 100)
+    .order_by(Payment.payment_id)
+    .limit(101),
+    "bookings_by_user": select(Booking).where(Booking.user_id == 1),
+    "bookings_by_driver": select(Booking).where(Booking.driver_id == 1),
+    "accepted_bookings_for_driver": select(Booking).where(
+        Booking.driver_id == 1, Booking.status == "accepted"
+    ),
+    "rides_by_user": select(Ride).where(Ride.user_id == 1),
+    "rides_by_driver": select(Ride).where(Ride.driver_id == 1),
+    "recent_rides_for_driver": select(Ride)
+    .where(Ride.driver_id == 1)
+    .order_by(Ride.start_time.desc())
+    .limit(5),
+    "ride_by_booking": select(Ride).where(Ride.booking_id == 1),
+    "rides_by_start_time": select(Ride).where(Ride.start_time >= _NOW, Ride.start_time < _NOW),
+    "rides_closed_since": select(Ride).where(Ride.end_time > _NOW, Ride.end_time <= _NOW),
+    "ride_archive_export": export_statement(_NOW, _NOW),
+    "bookings_by_created_at": select(Booking).where(Booking.created_at >= _NOW, Booking.created_at <= _NOW),
+    "cancellations_by_created_at": select(Booking).where(
+        Booking.status == "cancelled", Booking.created_at >= _NOW, Booking.created_at < _NOW
+    ),
+    "revenue_buckets": bucket_statement("day", _NOW, _NOW),
+    "payment_by_booking": select(Payment).where(Payment.booking_id == 1),
+    "payments_by_status": select(Payment).where(Payment.status == "pending"),
+    "payments_by_date_range": select(Payment).where(
+        Payment.timestamp >= _NOW, Payment.timestamp <= _NOW
+    ),
+    "my_pending_payments": select(Payment).where(
+        Payment.user_id == 1, Payment.status == "pending"
+    ),
+    "driver_payments": select(Payment, Ride.ride_id)
+    .join(Booking, Payment.booking_id == Booking.booking_id)
+    .join(Ride, Ride.booking_id == Booking.booking_id)
+    .where(Ride.driver_id == 1),
+    "complaints_by_user": select(Complaint).where(Complaint.user_id == 1),
+    "history_candidates": history_mover.candidate_statement(_NOW, NewestIds(100, 100, 100, 100)),
+    "archived_bookings_by_user": select(ArchivedBooking).where(ArchivedBooking.user_id == 1),
+    "archived_bookings_by_driver": select(ArchivedBooking).where(ArchivedBooking.driver_id == 1),
+    "archived_rides_by_user": select(ArchivedRide).where(ArchivedRide.user_id == 1),
+    "archived_rides_by_driver": select(ArchivedRide).where(ArchivedRide.driver_id == 1),
+    "driver_by_user": select(Driver).where(Driver.user_id == 1),
+    "vehicles_by_driver": select(Vehicle).where(Vehicle.driver_id == 1),
+}
+
+
+def explain(bind: Engine, statement) -> List[str]:
+    """Return the EXPLAIN QUERY PLAN detail lines for a statement."""
+    compiled = statement.compile(dialect=bind.dialect, compile_kwargs={"render_postcompile": True})
+    params = tuple(
+        str(value) if isinstance(value, (date, datetime)) else value
+        for value in (compiled.params[name] for name in compiled.positiontup)
+    )
+    with bind.connect() as conn:
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params).fetchall()
+    return [row[-1] for row in rows]
+
+
+def find_full_scans(bind: Engine = engine) -> Dict[str, List[str]]:
+    """Map each hot query that scans a table to its query plan."""
+    offenders = {}
+    for name, statement in HOT_QUERIES.items():
+        plan = explain(bind, statement)
+        if any(step.startswith("SCAN") for step in plan):
+            offenders[name] = plan
+    return offenders
+
+
+if __name__ == "__main__":
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    print("Migrations applied")
+
+    if "--backfill-ratings" in sys.argv:
+        backfill_rating_stats(engine)
+        print("Rating aggregates rebuilt from Rides")
+
+    if "--backfill-driver-stats" in sys.argv:
+        backfill_driver_stats(engine)
+        print("Driver dashboard totals rebuilt from Rides")
+
+    if "--check-plans" in sys.argv:
+        offenders = find_full_scans(engine)
+        for name, plan in offenders.items():
+            print(f"FULL SCAN in {name}: {' | '.join(plan)}")
+        if offenders:
+            sys.exit(1)
+        print(f"All {len(HOT_QUERIES)} hot queries use an index")
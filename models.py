@@ -1,5 +1,5 @@
 from database import Base
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, Date, DateTime
+from sqlalchemy import Column, Integer, String, Float, Boolean, ForeignKey, Date, DateTime, Index, Table
 from sqlalchemy.orm import relationship
 
 
@@ -12,6 +12,9 @@ class User(Base):
     phone_number = Column(String, nullable=False)
     password = Column(String, nullable=False)
     rating = Column(Float, nullable=True, default=0)
+    # ⭐ Running aggregates behind `rating`, maintained by ratings.py
+    rating_sum = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_count = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(Date, nullable=False)
 
     # Role-based access
@@ -35,7 +38,19 @@ class Driver(Base):
     user_id = Column(Integer, ForeignKey("Users.user_id", ondelete="CASCADE"), unique=True, nullable=False)
     license = Column(String, nullable=False)
     experience_years = Column(Integer, nullable=True)
-    
+
+    # 📍 Last reported position and dispatch availability
+    latitude = Column(Float, nullable=True)
+    longitude = Column(Float, nullable=True)
+    location_updated_at = Column(DateTime, nullable=True)
+    is_available = Column(Boolean, nullable=False, default=False, server_default="0")
+
+    # 📊 Dashboard totals, kept current by ride start/end and ratings (see driver_stats.py)
+    total_rides = Column(Integer, nullable=False, default=0, server_default="0")
+    completed_rides = Column(Integer, nullable=False, default=0, server_default="0")
+    total_earnings = Column(Float, nullable=False, default=0, server_default="0")
+    rating_sum = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_count = Column(Integer, nullable=False, default=0, server_default="0")
 
     # Relationships
     user = relationship("User", back_populates="driver_profile")  # ✅ extension link
@@ -51,7 +66,7 @@ class Vehicle(Base):
     __tablename__ = "Vehicles"
 
     vehicle_id = Column(Integer, primary_key=True, index=True)
-    driver_id = Column(Integer, ForeignKey("Drivers.driver_id", ondelete="CASCADE"), nullable=False)
+    driver_id = Column(Integer, ForeignKey("Drivers.driver_id", ondelete="CASCADE"), nullable=False, index=True)
     vehicle_type = Column(String, nullable=False)
     registration_number = Column(String, nullable=False, unique=True)
     model = Column(String, nullable=False)
@@ -65,12 +80,21 @@ class Vehicle(Base):
 
 class Booking(Base):
     __tablename__ = "Bookings"
+    __table_args__ = (
+        Index("ix_Bookings_driver_id_status", "driver_id", "status"),
+        Index("ix_Bookings_status_created_at", "status", "created_at"),
+        Index("ix_Bookings_created_at", "created_at"),  # demand heatmap windows
+    )
 
     booking_id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("Users.user_id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("Users.user_id"), nullable=False, index=True)
     driver_id = Column(Integer, ForeignKey("Drivers.driver_id"))
     pickup_location = Column(String, nullable=False)
     dropoff_location = Column(String, nullable=False)
+    pickup_latitude = Column(Float, nullable=True)  # 📍 used by automatic dispatch
+    pickup_longitude = Column(Float, nullable=True)
+    dropoff_latitude = Column(Float, nullable=True)
+    dropoff_longitude = Column(Float, nullable=True)
     pickup_time = Column(DateTime, nullable=False)
     dropoff_time = Column(DateTime, nullable=True)
     fare_estimate = Column(Float, nullable=False)
@@ -91,10 +115,15 @@ class Booking(Base):
 
 class Ride(Base):
     __tablename__ = "Rides"
+    __table_args__ = (
+        Index("ix_Rides_driver_id_start_time", "driver_id", "start_time"),
+        Index("ix_Rides_start_time", "start_time"),  # analytics time ranges
+        Index("ix_Rides_end_time", "end_time"),  # archive export watermark
+    )
 
     ride_id = Column(Integer, primary_key=True, index=True)
-    booking_id = Column(Integer, ForeignKey("Bookings.booking_id"), nullable=False)
-    user_id = Column(Integer, ForeignKey("Users.user_id"), nullable=False)
+    booking_id = Column(Integer, ForeignKey("Bookings.booking_id"), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("Users.user_id"), nullable=False, index=True)
     driver_id = Column(Integer, ForeignKey("Drivers.driver_id"), nullable=False)
     start_time = Column(DateTime, nullable=False)
     end_time = Column(DateTime)
@@ -114,6 +143,9 @@ class Ride(Base):
 
 class Payment(Base):
     __tablename__ = "Payments"
+    __table_args__ = (
+        Index("ix_Payments_user_id_status", "user_id", "status"),
+    )
 
     payment_id = Column(Integer, primary_key=True, index=True)
     booking_id = Column(Integer, ForeignKey("Bookings.booking_id"), unique=True)
@@ -121,8 +153,8 @@ class Payment(Base):
     amount = Column(Float, nullable=False)
     payment_method = Column(String, nullable=False)
     transaction_id = Column(String, nullable=False, unique=True)
-    status = Column(String, nullable=False)
-    timestamp = Column(DateTime, nullable=False)
+    status = Column(String, nullable=False, index=True)
+    timestamp = Column(DateTime, nullable=False, index=True)
 
     booking = relationship("Booking", back_populates="payment")
     user = relationship("User", back_populates="payments")
@@ -134,9 +166,12 @@ class Payment(Base):
 
 class Complaint(Base):
     __tablename__ = "Complaints"
+    __table_args__ = (
+        Index("ix_Complaints_ride_id", "ride_id"),  # history mover, per-ride lookups
+    )
 
     complaint_id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("Users.user_id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("Users.user_id"), nullable=False, index=True)
     ride_id = Column(Integer, ForeignKey("Rides.ride_id"), nullable=False)
     description = Column(String, nullable=False)
     status = Column(String, nullable=False)  
@@ -147,6 +182,72 @@ class Complaint(Base):
     user = relationship("User", back_populates="complaints")
     ride = relationship("Ride", back_populates="complaints")
 
+
+# 🗄️ Cold copies of finished bookings and their rows, moved out by history.py.
+# Same columns and primary keys as the hot tables; no foreign keys, so a moved
+# row never blocks deleting the user or driver it points at.
+def _archive_table(hot: Table, *indexes: Index) -> Table:
+    columns = [
+        Column(
+            column.name,
+            column.type,
+            primary_key=column.primary_key,
+            nullable=column.nullable,
+            autoincrement=False,  # ids are copied from the hot row
+            server_default=column.server_default.arg if column.server_default is not None else None,
+        )
+        for column in hot.columns
+    ]
+    return Table(f"{hot.name}Archive", Base.metadata, *columns, *indexes)
+
+
+class ArchivedBooking(Base):
+    __table__ = _archive_table(
+        Booking.__table__,
+        Index("ix_BookingsArchive_user_id", "user_id"),
+        Index("ix_BookingsArchive_driver_id", "driver_id"),
+        Index("ix_BookingsArchive_status_created_at", "status", "created_at"),
+        Index("ix_BookingsArchive_created_at", "created_at"),
+    )
+
+    ride = relationship(
+        "ArchivedRide", primaryjoin="ArchivedBooking.booking_id == foreign(ArchivedRide.booking_id)",
+        uselist=False, viewonly=True,
+    )
+
+
+class ArchivedRide(Base):
+    __table__ = _archive_table(
+        Ride.__table__,
+        Index("ix_RidesArchive_booking_id", "booking_id"),
+        Index("ix_RidesArchive_user_id", "user_id"),
+        Index("ix_RidesArchive_driver_id", "driver_id"),
+        Index("ix_RidesArchive_start_time", "start_time"),
+        Index("ix_RidesArchive_end_time", "end_time"),  # archive export watermark
+    )
+
+    booking = relationship(
+        "ArchivedBooking", primaryjoin="foreign(ArchivedRide.booking_id) == ArchivedBooking.booking_id",
+        viewonly=True,
+    )
+
+
+class ArchivedPayment(Base):
+    __table__ = _archive_table(
+        Payment.__table__,
+        Index("ix_PaymentsArchive_booking_id", "booking_id"),
+        Index("ix_PaymentsArchive_timestamp", "timestamp"),
+    )
+
+
+class ArchivedComplaint(Base):
+    __table__ = _archive_table(
+        Complaint.__table__,
+        Index("ix_ComplaintsArchive_user_id", "user_id"),
+        Index("ix_ComplaintsArchive_ride_id", "ride_id"),
+    )
+
+
 from sqlalchemy import Column, Integer, String, ForeignKey
 from sqlalchemy.orm import relationship
 from database import Base
@@ -0,0 +1,99 @@
+import base64
+import heapq
+import json
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Query, Response
+
+# Keyset pagination config
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class PageParams:
+    """`?limit=&cursor=` query parameters shared by every list endpoint."""
+
+    def __init__(
+        self,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        cursor: Optional[str] = Query(None, description=f"Opaque value of the {NEXT_CURSOR_HEADER} response header"),
+    ):
+        self.limit = limit
+        self.after = decode_cursor(cursor) if cursor else None
+
+
+def encode_cursor(last_key: int) -> str:
+    """Opaque cursor pointing just past the given key."""
+    return base64.urlsafe_b64encode(json.dumps({"k": last_key}).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        key = json.loads(base64.urlsafe_b64decode(padded.encode()))["k"]
+        if not isinstance(key, int):
+            raise ValueError(key)
+        return key
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+
+def _key_getter(key_column) -> Callable[[Any], int]:
+    return lambda row: getattr(row, key_column.key)
+
+
+def _finish_page(rows: list, page: PageParams, response: Response, key: Callable[[Any], int]) -> list:
+    """Trim the look-ahead row and advertise the next cursor when there is one."""
+    if len(rows) > page.limit:
+        rows = rows[:page.limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(key(rows[-1]))
+    return rows
+
+
+def _merge(parts: Sequence[list], page: PageParams, key: Callable[[Any], int]) -> list:
+    """First limit + 1 rows of several look-ahead pages that are each sorted by key."""
+    return list(heapq.merge(*parts, key=key))[:page.limit + 1]
+
+
+def _page_query(query, key_column, page: PageParams):
+    if page.after is not None:
+        query = query.filter(key_column > page.after)
+    return query.order_by(key_column).limit(page.limit + 1)
+
+
+def paginate(query, key_column, page: PageParams, response: Response, key: Optional[Callable[[Any], int]] = None) -> List:
+    """Apply keyset pagination on an ascending unique key to a Query; no COUNT(*) is run."""
+    rows = _page_query(query, key_column, page).all()
+    return _finish_page(rows, page, response, key or _key_getter(key_column))
+
+
+def paginate_union(sources: Sequence[Tuple[Any, Any]], page: PageParams, response: Response) -> List:
+    """paginate() over several (query, key_column) pairs whose keys never collide, e.g. a table and its archive.
+
+    Each source is read with the same keyset bound and limit, and the pages are merged by key.
+    """
+    key = _key_getter(sources[0][1])
+    parts = [_page_query(query, key_column, page).all() for query, key_column in sources]
+    return _finish_page(_merge(parts, page, key), page, response, key)
+
+
+async def _page_rows_async(db, statement, key_column, page: PageParams, scalars: bool = True) -> list:
+    if page.after is not None:
+        statement = statement.where(key_column > page.after)
+    result = await db.execute(statement.order_by(key_column).limit(page.limit + 1))
+    return list(result.scalars().all() if scalars else result.all())
+
+
+async def paginate_async(db, statement, key_column, page: PageParams, response: Response,
+                         key: Optional[Callable[[Any], int]] = None, scalars: bool = True) -> List:
+    """AsyncSession counterpart of paginate() for select() statements."""
+    rows = await _page_rows_async(db, statement, key_column, page, scalars)
+    return _finish_page(rows, page, response, key or _key_getter(key_column))
+
+
+async def paginate_union_async(db, sources: Sequence[Tuple[Any, Any]], page: PageParams, response: Response) -> List:
+    """AsyncSession counterpart of paginate_union() for (select(), key_column) pairs of entities."""
+    key = _key_getter(sources[0][1])
+    parts = [await _page_rows_async(db, statement, key_column, page) for statement, key_column in sources]
+    return _finish_page(_merge(parts, page, key), page, response, key)
@@ -0,0 +1,97 @@
+"""Running rating aggregates on Users.
+
+Users.rating_sum and Users.rating_count hold every rating a user has
+received: as a rider (Rides.rating_by_driver) and as a driver
+(Rides.rating_by_user). Users.rating is their average. Each rating write
+adjusts all three with one relative UPDATE, so the database applies it
+atomically and concurrent ratings cannot lose each other's increments. A
+rating write costs O(1) however long the history is.
+
+backfill_rating_stats() rebuilds the aggregates from Rides and RidesArchive. Migrations run
+it when the columns are first added. Rerun it with:
+
+    python migrations.py --backfill-ratings
+"""
+from typing import Optional, Tuple
+
+from sqlalchemy import Float, cast, func, select, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from models import ArchivedRide, Driver, Ride, User
+
+
+def rating_change(old: Optional[int], new: Optional[int]) -> Optional[Tuple[int, int]]:
+    """(sum delta, count delta) for a ride rating going old -> new, or None if unchanged."""
+    if new is None or new == old:
+        return None
+    return new - (old or 0), 1 if old is None else 0
+
+
+def rating_update_statement(old: Optional[int], new: Optional[int], *,
+                            user_id: Optional[int] = None, driver_id: Optional[int] = None):
+    """UPDATE folding a ride's rating change old -> new into the rated user's aggregates.
+
+    Target the rider with user_id, or the driver (through Drivers.user_id)
+    with driver_id. Returns None when nothing changes.
+    """
+    change = rating_change(old, new)
+    if change is None:
+        return None
+    delta, added = change
+    if user_id is not None:
+        target = User.user_id == user_id
+    else:
+        target = User.user_id == select(Driver.user_id).where(Driver.driver_id == driver_id).scalar_subquery()
+    return (
+        update(User)
+        .where(target)
+        .values(
+            rating_sum=User.rating_sum + delta,
+            rating_count=User.rating_count + added,
+            rating=cast(User.rating_sum + delta, Float) / (User.rating_count + added),
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+def record_rating(db: Session, old: Optional[int], new: Optional[int], *,
+                  user_id: Optional[int] = None, driver_id: Optional[int] = None) -> None:
+    """Apply rating_update_statement in the caller's transaction."""
+    statement = rating_update_statement(old, new, user_id=user_id, driver_id=driver_id)
+    if statement is not None:
+        db.execute(statement)
+
+
+def _received(aggregate, as_driver: bool, rides=Ride):
+    """Correlated subquery: `aggregate` over the ratings the outer Users row received in one ride table."""
+    if as_driver:
+        ratings = select(aggregate(rides.rating_by_user)).join(Driver, Driver.driver_id == rides.driver_id)
+        return ratings.where(Driver.user_id == User.user_id).scalar_subquery()
+    return select(aggregate(rides.rating_by_driver)).where(rides.user_id == User.user_id).scalar_subquery()
+
+
+def _received_total(aggregate):
+    """`aggregate` over every rating the outer Users row received, as rider and as driver, hot and archived."""
+    parts = [_received(aggregate, as_driver, rides) for rides in (Ride, ArchivedRide) for as_driver in (False, True)]
+    return sum(parts[1:], parts[0])
+
+
+def _total(column):
+    return func.coalesce(func.sum(column), 0)
+
+
+def backfill_rating_stats(bind: Engine) -> None:
+    """Recompute every user's aggregates from Rides, in one transaction."""
+    with bind.begin() as conn:
+        conn.execute(
+            update(User).values(
+                rating_sum=_received_total(_total),
+                rating_count=_received_total(func.count),
+            )
+        )
+        conn.execute(
+            update(User)
+            .where(User.rating_count > 0)
+            .values(rating=cast(User.rating_sum, Float) / User.rating_count)
+        )
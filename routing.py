@@ -0,0 +1,196 @@
+"""Client for an external Directions-style routing service.
+
+Enabled by ROUTING_URL. The service must answer Mapbox-style requests:
+    GET {ROUTING_URL}/directions/v5/mapbox/driving/{lon},{lat};{lon},{lat}
+    -> {"routes": [{"distance": <metres>, "duration": <seconds>}]}
+
+All calls go through one pooled httpx.AsyncClient per event loop, with
+ROUTING_TIMEOUT_SECONDS on each request. Concurrent requests for the same
+origin/destination share one upstream call. A circuit breaker stops calling
+after ROUTING_BREAKER_FAILURES consecutive failures. After
+ROUTING_BREAKER_RESET_SECONDS it lets one trial call through. While the
+breaker is open, callers get RoutingUnavailable immediately and the fare
+engine uses its offline provider instead.
+
+benchmarks/fake_routing.py is a local stand-in for tests and load runs.
+"""
+import asyncio
+import os
+import threading
+import time
+from typing import Dict, NamedTuple, Optional, Tuple
+
+try:
+    import httpx
+except ImportError:  # external routing unavailable; offline estimates only
+    httpx = None
+
+ROUTING_URL = os.getenv("ROUTING_URL")
+ROUTING_ACCESS_TOKEN = os.getenv("ROUTING_ACCESS_TOKEN")
+ROUTING_TIMEOUT_SECONDS = float(os.getenv("ROUTING_TIMEOUT_SECONDS", "2.0"))
+ROUTING_MAX_CONNECTIONS = int(os.getenv("ROUTING_MAX_CONNECTIONS", "100"))
+ROUTING_BREAKER_FAILURES = int(os.getenv("ROUTING_BREAKER_FAILURES", "5"))
+ROUTING_BREAKER_RESET_SECONDS = float(os.getenv("ROUTING_BREAKER_RESET_SECONDS", "30"))
+
+# (origin_lat, origin_lon, destination_lat, destination_lon)
+Trip = Tuple[float, float, float, float]
+
+
+class Route(NamedTuple):
+    distance_km: float
+    duration_min: float
+
+
+class RoutingUnavailable(Exception):
+    """The routing service failed, timed out, or is shed by the open breaker."""
+
+
+class CircuitBreaker:
+    """closed -> open after `failures` in a row; one half-open trial after `reset_after` seconds."""
+
+    def __init__(self, failures: int = ROUTING_BREAKER_FAILURES, reset_after: float = ROUTING_BREAKER_RESET_SECONDS):
+        self.failures = failures
+        self.reset_after = reset_after
+        self._lock = threading.Lock()
+        self._consecutive = 0
+        self._opened_at: Optional[float] = None
+        self._trial = False
+        self.opened = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            return "half_open" if time.monotonic() - self._opened_at >= self.reset_after else "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._trial or time.monotonic() - self._opened_at < self.reset_after:
+                return False
+            self._trial = True  # exactly one caller probes the service
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._consecutive = 0
+            self._opened_at = None
+            self._trial = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._consecutive += 1
+            if self._trial or (self._opened_at is None and self._consecutive >= self.failures):
+                if self._opened_at is None:
+                    self.opened += 1
+                self._opened_at = time.monotonic()
+            self._trial = False
+
+
+class RoutingClient:
+    def __init__(self, base_url: str, access_token: Optional[str] = ROUTING_ACCESS_TOKEN,
+                 timeout: float = ROUTING_TIMEOUT_SECONDS, max_connections: int = ROUTING_MAX_CONNECTIONS,
+                 breaker: Optional[CircuitBreaker] = None):
+        if httpx is None:
+            raise RuntimeError("RoutingClient needs httpx")
+        self.base_url = base_url.rstrip("/")
+        self.access_token = access_token
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.breaker = breaker or CircuitBreaker()
+        self._clients: Dict[asyncio.AbstractEventLoop, "httpx.AsyncClient"] = {}
+        self._inflight: Dict[Tuple[asyncio.AbstractEventLoop, Trip], asyncio.Task] = {}
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._coalesced = 0
+        self._failures = 0
+        self._shed = 0
+        self._latency_total = 0.0
+
+    def _client(self, loop: asyncio.AbstractEventLoop) -> "httpx.AsyncClient":
+        # httpx connections belong to the loop that opened them
+        client = self._clients.get(loop)
+        if client is None:
+            client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections),
+            )
+            self._clients[loop] = client
+        return client
+
+    async def route(self, trip: Trip) -> Route:
+        """Driving route for `trip`; raises RoutingUnavailable on any failure."""
+        loop = asyncio.get_running_loop()
+        key = (loop, trip)
+        task = self._inflight.get(key)
+        if task is not None:
+            with self._lock:
+                self._coalesced += 1
+            return await asyncio.shield(task)
+
+        if not self.breaker.allow():
+            with self._lock:
+                self._shed += 1
+            raise RoutingUnavailable("routing circuit open")
+        task = loop.create_task(self._fetch(loop, trip))
+        self._inflight[key] = task
+        task.add_done_callback(lambda done: self._finished(key, done))
+        return await asyncio.shield(task)
+
+    def _finished(self, key, task: asyncio.Task) -> None:
+        self._inflight.pop(key, None)
+        if not task.cancelled():
+            task.exception()  # retrieved here in case every waiter was cancelled
+
+    async def _fetch(self, loop: asyncio.AbstractEventLoop, trip: Trip) -> Route:
+        o_lat, o_lon, d_lat, d_lon = trip
+        params = {"access_token": self.access_token} if self.access_token else None
+        started = time.perf_counter()
+        try:
+            response = await self._client(loop).get(
+                f"/directions/v5/mapbox/driving/{o_lon},{o_lat};{d_lon},{d_lat}", params=params
+            )
+            response.raise_for_status()
+            best = response.json()["routes"][0]
+            route = Route(best["distance"] / 1000, best["duration"] / 60)
+        except Exception as exc:
+            self.breaker.record_failure()
+            with self._lock:
+                self._requests += 1
+                self._failures += 1
+            raise RoutingUnavailable(str(exc) or type(exc).__name__) from exc
+        self.breaker.record_success()
+        with self._lock:
+            self._requests += 1
+            self._latency_total += time.perf_counter() - started
+        return route
+
+    async def aclose(self) -> None:
+        """Close the pooled client of the running loop (call on shutdown)."""
+        client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+    def stats(self) -> dict:
+        with self._lock:
+            ok = self._requests - self._failures
+            return {
+                "url": self.base_url,
+                "breaker": self.breaker.state,
+                "breaker_opened": self.breaker.opened,
+                "requests": self._requests,
+                "failures": self._failures,
+                "coalesced": self._coalesced,
+                "shed_by_breaker": self._shed,
+                "avg_latency_ms": round(self._latency_total / (ok or 1) * 1000, 1),
+            }
+
+
+def default_client() -> Optional[RoutingClient]:
+    if ROUTING_URL and httpx is not None:
+        return RoutingClient(ROUTING_URL)
+    return None
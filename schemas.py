@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 from typing import Optional, List
 from datetime import date, datetime
 
@@ -70,12 +70,68 @@ class DriverResponse(BaseModel):
     driver_id: int
     license: str
     experience_years: Optional[int] = 0
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    is_available: bool = False
     user: UserResponse
 
     class Config:
         orm_mode = True
 
 
+class DriverLocationUpdate(BaseModel):
+    latitude: float = Field(..., ge=-90, le=90)
+    longitude: float = Field(..., ge=-180, le=180)
+    is_available: Optional[bool] = None
+
+
+class DriverLocationResponse(BaseModel):
+    driver_id: int
+    latitude: Optional[float]
+    longitude: Optional[float]
+    location_updated_at: Optional[datetime]
+    is_available: bool
+
+    class Config:
+        orm_mode = True
+
+
+class LocationPoint(BaseModel):
+    driver_id: Optional[int] = None  # defaults to the caller's own driver profile
+    latitude: float = Field(..., ge=-90, le=90)
+    longitude: float = Field(..., ge=-180, le=180)
+    recorded_at: Optional[datetime] = None
+
+
+class LocationIngestResponse(BaseModel):
+    accepted: int
+
+
+class NearbyDriverResponse(BaseModel):
+    driver_id: int
+    distance_km: float
+
+
+# ==========================================================
+# FARE SCHEMAS
+# ==========================================================
+
+class FareQuoteRequest(BaseModel):
+    pickup_latitude: float = Field(..., ge=-90, le=90)
+    pickup_longitude: float = Field(..., ge=-180, le=180)
+    dropoff_latitude: float = Field(..., ge=-90, le=90)
+    dropoff_longitude: float = Field(..., ge=-180, le=180)
+
+
+class FareQuoteResponse(BaseModel):
+    distance_km: float
+    duration_min: float
+    fare: float
+    provider: str
+    cached: bool
+    surge: float = 1.0
+
+
 # ==========================================================
 # VEHICLE SCHEMAS
 # ==========================================================
@@ -121,8 +177,12 @@ class BookingCreate(BaseModel):
     user_id: int
     pickup_location: str
     dropoff_location: str
+    pickup_latitude: Optional[float] = Field(None, ge=-90, le=90)
+    pickup_longitude: Optional[float] = Field(None, ge=-180, le=180)
+    dropoff_latitude: Optional[float] = Field(None, ge=-90, le=90)
+    dropoff_longitude: Optional[float] = Field(None, ge=-180, le=180)
     pickup_time: datetime
-    fare_estimate: float = 0.0
+    fare_estimate: float = 0.0  # ignored when both ends have coordinates: priced server-side
 
 
 class BookingResponse(BaseModel):
@@ -131,6 +191,10 @@ class BookingResponse(BaseModel):
     driver_id: Optional[int]
     pickup_location: str
     dropoff_location: str
+    pickup_latitude: Optional[float] = None
+    pickup_longitude: Optional[float] = None
+    dropoff_latitude: Optional[float] = None
+    dropoff_longitude: Optional[float] = None
     pickup_time: datetime
     dropoff_time: Optional[datetime] = None
     fare_estimate: float
@@ -226,6 +290,47 @@ class PaymentCompleteRequest(BaseModel):
     amount: float
 
 
+# ==========================================================
+# ANALYTICS SCHEMAS
+# ==========================================================
+
+class RevenueBucket(BaseModel):
+    bucket_start: datetime
+    rides: int
+    gross_fare: float
+    completed_payments: int
+    completed_amount: float
+    pending_payments: int
+    pending_amount: float
+    cancellations: Optional[int]  # not kept in the archive
+
+
+class RevenueAnalyticsResponse(BaseModel):
+    granularity: str
+    source: str = "live"
+    archived_through: Optional[datetime] = None
+    buckets: List[RevenueBucket]
+
+
+class HeatmapBounds(BaseModel):
+    min_lat: float
+    max_lat: float
+    min_lon: float
+    max_lon: float
+
+
+class HeatmapResponse(BaseModel):
+    kind: str
+    source: str  # "memory" or "database"
+    start: datetime
+    end: datetime
+    rows: int
+    cols: int
+    bounds: Optional[HeatmapBounds]
+    total: int
+    counts: List[List[int]]  # counts[row][col], rows south to north
+
+
 # ==========================================================
 # COMPLAINT SCHEMAS
 # ==========================================================
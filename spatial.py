@@ -0,0 +1,193 @@
+"""In-memory spatial index of available drivers for nearest-driver dispatch.
+
+Drivers are bucketed into a uniform latitude/longitude grid. A k-nearest query
+walks rings of cells outward from the query point and stops as soon as no
+unvisited cell can hold anything closer than the current k-th best, so it only
+touches the handful of cells around the rider instead of every driver.
+"""
+import heapq
+import math
+import os
+import threading
+from typing import Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from models import Driver
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = 111.32
+
+DRIVER_GRID_CELL_DEG = float(os.getenv("DRIVER_GRID_CELL_DEG", "0.01"))  # ~1.1 km
+NEAREST_MAX_RADIUS_KM = float(os.getenv("NEAREST_MAX_RADIUS_KM", "10"))
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance between two points, in kilometres."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+class NearbyDriver(NamedTuple):
+    driver_id: int
+    distance_km: float
+
+
+class DriverGrid:
+    """Thread-safe uniform grid of driver positions."""
+
+    def __init__(self, cell_deg: float = DRIVER_GRID_CELL_DEG):
+        self.cell_deg = cell_deg
+        self._cells: Dict[Tuple[int, int], Set[int]] = {}
+        self._positions: Dict[int, Tuple[float, float, Tuple[int, int]]] = {}
+        self._watchers: List[Callable[[int, Optional[float], Optional[float]], None]] = []
+        self._lock = threading.Lock()
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return math.floor(lat / self.cell_deg), math.floor(lon / self.cell_deg)
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def __contains__(self, driver_id: int) -> bool:
+        return driver_id in self._positions
+
+    def watch(self, callback: Callable[[int, Optional[float], Optional[float]], None]) -> None:
+        """Call callback(driver_id, lat, lon) on every change, lat/lon None on removal.
+
+        Runs under the index lock, so it sees changes in order and must be quick.
+        """
+        self._watchers.append(callback)
+
+    def _notify(self, driver_id: int, lat: Optional[float], lon: Optional[float]) -> None:
+        for callback in self._watchers:
+            callback(driver_id, lat, lon)
+
+    def upsert(self, driver_id: int, lat: float, lon: float) -> None:
+        cell = self._cell(lat, lon)
+        with self._lock:
+            previous = self._positions.get(driver_id)
+            if previous and previous[2] != cell:
+                self._discard(driver_id, previous[2])
+            self._positions[driver_id] = (lat, lon, cell)
+            self._cells.setdefault(cell, set()).add(driver_id)
+            self._notify(driver_id, lat, lon)
+
+    def move(self, driver_id: int, lat: float, lon: float) -> bool:
+        """Update the position of an already-indexed driver; False if not indexed."""
+        cell = self._cell(lat, lon)
+        with self._lock:
+            previous = self._positions.get(driver_id)
+            if previous is None:
+                return False
+            if previous[2] != cell:
+                self._discard(driver_id, previous[2])
+                self._cells.setdefault(cell, set()).add(driver_id)
+            self._positions[driver_id] = (lat, lon, cell)
+            self._notify(driver_id, lat, lon)
+            return True
+
+    def remove(self, driver_id: int) -> None:
+        with self._lock:
+            previous = self._positions.pop(driver_id, None)
+            if previous:
+                self._discard(driver_id, previous[2])
+                self._notify(driver_id, None, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            for driver_id in self._positions:
+                self._notify(driver_id, None, None)
+            self._cells.clear()
+            self._positions.clear()
+
+    def _discard(self, driver_id: int, cell: Tuple[int, int]) -> None:
+        bucket = self._cells.get(cell)
+        if bucket is not None:
+            bucket.discard(driver_id)
+            if not bucket:
+                del self._cells[cell]
+
+    def snapshot(self) -> Tuple[List[int], List[float], List[float]]:
+        """Consistent copy of (driver_ids, latitudes, longitudes) for batch work."""
+        with self._lock:
+            ids = list(self._positions)
+            lats = [self._positions[i][0] for i in ids]
+            lons = [self._positions[i][1] for i in ids]
+        return ids, lats, lons
+
+    def nearest(
+        self, lat: float, lon: float, k: int = 10, max_radius_km: float = NEAREST_MAX_RADIUS_KM
+    ) -> List[NearbyDriver]:
+        """The k closest drivers within max_radius_km, nearest first."""
+        ci, cj = self._cell(lat, lon)
+        # A ring-r cell is at least (r - 1) cells away along some axis; longitude
+        # cells shrink toward the poles, so bound with the narrowest one in range.
+        reach_deg = max_radius_km / KM_PER_DEGREE_LAT
+        km_per_cell = self.cell_deg * KM_PER_DEGREE_LAT * math.cos(
+            math.radians(min(89.0, abs(lat) + reach_deg))
+        )
+        max_ring = int(max_radius_km / km_per_cell) + 1
+
+        best: List[Tuple[float, int]] = []  # max-heap of (-distance, driver_id)
+        with self._lock:
+            cells, positions = self._cells, self._positions
+            for ring in range(max_ring + 1):
+                if len(best) == k and (ring - 1) * km_per_cell > -best[0][0]:
+                    break
+                for cell in _ring_cells(ci, cj, ring):
+                    for driver_id in cells.get(cell, ()):
+                        d_lat, d_lon, _ = positions[driver_id]
+                        distance = haversine_km(lat, lon, d_lat, d_lon)
+                        if distance > max_radius_km:
+                            continue
+                        if len(best) < k:
+                            heapq.heappush(best, (-distance, driver_id))
+                        elif distance < -best[0][0]:
+                            heapq.heapreplace(best, (-distance, driver_id))
+        return [NearbyDriver(driver_id, -neg) for neg, driver_id in sorted(best, reverse=True)]
+
+
+def _ring_cells(ci: int, cj: int, ring: int):
+    """Cells at Chebyshev distance exactly `ring` from (ci, cj)."""
+    if ring == 0:
+        yield ci, cj
+        return
+    for dj in range(-ring, ring + 1):
+        yield ci - ring, cj + dj
+        yield ci + ring, cj + dj
+    for di in range(-ring + 1, ring):
+        yield ci + di, cj - ring
+        yield ci + di, cj + ring
+
+
+# Shared index of drivers that are available and have reported a position.
+driver_index = DriverGrid()
+
+
+def sync_driver(driver_id: int, lat: Optional[float], lon: Optional[float], is_available: bool) -> None:
+    """Reflect one driver's committed state in the index."""
+    if is_available and lat is not None and lon is not None:
+        driver_index.upsert(driver_id, lat, lon)
+    else:
+        driver_index.remove(driver_id)
+
+
+def load_driver_index(db: Session) -> int:
+    """Rebuild the index from the Drivers table; returns the number indexed."""
+    rows = (
+        db.query(Driver.driver_id, Driver.latitude, Driver.longitude)
+        .filter(
+            Driver.is_available.is_(True),
+            Driver.latitude.isnot(None),
+            Driver.longitude.isnot(None),
+        )
+        .all()
+    )
+    driver_index.clear()
+    for driver_id, lat, lon in rows:
+        driver_index.upsert(driver_id, lat, lon)
+    return len(rows)
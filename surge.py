@@ -0,0 +1,184 @@
+"""Zone-based surge multipliers from live demand and supply.
+
+Zones are a SURGE_ZONE_DEG latitude/longitude grid. For each zone the engine
+tracks:
+  demand  bookings requested there in the last SURGE_WINDOW_SECONDS: a ring
+          of SURGE_WINDOW_BUCKETS per-bucket counters plus a running window
+          total, so recording a request and expiring a bucket are O(1) per
+          zone touched
+  supply  available drivers there now, kept current by watching the
+          nearest-driver index (spatial.driver_index) as drivers move, go
+          available or get busy
+
+Every SURGE_RECOMPUTE_SECONDS the next lookup rebuilds the multipliers in one
+O(zones) pass over the zones with demand:
+
+    pressure   = demand / max(supply, 1)
+    multiplier = 1 + SURGE_SENSITIVITY * (pressure - SURGE_THRESHOLD)
+
+It is clamped to [1, SURGE_MAX_MULTIPLIER] and rounded to SURGE_STEP. Zones
+with fewer than SURGE_MIN_REQUESTS requests in the window stay at 1. Lookups
+between rebuilds are a dict read. fares.FareEngine applies the pickup zone's
+multiplier to every quote.
+"""
+import math
+import os
+import threading
+import time
+from collections import Counter, deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from spatial import driver_index
+
+SURGE_ENABLED = os.getenv("SURGE_ENABLED", "1") != "0"
+SURGE_ZONE_DEG = float(os.getenv("SURGE_ZONE_DEG", "0.02"))  # ~2.2 km
+SURGE_WINDOW_SECONDS = float(os.getenv("SURGE_WINDOW_SECONDS", "600"))
+SURGE_WINDOW_BUCKETS = int(os.getenv("SURGE_WINDOW_BUCKETS", "10"))
+SURGE_RECOMPUTE_SECONDS = float(os.getenv("SURGE_RECOMPUTE_SECONDS", "5"))
+SURGE_THRESHOLD = float(os.getenv("SURGE_THRESHOLD", "1.0"))  # requests per driver before surging
+SURGE_SENSITIVITY = float(os.getenv("SURGE_SENSITIVITY", "0.25"))
+SURGE_MAX_MULTIPLIER = float(os.getenv("SURGE_MAX_MULTIPLIER", "3.0"))
+SURGE_MIN_REQUESTS = int(os.getenv("SURGE_MIN_REQUESTS", "3"))
+SURGE_STEP = float(os.getenv("SURGE_STEP", "0.1"))
+
+Zone = Tuple[int, int]
+
+
+class SurgeEngine:
+    """Thread-safe sliding-window demand/supply counters and per-zone multipliers."""
+
+    def __init__(self, zone_deg: float = SURGE_ZONE_DEG, window_seconds: float = SURGE_WINDOW_SECONDS,
+                 buckets: int = SURGE_WINDOW_BUCKETS, recompute_seconds: float = SURGE_RECOMPUTE_SECONDS,
+                 clock: Callable[[], float] = time.time):
+        self.zone_deg = zone_deg
+        self.bucket_seconds = window_seconds / buckets
+        self.buckets = buckets
+        self.recompute_seconds = recompute_seconds
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._ring: Deque[Tuple[int, Counter]] = deque()  # (bucket number, requests per zone), oldest first
+        self._demand: Counter = Counter()  # running total of the ring
+        self._supply: Counter = Counter()
+        self._driver_zones: Dict[int, Zone] = {}
+        self._multipliers: Dict[Zone, float] = {}
+        self._computed_at = -math.inf
+        self._requests = 0
+        self._recomputes = 0
+        self._recompute_total = 0.0
+
+    def zone(self, lat: float, lon: float) -> Zone:
+        return math.floor(lat / self.zone_deg), math.floor(lon / self.zone_deg)
+
+    def _advance(self, now: float) -> int:
+        """Drop buckets that left the window; returns the current bucket number."""
+        current = int(now // self.bucket_seconds)
+        ring, demand = self._ring, self._demand
+        while ring and ring[0][0] <= current - self.buckets:
+            _, expired = ring.popleft()
+            demand.subtract(expired)
+            for zone in expired:
+                if demand[zone] <= 0:
+                    del demand[zone]
+        if not ring or ring[-1][0] != current:
+            ring.append((current, Counter()))
+        return current
+
+    def record_request(self, lat: float, lon: float, now: Optional[float] = None) -> None:
+        zone = self.zone(lat, lon)
+        with self._lock:
+            self._advance(self.clock() if now is None else now)
+            self._ring[-1][1][zone] += 1
+            self._demand[zone] += 1
+            self._requests += 1
+
+    def driver_changed(self, driver_id: int, lat: Optional[float], lon: Optional[float]) -> None:
+        """DriverGrid watcher: a driver became available at / moved to (lat, lon), or left (None)."""
+        zone = self.zone(lat, lon) if lat is not None else None
+        with self._lock:
+            previous = self._driver_zones.get(driver_id)
+            if previous == zone:
+                return
+            if previous is not None:
+                self._supply[previous] -= 1
+                if not self._supply[previous]:
+                    del self._supply[previous]
+            if zone is None:
+                del self._driver_zones[driver_id]
+            else:
+                self._driver_zones[driver_id] = zone
+                self._supply[zone] += 1
+
+    def recompute(self, now: Optional[float] = None) -> Dict[Zone, float]:
+        """Rebuild every zone's multiplier: one pass over the zones with demand."""
+        now = self.clock() if now is None else now
+        started = time.perf_counter()
+        with self._lock:
+            self._advance(now)
+            multipliers = {}
+            for zone, requests in self._demand.items():
+                if requests < SURGE_MIN_REQUESTS:
+                    continue
+                value = surge_multiplier(requests, self._supply.get(zone, 0))
+                if value > 1.0:
+                    multipliers[zone] = value
+            self._multipliers = multipliers
+            self._computed_at = now
+            self._recomputes += 1
+            self._recompute_total += time.perf_counter() - started
+        return multipliers
+
+    def multiplier(self, lat: float, lon: float, now: Optional[float] = None) -> float:
+        """Current multiplier for a pickup point, rebuilding first if the last pass is stale."""
+        now = self.clock() if now is None else now
+        if now - self._computed_at >= self.recompute_seconds:
+            self.recompute(now)
+        return self._multipliers.get(self.zone(lat, lon), 1.0)
+
+    def surging(self, now: Optional[float] = None) -> List[dict]:
+        """Zones above 1x, with their centre and counters."""
+        now = self.clock() if now is None else now
+        if now - self._computed_at >= self.recompute_seconds:
+            self.recompute(now)
+        with self._lock:
+            return [
+                {
+                    "latitude": round((i + 0.5) * self.zone_deg, 6),
+                    "longitude": round((j + 0.5) * self.zone_deg, 6),
+                    "multiplier": value,
+                    "requests": self._demand.get((i, j), 0),
+                    "available_drivers": self._supply.get((i, j), 0),
+                }
+                for (i, j), value in self._multipliers.items()
+            ]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._ring.clear()
+            self._demand.clear()
+            self._multipliers = {}
+            self._computed_at = -math.inf
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "zone_deg": self.zone_deg,
+                "window_s": self.bucket_seconds * self.buckets,
+                "zones_with_demand": len(self._demand),
+                "zones_with_supply": len(self._supply),
+                "surging_zones": len(self._multipliers),
+                "max_multiplier": max(self._multipliers.values(), default=1.0),
+                "requests": self._requests,
+                "recomputes": self._recomputes,
+                "avg_recompute_us": round(self._recompute_total / (self._recomputes or 1) * 1e6, 1),
+            }
+
+
+def surge_multiplier(requests: int, drivers: int) -> float:
+    pressure = requests / max(drivers, 1)
+    value = 1.0 + SURGE_SENSITIVITY * (pressure - SURGE_THRESHOLD)
+    value = min(SURGE_MAX_MULTIPLIER, max(1.0, value))
+    return round(round(value / SURGE_STEP) * SURGE_STEP, 2)
+
+
+surge_engine = SurgeEngine()
+driver_index.watch(surge_engine.driver_changed)
@@ -0,0 +1,26 @@
+"""Every test session runs against a scratch SQLite file, never cab_booking.db.
+
+DATABASE_URL is read when database.py is imported, so it is set here, before
+any test module imports the app.
+"""
+import os
+import tempfile
+
+import pytest
+
+_tmp = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp.name, 'test.db')}"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+os.environ.pop("ARCHIVE_DIR", None)
+
+
+@pytest.fixture(scope="session")
+def db_engine():
+    """Engine on the scratch database, with the current schema and every migration applied."""
+    from database import Base, engine
+    from migrations import run_migrations
+
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    yield engine
+    engine.dispose()
@@ -0,0 +1,34 @@
+"""SQL bucket numbers must match bucket_index() and compile on every supported backend."""
+from datetime import datetime
+
+import pytest
+from sqlalchemy import column, literal, select
+from sqlalchemy.dialects import mssql, mysql, postgresql
+from sqlalchemy.exc import CompileError
+
+from analytics import _sql_bucket, bucket_index, bucket_statement
+from database import SessionLocal
+
+MOMENTS = [datetime(1970, 1, 5), datetime(2025, 3, 2, 23, 59, 59, 999999), datetime(2025, 3, 3, 0, 0, 0)]
+
+
+@pytest.mark.parametrize("granularity", ["hour", "day", "week"])
+def test_sqlite_bucket_matches_python(db_engine, granularity):
+    with SessionLocal() as db:
+        for moment in MOMENTS:
+            assert db.scalar(select(_sql_bucket(literal(moment), granularity))) == bucket_index(granularity, moment)
+
+
+@pytest.mark.parametrize("dialect, expected", [
+    (postgresql.dialect(), "EXTRACT(EPOCH FROM"),
+    (mysql.dialect(), "TIMESTAMPDIFF(SECOND, '1970-01-01 00:00:00',"),
+])
+def test_bucket_statement_compiles_per_dialect(dialect, expected):
+    sql = str(bucket_statement("week", MOMENTS[0], MOMENTS[1]).compile(dialect=dialect))
+    assert expected in sql
+    assert "strftime" not in sql
+
+
+def test_unsupported_dialect_fails_clearly():
+    with pytest.raises(CompileError, match="not supported on mssql"):
+        str(select(_sql_bucket(column("t"), "day")).compile(dialect=mssql.dialect()))
@@ -0,0 +1,65 @@
+"""The Parquet export must include rides already moved to the history tables."""
+from datetime import datetime, timedelta
+
+import pytest
+
+from archive import RideArchive
+from database import SessionLocal
+from history import HistoryMover
+from models import ArchivedRide, Booking, Driver, Payment, Ride, Role, User
+
+pytest.importorskip("pyarrow")
+
+ENDED = datetime(2020, 3, 2, 10, 0)
+
+
+@pytest.fixture
+def old_rides(db_engine):
+    """Three paid rides that ended on ENDED: (moved booking ids, hot booking id)."""
+    with SessionLocal() as db:
+        role = Role(name="archive-test")
+        db.add(role)
+        db.flush()
+        rider = User(name="rider", email="archive-rider@example.com", phone_number="0", password="x",
+                     created_at=ENDED.date(), role_id=role.id)
+        driver_user = User(name="driver", email="archive-driver@example.com", phone_number="1", password="x",
+                           created_at=ENDED.date(), role_id=role.id)
+        db.add_all([rider, driver_user])
+        db.flush()
+        driver = Driver(user_id=driver_user.user_id, license="L")
+        db.add(driver)
+        db.flush()
+        booking_ids = []
+        for i in range(3):
+            started = ENDED - timedelta(minutes=20 + i)
+            booking = Booking(user_id=rider.user_id, driver_id=driver.driver_id, pickup_location="A",
+                              dropoff_location="B", pickup_time=started, fare_estimate=100.0 + i,
+                              status="paid", created_at=started - timedelta(minutes=5))
+            db.add(booking)
+            db.flush()
+            db.add(Ride(booking_id=booking.booking_id, user_id=rider.user_id, driver_id=driver.driver_id,
+                        start_time=started, end_time=ENDED, distance_travelled=5.0, final_fare=100.0 + i))
+            db.add(Payment(booking_id=booking.booking_id, user_id=rider.user_id, amount=100.0 + i,
+                           payment_method="cash", transaction_id=f"TXN-archive-{i}", status="completed",
+                           timestamp=ENDED))
+            booking_ids.append(booking.booking_id)
+        db.commit()
+    return booking_ids[:2], booking_ids[2]
+
+
+def test_export_includes_rides_moved_to_history(old_rides, tmp_path):
+    moved, hot = old_rides
+    with SessionLocal() as db:
+        HistoryMover(ride_archive=None).move(db, moved)
+        assert db.query(ArchivedRide).filter(ArchivedRide.booking_id.in_(moved)).count() == 2
+
+    archive = RideArchive(str(tmp_path), delay=0)
+    assert archive.export(now=ENDED + timedelta(days=1)) == 3
+
+    rows = archive.scan(["booking_id", "final_fare", "payment_status"]).to_pylist()
+    assert sorted(row["booking_id"] for row in rows) == sorted(moved + [hot])
+    assert all(row["payment_status"] == "completed" for row in rows)
+
+    series = archive.revenue_series("day", ENDED, ENDED)
+    assert series[0]["rides"] == 3
+    assert series[0]["gross_fare"] == pytest.approx(303.0)
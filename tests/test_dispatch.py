@@ -0,0 +1,60 @@
+"""A dispatch pair must only apply when its booking is still open, and free its driver otherwise."""
+import itertools
+from datetime import datetime
+
+import pytest
+
+from database import SessionLocal
+from dispatch import Assignment, DispatchEngine
+from models import Booking, Driver, Role, User
+
+_runs = itertools.count()
+
+
+@pytest.fixture
+def two_requests(db_engine):
+    """Two requested bookings and three available drivers: ([booking ids], [driver ids])."""
+    now, run = datetime.utcnow(), next(_runs)
+    with SessionLocal() as db:
+        role = Role(name=f"dispatch-test-{run}")
+        db.add(role)
+        db.flush()
+        users = [User(name=f"dispatch {i}", email=f"dispatch-{run}-{i}@example.com", phone_number=str(i),
+                      password="x", created_at=now.date(), role_id=role.id) for i in range(4)]
+        db.add_all(users)
+        db.flush()
+        drivers = [Driver(user_id=user.user_id, license="L", is_available=True, latitude=12.97, longitude=77.59)
+                   for user in users[1:]]
+        bookings = [Booking(user_id=users[0].user_id, pickup_location="A", dropoff_location="B",
+                            pickup_time=now, fare_estimate=100.0 + i, status="requested", created_at=now,
+                            pickup_latitude=12.97, pickup_longitude=77.59) for i in range(2)]
+        db.add_all(drivers + bookings)
+        db.commit()
+        return [b.booking_id for b in bookings], [d.driver_id for d in drivers]
+
+
+@pytest.mark.parametrize("taken_by_other_driver", [False, True])
+def test_lost_booking_releases_its_driver(two_requests, taken_by_other_driver):
+    (kept, lost), (winner, loser, other) = two_requests
+    with SessionLocal() as db:  # the booking goes away between plan and apply
+        booking = db.get(Booking, lost)
+        if taken_by_other_driver:
+            booking.status, booking.driver_id = "pending_user_confirmation", other
+        else:
+            booking.status = "cancelled"
+        db.commit()
+
+    plan = [Assignment(kept, winner, 0.1), Assignment(lost, loser, 0.1)]
+    with SessionLocal() as db:
+        applied, conflicts = DispatchEngine(interval=0).apply(db, plan, {kept: 100.0, lost: 101.0})
+    assert applied == [plan[0]]
+    assert conflicts == 1
+
+    with SessionLocal() as db:
+        accepted, gone = db.get(Booking, kept), db.get(Booking, lost)
+        assert (accepted.status, accepted.driver_id, accepted.fare_estimate) == (
+            "pending_user_confirmation", winner, 100.0,
+        )
+        assert gone.driver_id == (other if taken_by_other_driver else None)
+        assert db.get(Driver, winner).is_available is False
+        assert db.get(Driver, loser).is_available is True
@@ -0,0 +1,40 @@
+"""Replay history must stay bounded by recent activity, not by every topic ever published to."""
+import asyncio
+import time
+
+from events import EventBroker, user_topic
+
+
+def test_idle_topic_history_is_dropped():
+    broker = EventBroker(replay=10, replay_ttl=0)
+    for user_id in range(1000):
+        broker.publish(user_topic(user_id), "booking.status", {"user_id": user_id})
+    assert broker.stats()["replay_topics"] <= 1
+
+
+def test_history_kept_while_subscribed_and_replayed_on_reconnect():
+    async def scenario():
+        broker = EventBroker(replay=10, replay_ttl=0)
+        sub = broker.subscribe(user_topic(1))
+        first = broker.publish(user_topic(1), "booking.status", {"n": 1})
+        for user_id in range(2, 100):
+            broker.publish(user_topic(user_id), "booking.status", {})
+        assert broker.stats()["replay_topics"] <= 2  # the followed topic and the latest one
+        broker.unsubscribe(sub)
+
+        resumed = broker.subscribe(user_topic(1), last_event_id=first - 1)
+        assert (await resumed.get())[0] == first
+        broker.unsubscribe(resumed)
+
+        time.sleep(0.001)
+        broker.publish(user_topic(2), "booking.status", {})
+        assert user_topic(1) not in broker._history
+
+    asyncio.run(scenario())
+
+
+def test_recent_topics_keep_their_history():
+    broker = EventBroker(replay=10, replay_ttl=3600)
+    for user_id in range(50):
+        broker.publish(user_topic(user_id), "booking.status", {})
+    assert broker.stats()["replay_topics"] == 50
@@ -0,0 +1,21 @@
+"""Road graph routing must not add up parallel edges."""
+import pytest
+
+from fares import DistanceProvider, RoadGraphProvider
+
+
+def test_parallel_edges_keep_the_fastest():
+    pytest.importorskip("scipy")
+    # 0 -> 1 twice: a slow 2 km road and a fast 3 km road
+    provider = RoadGraphProvider(
+        node_lat=[12.90, 12.91], node_lon=[77.60, 77.60],
+        edge_from=[0, 0], edge_to=[1, 1], edge_km=[2.0, 3.0], edge_min=[10.0, 4.0],
+    )
+    route = provider.route(12.90, 77.60, 12.91, 77.60)
+    assert route.duration_min == pytest.approx(4.0)
+    assert route.distance_km == pytest.approx(3.0)
+
+
+def test_distance_provider_is_abstract():
+    with pytest.raises(TypeError):
+        DistanceProvider()
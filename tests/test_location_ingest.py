@@ -0,0 +1,53 @@
+from datetime import datetime
+
+import pytest
+
+from database import SessionLocal
+from location_ingest import LocationBuffer
+from models import Driver, Role, User
+from spatial import driver_index
+
+
+@pytest.fixture
+def make_driver(db_engine):
+    """make_driver(is_available) -> driver_id of a new driver with no position yet."""
+    created = []
+
+    def make(is_available: bool) -> int:
+        with SessionLocal() as db:
+            role = db.query(Role).filter(Role.name == "ping-test").first() or Role(name="ping-test")
+            db.add(role)
+            db.flush()
+            n = db.query(User).count()
+            user = User(name="driver", email=f"ping-{n}@example.com", phone_number=str(n), password="x",
+                        created_at=datetime.utcnow().date(), role_id=role.id)
+            db.add(user)
+            db.flush()
+            driver = Driver(user_id=user.user_id, license="L", is_available=is_available)
+            db.add(driver)
+            db.commit()
+            created.append(driver.driver_id)
+            return driver.driver_id
+
+    yield make
+    for driver_id in created:
+        driver_index.remove(driver_id)
+
+
+def test_ping_only_available_driver_enters_nearest(make_driver):
+    driver_id = make_driver(is_available=True)
+    buffer = LocationBuffer(session_factory=SessionLocal, interval=0)
+    buffer.record([(driver_id, 40.7128, -74.0060, datetime.utcnow())])
+    assert buffer.flush() == 1
+
+    nearest = driver_index.nearest(40.7128, -74.0060, k=5)
+    assert driver_id in [driver.driver_id for driver in nearest]
+
+
+def test_ping_from_busy_driver_stays_out_of_the_index(make_driver):
+    driver_id = make_driver(is_available=False)
+    buffer = LocationBuffer(session_factory=SessionLocal, interval=0)
+    buffer.record([(driver_id, 40.7128, -74.0060, datetime.utcnow())])
+    assert buffer.flush() == 1
+
+    assert driver_id not in driver_index
@@ -0,0 +1,46 @@
+"""Login must not touch the database on the event loop, even when it rehashes the password."""
+import asyncio
+import threading
+from datetime import date
+
+from fastapi.security import OAuth2PasswordRequestForm
+from jose import jwt
+from sqlalchemy import event
+
+from apis.user_api import login
+from database import SessionLocal
+from models import Role, User
+from utils import ALGORITHM, SECRET_KEY, pwd_context
+
+
+def test_login_with_rehash_keeps_db_work_off_the_loop(db_engine):
+    with SessionLocal() as db:
+        role = Role(name="login-test")
+        db.add(role)
+        db.flush()
+        weak_hash = pwd_context.handler("bcrypt").using(rounds=4).hash("secret")
+        user = User(name="login", email="login@example.com", phone_number="3", password=weak_hash,
+                    created_at=date.today(), role_id=role.id)
+        db.add(user)
+        db.commit()
+        user_id, role_id = user.user_id, role.id
+
+    loop_threads = []
+
+    def record(conn, cursor, statement, *args):
+        if threading.current_thread() is threading.main_thread():
+            loop_threads.append(statement)
+
+    event.listen(db_engine, "before_cursor_execute", record)
+    try:
+        with SessionLocal() as db:
+            form = OAuth2PasswordRequestForm(username="login@example.com", password="secret")
+            token = asyncio.run(login(form_data=form, db=db))["access_token"]
+    finally:
+        event.remove(db_engine, "before_cursor_execute", record)
+
+    assert loop_threads == []
+    claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    assert (claims["user_id"], claims["role_id"], claims["sub"]) == (user_id, role_id, "login@example.com")
+    with SessionLocal() as db:
+        assert not pwd_context.needs_update(db.get(User, user_id).password)
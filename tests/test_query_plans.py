@@ -0,0 +1,6 @@
+from migrations import find_full_scans
+
+
+def test_no_hot_query_scans_a_table(db_engine):
+    offenders = find_full_scans(db_engine)
+    assert offenders == {}, "\n".join(f"{name}: {' | '.join(plan)}" for name, plan in offenders.items())
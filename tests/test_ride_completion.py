@@ -0,0 +1,110 @@
+"""Driver signup and ride start/end must each stay one transaction with an exact statement count."""
+import asyncio
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event
+
+from apis.booking_api import END_RIDE_MAX_STATEMENTS, end_ride, start_ride
+from apis.driver_api import create_driver
+from database import SessionLocal
+from models import Booking, Driver, Role, User
+from schemas import DriverCreate
+
+# Statements per call (COMMITs counted apart)
+CREATE_DRIVER_STATEMENTS = 2  # INSERT user, INSERT driver; the response needs no reload
+START_RIDE_STATEMENTS = 3  # transition RETURNING, INSERT ride, driver totals
+END_RIDE_STATEMENTS = 5  # transition, ride read/update, driver release + totals, payment
+
+
+class StatementCounter:
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+        self.commits = 0
+        event.listen(engine, "before_cursor_execute", self._record)
+        event.listen(engine, "commit", self._commit)
+
+    def _record(self, conn, cursor, statement, *args):
+        if not statement.lstrip().upper().startswith(("BEGIN", "COMMIT", "ROLLBACK")):
+            self.statements.append(statement)
+
+    def _commit(self, conn):
+        self.commits += 1
+
+    def count(self, fn):
+        """(statements, commits) sent while running fn()."""
+        self.statements.clear()
+        self.commits = 0
+        fn()
+        return len(self.statements), self.commits
+
+    def close(self):
+        event.remove(self.engine, "before_cursor_execute", self._record)
+        event.remove(self.engine, "commit", self._commit)
+
+
+@pytest.fixture(scope="module")
+def driver_and_rider(db_engine):
+    now = datetime.utcnow()
+    with SessionLocal() as db:
+        role = Role(name="ride-test")
+        db.add(role)
+        db.flush()
+        rider = User(name="rider", email="ride-rider@example.com", phone_number="0", password="x",
+                     created_at=now.date(), role_id=role.id)
+        driver_user = User(name="driver", email="ride-driver@example.com", phone_number="1", password="x",
+                           created_at=now.date(), role_id=role.id)
+        db.add_all([rider, driver_user])
+        db.flush()
+        driver = Driver(user_id=driver_user.user_id, license="L", latitude=12.97, longitude=77.59)
+        db.add(driver)
+        db.commit()
+        return driver.driver_id, rider.user_id
+
+
+@pytest.fixture
+def booking_id(driver_and_rider):
+    driver, rider = driver_and_rider
+    now = datetime.utcnow()
+    with SessionLocal() as db:
+        booking = Booking(user_id=rider, driver_id=driver, pickup_location="A", dropoff_location="B",
+                          pickup_time=now, fare_estimate=100.0, status="accepted", created_at=now)
+        db.add(booking)
+        db.commit()
+        return booking.booking_id
+
+
+@pytest.fixture
+def counter(db_engine):
+    counter = StatementCounter(db_engine)
+    yield counter
+    counter.close()
+
+
+@pytest.mark.parametrize("rated, expected", [(False, END_RIDE_STATEMENTS), (True, END_RIDE_MAX_STATEMENTS)])
+def test_ride_lifecycle_statement_counts(booking_id, counter, rated, expected):
+    with SessionLocal() as db:
+        assert counter.count(lambda: start_ride(booking_id, db=db, _=None)) == (START_RIDE_STATEMENTS, 1)
+        assert counter.count(lambda: end_ride(
+            booking_id, user_rating=5 if rated else None, driver_rating=4 if rated else None,
+            user_feedback=None, driver_feedback=None, db=db, _=None,
+        )) == (expected, 1)
+
+
+def test_create_driver_statement_count(db_engine, counter):
+    with SessionLocal() as db:
+        if db.get(Role, 2) is None:  # create_driver always assigns role 2
+            db.add(Role(id=2, name="driver"))
+            db.commit()
+    data = DriverCreate(name="new driver", email="new-driver@example.com", phone_number="2",
+                        password="secret", license="L2", experience_years=3)
+    with SessionLocal() as db:
+        created = []
+        assert counter.count(lambda: created.append(asyncio.run(create_driver(data, db=db)))) == (
+            CREATE_DRIVER_STATEMENTS, 1,
+        )
+        # Serializing the response must not touch the database either
+        assert counter.count(created[0].model_dump)[0] == 0
+    assert created[0].user.email == "new-driver@example.com"
+    assert created[0].experience_years == 3
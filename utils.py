@@ -1,5 +1,11 @@
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Any, Callable, Dict, FrozenSet, Hashable, NamedTuple, Optional, Tuple
 
 from passlib.context import CryptContext
 from jose import jwt, JWTError, ExpiredSignatureError
@@ -7,11 +13,12 @@ from jose import jwt, JWTError, ExpiredSignatureError
 from fastapi import Depends, status, HTTPException
 from sqlalchemy.orm import Session
 from fastapi.security import OAuth2PasswordBearer
+from starlette.requests import HTTPConnection
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/users/login")
 
 
-from database import get_db
+from database import SessionLocal, get_db
 from models import *
 
 
@@ -20,18 +27,123 @@ from models import *
 ALGORITHM = "HS256"
 SECRET_KEY = "local_system_secret_key"
 
-# Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Authenticated principal cache
+PRINCIPAL_CACHE_SIZE = 10_000
+PRINCIPAL_CACHE_TTL_SECONDS = 300
+
+# Password hashing config
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "256"))
+
+# Password hashing context. Pinning min/max rounds to the configured cost
+# makes needs_update() flag hashes made with any other cost, so logins
+# rehash them transparently.
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
+
+
+class PasswordHasher:
+    """Runs bcrypt on a small dedicated pool so it cannot starve the request threadpool."""
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self._submitted = 0
+        self._completed = 0
+        self._rejected = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._run_total = 0.0
+
+    def submit(self, fn: Callable, *args) -> Future:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._rejected += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Too many authentication requests in progress, please retry",
+                )
+            self._pending += 1
+            self._submitted += 1
+        return self._executor.submit(self._run, time.perf_counter(), fn, *args)
+
+    def _run(self, queued_at: float, fn: Callable, *args):
+        started = time.perf_counter()
+        wait = started - queued_at
+        with self._lock:
+            self._running += 1
+            self._wait_total += wait
+            self._wait_max = max(self._wait_max, wait)
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._pending -= 1
+                self._completed += 1
+                self._run_total += time.perf_counter() - started
+
+    async def run(self, fn: Callable, *args):
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    def stats(self) -> dict:
+        with self._lock:
+            completed = self._completed or 1
+            return {
+                "workers": self.workers,
+                "bcrypt_rounds": BCRYPT_ROUNDS,
+                "running": self._running,
+                "queued": self._pending - self._running,
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "avg_wait_ms": round(self._wait_total / completed * 1000, 3),
+                "max_wait_ms": round(self._wait_max * 1000, 3),
+                "avg_hash_ms": round(self._run_total / completed * 1000, 3),
+            }
+
+
+password_hasher = PasswordHasher(PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING)
 
 
 def hash_password(password: str) -> str:
-    """Hash a plain password using bcrypt."""
-    return pwd_context.hash(password)
+    """Hash a plain password using bcrypt on the password pool (blocking)."""
+    return password_hasher.submit(pwd_context.hash, password).result()
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify that a plain password matches its hashed version."""
-    return pwd_context.verify(plain_password, hashed_password)
+    """Verify that a plain password matches its hashed version (blocking)."""
+    return password_hasher.submit(pwd_context.verify, plain_password, hashed_password).result()
+
+
+async def hash_password_async(password: str) -> str:
+    """Hash a plain password without blocking the event loop or request threads."""
+    return await password_hasher.run(pwd_context.hash, password)
+
+
+async def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify a password; also return a rehash when the stored cost is outdated."""
+    return await password_hasher.run(pwd_context.verify_and_update, plain_password, hashed_password)
+
+
+def date_range_filter(column, start: Optional[datetime], end: Optional[datetime]) -> list:
+    """Inclusive range criteria on a datetime column; open-ended when a bound is None."""
+    criteria = []
+    if start is not None:
+        criteria.append(column >= start)
+    if end is not None:
+        criteria.append(column <= end)
+    return criteria
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -43,8 +155,70 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
-    """Decode JWT token and return current authenticated user."""
+class TTLCache:
+    """Thread-safe LRU mapping whose entries also expire after a fixed TTL."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class Principal(NamedTuple):
+    """The identity fields authorization needs, without the full User row."""
+    user_id: int
+    email: str
+    role_id: int
+
+
+_principals = TTLCache(PRINCIPAL_CACHE_SIZE, PRINCIPAL_CACHE_TTL_SECONDS)
+
+
+def cache_principal(user: User) -> Principal:
+    """Store (or refresh) the cached principal for a loaded user."""
+    principal = Principal(user.user_id, user.email, user.role_id)
+    _principals.set(user.user_id, principal)
+    return principal
+
+
+def invalidate_principal(user_id: int) -> None:
+    """Forget a cached principal; call after a user's row is updated or deleted."""
+    _principals.pop(user_id)
+
+
+def get_current_principal(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> Principal:
+    """Decode JWT token and resolve the caller, hitting the DB only on a cache miss."""
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: Optional[str] = payload.get("sub")
@@ -55,32 +229,172 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid authentication token")
 
-    user = db.query(User).filter(User.email == email).first()
+    user_id: Optional[int] = payload.get("user_id")
+    if user_id is not None:
+        principal = _principals.get(user_id)
+        if principal is not None:
+            return principal
+        row = (
+            db.query(User.user_id, User.email, User.role_id)
+            .filter(User.user_id == user_id)
+            .first()
+        )
+    else:
+        # Tokens issued before user_id/role_id claims were added
+        row = (
+            db.query(User.user_id, User.email, User.role_id)
+            .filter(User.email == email)
+            .first()
+        )
+
+    if not row:
+        raise HTTPException(status_code=401, detail="User not found")
+
+    principal = Principal(*row)
+    _principals.set(principal.user_id, principal)
+    return principal
+
+
+def get_current_user(principal: Principal = Depends(get_current_principal), db: Session = Depends(get_db)) -> User:
+    """Return the full User row for the authenticated caller."""
+    user = db.get(User, principal.user_id)
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
 
     return user
 
 
+# Role → permission cache. Loaded from a single join the first time it is
+# needed and dropped by invalidate_permission_cache() whenever role or
+# permission assignments are committed.
+class RoleGrant(NamedTuple):
+    name: str
+    permissions: FrozenSet[str]
+
+
+_NO_GRANT = RoleGrant("", frozenset())
+_role_grants: Optional[Dict[int, RoleGrant]] = None
+_role_grants_generation = 0
+_role_grants_lock = threading.Lock()
+
+
+def _load_role_grants(db: Session) -> Dict[int, RoleGrant]:
+    """Read every role's name and permission names in one query."""
+    rows = (
+        db.query(Role.id, Role.name, Permission.name)
+        .outerjoin(RolePermission, RolePermission.role_id == Role.id)
+        .outerjoin(Permission, RolePermission.permission_id == Permission.id)
+        .all()
+    )
+    names: Dict[int, str] = {}
+    grouped: Dict[int, set] = {}
+    for role_id, role_name, permission_name in rows:
+        names[role_id] = role_name
+        permissions = grouped.setdefault(role_id, set())
+        if permission_name is not None:
+            permissions.add(permission_name)
+    return {
+        role_id: RoleGrant(names[role_id], frozenset(permissions))
+        for role_id, permissions in grouped.items()
+    }
+
+
+def get_role_grant(db: Session, role_id: int) -> RoleGrant:
+    """Return the cached name and permission set of a role."""
+    global _role_grants
+    cache = _role_grants
+    if cache is None:
+        generation = _role_grants_generation
+        cache = _load_role_grants(db)
+        with _role_grants_lock:
+            # Skip publishing if an invalidation raced with the load
+            if generation == _role_grants_generation:
+                _role_grants = cache
+    return cache.get(role_id, _NO_GRANT)
+
+
+def get_role_permissions(db: Session, role_id: int) -> FrozenSet[str]:
+    """Return the cached permission names granted to a role."""
+    return get_role_grant(db, role_id).permissions
+
+
+def invalidate_permission_cache() -> None:
+    """Drop the cached role → permission map; call after committing RBAC changes."""
+    global _role_grants, _role_grants_generation
+    with _role_grants_lock:
+        _role_grants = None
+        _role_grants_generation += 1
+
+
+class AuthContext:
+    """Principal, role and permission set of the caller, resolved once per request."""
+
+    __slots__ = ("principal", "role_name", "permissions")
+
+    def __init__(self, principal: Principal, grant: RoleGrant):
+        self.principal = principal
+        self.role_name = grant.name
+        self.permissions = grant.permissions
+
+    @property
+    def user_id(self) -> int:
+        return self.principal.user_id
+
+    @property
+    def email(self) -> str:
+        return self.principal.email
+
+    @property
+    def role_id(self) -> int:
+        return self.principal.role_id
+
+    @property
+    def is_admin(self) -> bool:
+        return self.has_role("admin")
+
+    def has_role(self, role_name: str) -> bool:
+        return self.role_name.lower() == role_name
+
+    def has_permission(self, permission_name: str) -> bool:
+        return permission_name in self.permissions
+
+
+def get_auth_context(principal: Principal = Depends(get_current_principal), db: Session = Depends(get_db)) -> AuthContext:
+    """Request-scoped authorization context; permission checks are set lookups."""
+    return AuthContext(principal, get_role_grant(db, principal.role_id))
+
+
+def token_from_connection(connection: HTTPConnection) -> Optional[str]:
+    """Bearer token from the Authorization header, else from ?token=.
+
+    Browser EventSource and WebSocket clients cannot set headers.
+    """
+    scheme, _, credentials = connection.headers.get("authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and credentials:
+        return credentials
+    return connection.query_params.get("token")
+
+
+def resolve_auth_context(token: str) -> AuthContext:
+    """AuthContext for a raw token, using a short-lived session (blocking).
+
+    Long-lived streams use this so they do not hold a request session, and its
+    pooled connection, for as long as the client stays connected.
+    """
+    with SessionLocal() as db:
+        principal = get_current_principal(token, db)
+        return AuthContext(principal, get_role_grant(db, principal.role_id))
+
+
 def require_permission(permission_name: str):
     """Dependency factory enforcing a user's permission for an endpoint."""
-    def checker(user: User = Depends(get_current_user), db: Session = Depends(get_db)) -> User:
-        has_permission = (
-            db.query(Permission)
-            .join(RolePermission, RolePermission.permission_id == Permission.id)
-            .filter(
-                RolePermission.role_id == user.role_id,
-                Permission.name == permission_name
-            )
-            .first()
-        )
-
-        if not has_permission:
+    def checker(auth: AuthContext = Depends(get_auth_context)) -> Principal:
+        if not auth.has_permission(permission_name):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail=f"User lacks permission: '{permission_name}'"
             )
 
-        return user
+        return auth.principal
 
     return checker